@@ -0,0 +1,22 @@
+"""
+gsw_data: ICM_GSW_Data 的公共基础设施 (抓取 / 缓存 / 存储)
+scripts/ 下的各个爬虫脚本共享这里的实现。
+
+建模侧直接使用数据集加载接口:
+    import gsw_data
+    games = gsw_data.schedule()
+    view = gsw_data.season_view()
+"""
+
+# 加载接口按需导入 (不在 import gsw_data 时就加载 pandas)
+_LOADER_API = {
+    "load", "clear_cache", "season_view", "DATASETS",
+    "schedule", "salaries", "salary_ledger", "financing", "player_value", "player_advanced", "draft", "future_assets",
+}
+
+
+def __getattr__(name):
+    if name in _LOADER_API:
+        from gsw_data import loader
+        return getattr(loader, name)
+    raise AttributeError(f"module 'gsw_data' has no attribute {name!r}")
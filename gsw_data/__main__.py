@@ -0,0 +1,180 @@
+import argparse
+
+from gsw_data import config
+
+# --- 命令行入口 ---
+# 模块顶层只导入 argparse 与 config: --help / list 这类查看命令在几十毫秒内返回，
+# pandas / requests / 各爬虫脚本都在子命令真正执行时才导入 (见 python -X importtime -m gsw_data list)
+# 每个数据集一个子命令，直接调用流水线对应阶段的函数 (输出路径与 run 相同)，不做跳过判断
+
+# 数据集子命令 -> 帮助文本
+DATASET_HELP = {
+    "schedule": "抓取赛程并计算 Rolling Win Rate",
+    "attendance": "抓取上座与门票收入 (赛季汇总 / 逐场)",
+    "player-value": "抓取球员级高阶数据 (PER / WS / VORP + Cap Hit)",
+    "salaries": "抓取 Spotrac 薪资账本与赛季薪资汇总",
+    "draft": "抓取历史选秀记录",
+    "transactions": "抓取交易 / 签约记录并按赛季计数",
+    "future-assets": "生成未来选秀权资产表 (本地硬编码)",
+    "financing": "生成 Forbes 财务结构表 (本地硬编码)",
+    "simulate": "蒙特卡洛推演营收 / 利润 / 估值 / 债务率",
+}
+# 没有额外参数的子命令 -> (metrics 运行名，与脚本单独运行时相同, 流水线阶段)
+DATASET_COMMANDS = {
+    "salaries": ("get_salaries", "salaries"),
+    "draft": ("get_transactions_and_draft", "draft"),
+    "transactions": ("get_transactions_and_draft", "transactions"),
+    "future-assets": ("get_transactions_and_draft", "future_assets"),
+    "financing": ("get_finance_structure", "financing"),
+}
+
+
+def _names(value):
+    return [s.strip() for s in value.split(",") if s.strip()] if value else None
+
+
+def _given(**kwargs):
+    # 只传命令行里给出的参数，其余沿用脚本函数自己的默认值
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def _run_stage(run_name, stage_name, func=None, **kwargs):
+    from gsw_data.metrics import run
+    from gsw_data.pipeline import STAGE_INDEX
+    with run(run_name):
+        STAGE_INDEX[stage_name].run(func, **kwargs)
+    return 0
+
+
+def _dataset_command(args):
+    command = args.command
+    if command == "schedule":
+        func = "refresh_schedule_incremental" if args.incremental else None
+        return _run_stage("get_schedule", "schedule", func)
+    if command == "attendance":
+        if args.games:
+            return _run_stage("get_game_attendance", "game_attendance")
+        return _run_stage("get_ticket_data_bref", "attendance")
+    if command == "player-value":
+        from gsw_data.teams import parse_seasons, parse_team_list
+        return _run_stage("get_player_value", "player_value", **_given(
+            team_codes=parse_team_list(args.teams) if args.teams else None,
+            seasons=parse_seasons(args.seasons) if args.seasons else None))
+    if command == "simulate":
+        return _run_stage("simulate_finance", "finance_sim", **_given(
+            horizon=args.years, n_paths=args.paths, seed=args.seed, workers=args.workers))
+    name, stage_name = DATASET_COMMANDS[command]
+    return _run_stage(name, stage_name)
+
+
+def _league(args):
+    from gsw_data.metrics import run
+    from gsw_data.pipeline import import_script
+    from gsw_data.teams import parse_seasons, parse_team_list
+    run_league = import_script("run_league")
+    sources = _names(args.sources) or list(run_league.SOURCE_HOSTS)
+    unknown = [s for s in sources if s not in run_league.SOURCE_HOSTS]
+    if unknown:
+        print(f"未知的数据源: {', '.join(unknown)} (可选: {', '.join(run_league.SOURCE_HOSTS)})")
+        return 2
+    with run("run_league"):
+        run_league.run_league(parse_team_list(args.teams), parse_seasons(args.seasons or run_league.DEFAULT_SEASONS),
+                              sources, force=args.force)
+    return 0
+
+
+def _list():
+    from gsw_data.pipeline import NAME_WIDTH, STAGES, load_state, stale_reason
+    state = load_state()
+    for stage in STAGES:
+        reason = stale_reason(stage, state)
+        deps = f" <- {', '.join(stage.deps)}" if stage.deps else ""
+        print(f"   {stage.name:<{NAME_WIDTH}}{reason or '最新':<10}{deps}")
+    return 0
+
+
+def _print_changes(datasets, since):
+    from gsw_data.changes import CDC_SPECS, latest_version, read_changes, summarize
+    datasets = datasets or list(CDC_SPECS)
+    unknown = [d for d in datasets if d not in CDC_SPECS]
+    if unknown:
+        print(f"未知的数据集: {', '.join(unknown)}")
+        return 2
+    for dataset in datasets:
+        version = latest_version(dataset)
+        if version <= since:
+            continue
+        summary = summarize(read_changes(dataset, since))
+        print(f"📦 {dataset} (v{since} -> v{version}): {len(summary)} 个分区有变化")
+        for row in summary.itertuples(index=False):
+            print(f"   {row.Team or '-':<5}{row.Season:<6} 新增 {row.insert:<5} 更新 {row.update:<5} 删除 {row.delete}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gsw_data", description="GSW 数据流水线")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="按依赖关系运行流水线 (未变化的阶段自动跳过)")
+    run.add_argument("--only", help="只运行这些阶段，逗号分隔")
+    run.add_argument("--since", help="从这些阶段开始，连同下游一起强制重跑，逗号分隔")
+    run.add_argument("--force", action="store_true", help="忽略跳过判断，全部重跑")
+    run.add_argument("--dry-run", action="store_true", help="只打印执行计划，不运行")
+    run.add_argument("--workers", type=int, help="最多同时运行的阶段数")
+    run.add_argument("--profile", help="对这些阶段做 cProfile，逗号分隔 ('all' 为全部)")
+    run.add_argument("--tracemalloc", help="记录这些阶段的内存峰值，逗号分隔 ('all' 为全部)")
+
+    sub.add_parser("list", help="列出全部阶段及其状态")
+
+    changes = sub.add_parser("changes", help="查看数据集的行级变更 (按分区汇总)")
+    changes.add_argument("datasets", nargs="*", help="数据集名，默认全部")
+    changes.add_argument("--since", type=int, default=0, help="只看版本号大于它的变更")
+
+    # --- 数据集子命令 ---
+    for command, help_text in DATASET_HELP.items():
+        cmd = sub.add_parser(command, help=help_text)
+        if command == "schedule":
+            cmd.add_argument("--incremental", action="store_true", help="增量模式: 只抓取进行中的赛季，追加新比赛")
+        elif command == "attendance":
+            cmd.add_argument("--games", action="store_true", help="逐场模式: 按赛程抓取每个主场的比赛页面")
+        elif command == "player-value":
+            cmd.add_argument("--teams", help="B-Ref 球队代码，逗号分隔，或 'all' (默认 GSW)")
+            cmd.add_argument("--seasons", help="如 2021-2025 或 2021,2023")
+        elif command == "simulate":
+            cmd.add_argument("--paths", type=int, help="模拟路径数")
+            cmd.add_argument("--years", type=int, help="向后推演的赛季数")
+            cmd.add_argument("--seed", type=int, help="随机种子 (结果可复现)")
+            cmd.add_argument("--workers", type=int, help="进程数 (0 为 CPU 核数)")
+
+    league = sub.add_parser("league", help="联盟级数据抓取 (多球队 x 多赛季，按分区断点续跑)")
+    league.add_argument("--teams", default="all", help="B-Ref 球队代码，逗号分隔，或 'all'")
+    league.add_argument("--seasons", help="如 2021-2025 或 2021,2023 (默认 2021-2025)")
+    league.add_argument("--sources", help="数据源，逗号分隔 (默认全部)")
+    league.add_argument("--force", action="store_true", help="忽略已完成的分区，全部重跑")
+    args = parser.parse_args(argv)
+
+    if args.command == "changes":
+        return _print_changes(args.datasets, args.since)
+    if args.command == "list":
+        return _list()
+    if args.command == "league":
+        return _league(args)
+    if args.command in DATASET_HELP:
+        return _dataset_command(args)
+
+    from gsw_data.pipeline import print_summary, run_pipeline
+    if args.profile:
+        config.PROFILE_STAGES = args.profile
+    if args.tracemalloc:
+        config.TRACEMALLOC_STAGES = args.tracemalloc
+    try:
+        results = run_pipeline(only=_names(args.only), since=_names(args.since), force=args.force,
+                               max_workers=args.workers, dry_run=args.dry_run)
+    except ValueError as e:
+        parser.error(str(e))
+    print_summary(results)
+    return 1 if any(status in ("failed", "blocked", "incomplete") for status, _ in results.values()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,212 @@
+import glob
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+from gsw_data import config
+from gsw_data.metrics import count, stage
+from gsw_data.store import PRIMARY_EXT, _atomic, dataset_path, read_dataset
+
+# --- 变更捕获 (CDC) ---
+# 每次写出数据集后，按 (Team, Season, 行键) 给每一行算一个内容哈希，与上一次的快照比较:
+#   新行 -> insert，哈希变了 -> update，不见了 -> delete
+# 变更记录按版本号追加写出，快照整体替换:
+#   cache/cdc/schedule/snapshot.parquet        [Team, Season, Key, Hash]
+#   cache/cdc/schedule/changes-000003.parquet  [Version, Captured, Team, Season, Op, Key]
+# 下游 (如每晚的模型刷新) 记下自己处理到的版本号，下次用 changed_partitions(dataset, since=版本号)
+# 只取出变过的 (球队, 赛季)，只重算这些分区，而不是整个历史
+# 单队文件没有 Team 列，分区的球队记为 None
+
+# 每个数据集: 赛季列 (默认 Season) 与分区内的行键 (空 = 每个分区只有一行)
+# 行键重复时 (如同一球员既有现役合同又有死钱) 按出现次序区分
+CDC_SPECS = {
+    "schedule": {"keys": ["Date", "Opponent"]},
+    "salaries": {"keys": []},
+    "salary_ledger": {"keys": ["Player"]},
+    "attendance": {"keys": []},
+    "game_attendance": {"keys": ["Date"]},
+    "financing": {"keys": []},
+    "finance_bands": {"keys": ["Metric"]},
+    "player_value": {"keys": []},
+    "player_advanced": {"keys": ["Player"]},
+    "draft": {"season": "Year", "keys": ["Round", "Pick"]},
+    "future_assets": {"keys": []},
+    "transactions": {"keys": []},
+}
+
+SNAPSHOT = "snapshot"
+_PART = re.compile(r"changes-(\d+)\.")
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock(dataset):
+    with _locks_guard:
+        return _locks.setdefault(dataset, threading.Lock())
+
+
+def _dir(dataset):
+    return os.path.join(config.CDC_DIR, dataset)
+
+
+def _write(df, path):
+    if PRIMARY_EXT == "parquet":
+        _atomic(path, lambda p: df.to_parquet(p, index=False))
+    else:
+        _atomic(path, lambda p: df.to_csv(p, index=False))
+
+
+def _read(path):
+    if PRIMARY_EXT == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={"Team": str, "Key": str}, keep_default_na=False)
+
+
+def tracked(dataset, path):
+    """只跟踪 data/ 下的正式文件 (基准测试等写到临时目录的输出不参与)"""
+    if dataset not in CDC_SPECS:
+        return False
+    stem = os.path.splitext(os.path.abspath(path))[0]
+    return stem == os.path.splitext(os.path.abspath(dataset_path(dataset)))[0]
+
+
+def row_hashes(df, dataset, team=None):
+    """
+    每行一个 (Team, Season, Key, Hash): Key 为行键拼接的字符串，Hash 为整行内容的 64 位哈希
+    全部向量化 (pandas.util.hash_pandas_object)，不逐行循环
+    """
+    spec = CDC_SPECS[dataset]
+    if "Team" in df.columns:
+        teams = df["Team"].astype(str).to_numpy()
+    else:
+        teams = team or ""
+    out = pd.DataFrame({
+        "Team": teams,
+        "Season": pd.to_numeric(df[spec.get("season", "Season")], errors="coerce").fillna(0).astype("int64").to_numpy(),
+    })
+    keys = pd.Series("", index=df.index)
+    for i, col in enumerate(spec["keys"]):
+        values = df[col].astype(str)
+        keys = values if i == 0 else keys + "|" + values
+    keys = keys.to_numpy()
+    out["Key"] = keys
+    occurrence = out.groupby(["Team", "Season", "Key"], sort=False).cumcount().to_numpy()
+    if occurrence.any():
+        out["Key"] = pd.Series(keys).where(occurrence == 0, pd.Series(keys) + "#" + occurrence.astype(str))
+    out["Hash"] = pd.util.hash_pandas_object(_canonical(df), index=False).to_numpy()
+    return out
+
+
+def _canonical(df):
+    # 同一份数据经不同路径写出 (直接写 / 分片合并后读回) 时日期的精度可能不同，统一后再算哈希
+    dates = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    if not dates:
+        return df
+    return df.assign(**{c: df[c].astype("datetime64[ns]") for c in dates})
+
+
+def diff(old, new):
+    """两份 row_hashes 的差异: DataFrame[Team, Season, Op, Key]，Op 为 insert / update / delete"""
+    merged = old.merge(new, on=["Team", "Season", "Key"], how="outer",
+                       suffixes=("_old", "_new"), indicator=True)
+    op = pd.Series(pd.NA, index=merged.index, dtype="object")
+    op[merged["_merge"] == "right_only"] = "insert"
+    op[merged["_merge"] == "left_only"] = "delete"
+    op[(merged["_merge"] == "both") & (merged["Hash_old"] != merged["Hash_new"])] = "update"
+    changes = merged.assign(Op=op)[op.notna().to_numpy()]
+    return changes[["Team", "Season", "Op", "Key"]].sort_values(["Team", "Season", "Key"]).reset_index(drop=True)
+
+
+def latest_version(dataset):
+    """已记录的最新变更版本号 (还没有任何记录时为 0)"""
+    parts = [int(m.group(1)) for m in map(_PART.search, glob.glob(os.path.join(_dir(dataset), "changes-*")))
+             if m]
+    return max(parts, default=0)
+
+
+def capture(dataset, df, team=None, season=None):
+    """
+    记录一次写出带来的变更，返回本次的变更 DataFrame (没有变化时为空)
+    比较范围: 给了 season 时只比较这一个 (team, season) 分区 (联盟模式逐个分区写出)，
+    否则比较 df 里出现的全部球队 (整文件写出，文件里消失的赛季记为 delete)
+    """
+    if dataset not in CDC_SPECS:
+        return None
+    with stage("cdc", dataset=dataset), _lock(dataset):
+        new = row_hashes(df, dataset, team)
+        snapshot_path = os.path.join(_dir(dataset), f"{SNAPSHOT}.{PRIMARY_EXT}")
+        if os.path.exists(snapshot_path):
+            old = _read(snapshot_path)
+        else:
+            old = new.iloc[:0]
+        if season is not None:
+            scope = (old["Team"] == (team or "")) & (old["Season"] == season)
+        else:
+            scope = old["Team"].isin(pd.unique(new["Team"]) if len(new) else [team or ""])
+        changes = diff(old[scope.to_numpy()], new)
+
+        if not changes.empty:
+            version = latest_version(dataset) + 1
+            changes.insert(0, "Captured", time.strftime("%Y-%m-%d %H:%M:%S"))
+            changes.insert(0, "Version", version)
+            _write(changes, os.path.join(_dir(dataset), f"changes-{version:06d}.{PRIMARY_EXT}"))
+            count("changed_rows", len(changes))
+            ops = changes["Op"].value_counts()
+            partitions = len(changes[["Team", "Season"]].drop_duplicates())
+            print(f"   🔁 {dataset} 变更 v{version}: 新增 {ops.get('insert', 0)} / 更新 {ops.get('update', 0)} / "
+                  f"删除 {ops.get('delete', 0)} 行，涉及 {partitions} 个分区")
+        _write(pd.concat([old[~scope.to_numpy()], new], ignore_index=True), snapshot_path)
+    return changes
+
+
+def capture_file(dataset, path):
+    """整文件写出之后 (如断点分片合并) 读回并记录变更; 不是 data/ 下的正式文件时跳过"""
+    if not tracked(dataset, path):
+        return None
+    return capture(dataset, read_dataset(dataset, path))
+
+
+def read_changes(dataset, since=0):
+    """版本号大于 since 的全部变更记录 (按版本顺序)"""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(_dir(dataset), "changes-*"))):
+        m = _PART.search(path)
+        if m and int(m.group(1)) > since:
+            frames.append(_read(path))
+    if not frames:
+        return pd.DataFrame(columns=["Version", "Captured", "Team", "Season", "Op", "Key"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def changed_partitions(dataset, since=0):
+    """
+    版本号大于 since 以来有变化的分区: [(team, season), ...]，单队文件的 team 为 None
+    下游只需重算这些分区; 处理完后记下 latest_version(dataset)，下次作为 since 传入
+    """
+    changes = read_changes(dataset, since)
+    pairs = changes[["Team", "Season"]].drop_duplicates().sort_values(["Team", "Season"])
+    return [(team or None, int(season)) for team, season in pairs.itertuples(index=False)]
+
+
+def select_partitions(df, dataset, partitions):
+    """从数据集 (整文件或 read_partitions 的结果) 中只取出这些分区的行"""
+    if not partitions:
+        return df.iloc[:0]
+    spec = CDC_SPECS[dataset]
+    teams = df["Team"].astype(str) if "Team" in df.columns else pd.Series("", index=df.index)
+    wanted = pd.MultiIndex.from_tuples([(team or "", season) for team, season in partitions])
+    current = pd.MultiIndex.from_arrays([teams, pd.to_numeric(df[spec.get("season", "Season")], errors="coerce")])
+    return df[current.isin(wanted)]
+
+
+def summarize(changes):
+    """变更记录 -> 每个分区一行: insert / update / delete 各多少行"""
+    if changes.empty:
+        return pd.DataFrame(columns=["Team", "Season", "insert", "update", "delete"])
+    table = (changes.groupby(["Team", "Season", "Op"]).size()
+             .unstack("Op", fill_value=0)
+             .reindex(columns=["insert", "update", "delete"], fill_value=0))
+    return table.reset_index()
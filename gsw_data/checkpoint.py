@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+from gsw_data import config
+from gsw_data.changes import capture_file
+from gsw_data.metrics import count, stage
+from gsw_data.store import HAS_PARQUET, _atomic, apply_schema, write_dataset
+
+# --- 断点续跑的写入器 ---
+# 每完成一个单元 (如一个赛季) 就原子写出一个分片，再把它记进完成清单 (manifest.json):
+#   cache/checkpoints/schedule-<范围哈希>/GSW-2024.parquet (+ .csv)
+#   cache/checkpoints/schedule-<范围哈希>/manifest.json
+# 分片先写、清单后写，清单里有的单元一定是完整的; 中途崩溃或被封 IP 后重跑，已完成的单元直接跳过
+# 最后由 compact() 把分片逐个流式合并成 data/ 下的正式文件，内存里同一时间只有一个分片
+# 全部单元完成并合并后清单和分片一起删除，下一次全量运行从头开始 (页面仍走 HTTP 缓存)
+# 清单超过 CHECKPOINT_MAX_AGE 视为过期 (进行中赛季的数据会变)，整个作废重来
+
+MANIFEST = "manifest.json"
+
+
+def unit_id(unit):
+    """单元的文件名键: 2024 -> '2024', ('GSW', 2024) -> 'GSW-2024'"""
+    parts = unit if isinstance(unit, (tuple, list)) else (unit,)
+    return "-".join(str(p) for p in parts)
+
+
+class Checkpoint:
+    """
+    一个数据集一次运行范围 (如球队) 的断点: pending() 取未完成单元，write() 逐个落盘，compact() 合并
+    scope: 区分同一数据集的不同运行范围 (如 {"team": "GSW"})，范围不同的清单互不干扰
+    """
+
+    def __init__(self, dataset, output_file, scope=None, root=None):
+        self.dataset = dataset
+        self.output_file = output_file
+        key = json.dumps({"output": os.path.abspath(output_file), "scope": scope or {}}, sort_keys=True)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+        self.dir = os.path.join(root or config.CHECKPOINT_DIR, f"{dataset}-{digest}")
+        self.manifest_path = os.path.join(self.dir, MANIFEST)
+        self.lock = threading.Lock()
+        self.created = time.time()
+        self.units = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if self.created - manifest.get("created", 0) <= config.CHECKPOINT_MAX_AGE:
+                self.created = manifest["created"]
+                self.units = manifest.get("units", {})
+            else:
+                shutil.rmtree(self.dir, ignore_errors=True)
+
+    def done(self, unit):
+        return unit_id(unit) in self.units
+
+    def pending(self, units):
+        return [u for u in units if not self.done(u)]
+
+    def _part(self, name, ext):
+        return os.path.join(self.dir, f"{name}.{ext}")
+
+    def _record(self, name, rows):
+        with self.lock:
+            self.units[name] = {"rows": rows}
+            manifest = {"dataset": self.dataset, "output": self.output_file,
+                        "created": self.created, "units": self.units}
+            _atomic(self.manifest_path, lambda p: _write_json(p, manifest))
+
+    def write(self, unit, df):
+        """原子写出一个单元的分片并记入清单 (可在工作线程中并发调用)"""
+        name = unit_id(unit)
+        with stage("write", dataset=self.dataset):
+            if HAS_PARQUET:
+                typed = apply_schema(df, self.dataset)
+                _atomic(self._part(name, "parquet"), lambda p: typed.to_parquet(p, index=False))
+            if config.CSV_EXPORT or not HAS_PARQUET:
+                _atomic(self._part(name, "csv"), lambda p: df.to_csv(p, index=False))
+            self._record(name, len(df))
+        count("rows", len(df))
+
+    def skip(self, unit):
+        """记录一个确定没有数据的单元 (如 404 / 尚未开赛)，重跑时不再抓取，也不产生分片"""
+        self._record(unit_id(unit), 0)
+
+    def compact(self, units, export_csv=None):
+        """
+        按 units 的顺序把已完成单元的分片合并成正式输出 (Parquet + 可选 CSV)
+        返回写出的文件列表; 一个完成的单元都没有时返回 [] (不覆盖已有输出)
+        """
+        names = [unit_id(u) for u in units if self.units.get(unit_id(u), {}).get("rows")]
+        if not names:
+            return []
+        if export_csv is None:
+            export_csv = config.CSV_EXPORT
+        with stage("compact", dataset=self.dataset):
+            written = _compact(self, names, export_csv)
+        # 合并后的正式文件读回一次，记录与上一次运行相比的行级变更
+        capture_file(self.dataset, self.output_file)
+        return written
+
+    def finish(self, units):
+        """全部单元完成时删除清单和分片; 仍有未完成单元时保留，供下次续跑"""
+        if self.pending(units):
+            return False
+        shutil.rmtree(self.dir, ignore_errors=True)
+        return True
+
+
+def _write_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+
+
+def _compact(checkpoint, names, export_csv):
+    os.makedirs(os.path.dirname(checkpoint.output_file) or ".", exist_ok=True)
+    csv_parts = [checkpoint._part(n, "csv") for n in names]
+    has_csv = all(os.path.exists(p) for p in csv_parts)
+    written = []
+    try:
+        if HAS_PARQUET:
+            parquet_path = os.path.splitext(checkpoint.output_file)[0] + ".parquet"
+            _concat_parquet([checkpoint._part(n, "parquet") for n in names], parquet_path)
+            written.append(parquet_path)
+        if export_csv or not HAS_PARQUET:
+            if not has_csv:
+                raise ValueError("缺少 CSV 分片")
+            _concat_csv(csv_parts, checkpoint.output_file)
+            written.append(checkpoint.output_file)
+    except (ValueError, KeyError, ImportError) as e:
+        # 分片的列或类型不一致 (如旧版分片)，退回到整体读入再写出
+        print(f"   ⚠️ 分片无法流式合并 ({str(e)[:80]})，改为整体合并")
+        if has_csv:
+            df = pd.concat([pd.read_csv(p) for p in csv_parts], ignore_index=True)
+        else:
+            df = pd.concat([pd.read_parquet(checkpoint._part(n, "parquet")) for n in names], ignore_index=True)
+            export_csv = False
+        written = write_dataset(df, checkpoint.dataset, checkpoint.output_file, export_csv=export_csv)
+    return written
+
+
+def _concat_parquet(paths, out):
+    # 先只读各分片的 schema (元数据，不读数据) 统一类型，再逐个分片写成一个 row group
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        schemas = [pq.read_schema(p) for p in paths]
+        names = schemas[0].names
+        if any(set(s.names) != set(names) for s in schemas):
+            raise ValueError("分片的列不一致")
+        schema = pa.unify_schemas(schemas, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(str(e)) from e
+
+    def writer(tmp):
+        with pq.ParquetWriter(tmp, schema) as w:
+            for path in paths:
+                try:
+                    table = pq.read_table(path).select(schema.names).cast(schema)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                    raise ValueError(str(e)) from e
+                w.write_table(table)
+
+    _atomic(out, writer)
+
+
+def _concat_csv(paths, out):
+    # CSV 分片按字节拼接: 第一个分片保留表头，其余跳过表头行 (表头必须一致)
+    def writer(tmp):
+        header = None
+        with open(tmp, "wb") as dst:
+            for path in paths:
+                with open(path, "rb") as src:
+                    first = src.readline()
+                    if header is None:
+                        header = first
+                        dst.write(first)
+                    elif first != header:
+                        raise ValueError("分片的表头不一致")
+                    shutil.copyfileobj(src, dst)
+
+    _atomic(out, writer)
@@ -0,0 +1,109 @@
+import os
+
+# --- 路径配置 ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+# --- 代理设置 (端口 7897) ---
+# 可用环境变量 GSW_PROXY 覆盖; 设为空字符串则直连
+_proxy = os.environ.get("GSW_PROXY", "http://127.0.0.1:7897")
+PROXIES = {"http": _proxy, "https": _proxy} if _proxy else {}
+
+# --- 代理池 (见 gsw_data.proxypool) ---
+# GSW_PROXIES: 逗号分隔的多个代理，优先于 GSW_PROXY; 不设置时代理池里只有上面这一个
+# 每个请求路由到当前最健康的代理 (延迟 / 错误率 / 是否被目标站封禁)，限速按 (host, 代理) 计算，
+# 所以总吞吐随代理数量线性增长
+PROXY_POOL = [p.strip() for p in os.environ.get("GSW_PROXIES", "").split(",") if p.strip()] \
+    or ([_proxy] if _proxy else [])
+# 回放模式下默认直连夹具服务器; 需要测试代理池时用 GSW_REPLAY_PROXIES 指定本地替身代理
+REPLAY_PROXIES = [p.strip() for p in os.environ.get("GSW_REPLAY_PROXIES", "").split(",") if p.strip()]
+# 每个代理同时在途的请求数上限
+PROXY_MAX_CONCURRENCY = 4
+# 代理被目标站封禁 (403 / 429) 后，在该 host 上的冷却时间 (秒，有 Retry-After 时以其为准)
+PROXY_BAN_COOLDOWN = 120
+# 代理连续 PROXY_MAX_FAILURES 次连接失败视为宕机，PROXY_DOWN_COOLDOWN 秒内不再分配请求
+PROXY_MAX_FAILURES = 3
+PROXY_DOWN_COOLDOWN = 60
+# 粘性会话: 这些 host 的请求固定走同一个代理 (同一出口 IP + 同一组 Cookie)，该代理不健康时才切换
+# GSW_PROXY_STICKY: 逗号分隔的 host 列表
+PROXY_STICKY_HOSTS = {h.strip() for h in os.environ.get("GSW_PROXY_STICKY", "").split(",") if h.strip()}
+
+# --- 浏览器伪装池 ---
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/119.0"
+]
+
+# --- 输出格式 ---
+# 主存储为带类型的 Parquet (需要 pyarrow)；CSV 作为可选导出，GSW_CSV_EXPORT=0 关闭
+CSV_EXPORT = os.environ.get("GSW_CSV_EXPORT", "1") != "0"
+
+# --- HTTP 缓存配置 ---
+# 缓存目录: 按 URL 哈希存放原始 HTML (内容寻址)
+CACHE_DIR = os.environ.get("GSW_CACHE_DIR", os.path.join(ROOT_DIR, "cache", "http"))
+
+# 预计算视图 (如赛季级联表) 的磁盘缓存
+VIEW_CACHE_DIR = os.path.join(ROOT_DIR, "cache", "views")
+
+# 断点续跑: 各脚本逐个单元 (赛季 / 球队-赛季) 落盘的分片与完成清单 (见 gsw_data.checkpoint)
+CHECKPOINT_DIR = os.environ.get("GSW_CHECKPOINT_DIR", os.path.join(ROOT_DIR, "cache", "checkpoints"))
+# 清单的有效期 (秒): 超过后整个作废，避免很久以前失败的运行把进行中赛季的旧数据带进来
+CHECKPOINT_MAX_AGE = 24 * 3600
+
+# 变更捕获: 各数据集每一行的内容哈希快照与逐版本的变更记录 (见 gsw_data.changes)
+CDC_DIR = os.environ.get("GSW_CDC_DIR", os.path.join(ROOT_DIR, "cache", "cdc"))
+
+# 页面结构校验: 各数据源见过的表格布局指纹 (见 gsw_data.validate)
+SCHEMA_DIR = os.environ.get("GSW_SCHEMA_DIR", os.path.join(ROOT_DIR, "cache", "schema"))
+
+# 回放模式: 设置 GSW_REPLAY_URL (如 http://127.0.0.1:8800) 后，所有请求改发到本地的
+# 夹具服务器 (gsw_data.replay.FixtureServer)，URL 映射为 {GSW_REPLAY_URL}/{host}{path}
+REPLAY_URL = os.environ.get("GSW_REPLAY_URL", "")
+
+# 离线模式: GSW_CACHE_ONLY=1 时只读缓存，不访问网络
+CACHE_ONLY = os.environ.get("GSW_CACHE_ONLY", "") == "1"
+
+# 各数据源的缓存有效期 (秒)，只对"进行中"的赛季/页面生效
+# 已结束赛季的页面不会再变化，永久有效 (见 fetch.season_ttl)
+SOURCE_TTL = {
+    "www.basketball-reference.com": 6 * 3600,
+    "www.spotrac.com": 12 * 3600,
+}
+DEFAULT_TTL = 3600
+
+# --- 运行指标 ---
+# 每次运行写出 JSONL 事件流 + JSON 汇总 (见 gsw_data.metrics)
+# GSW_PROFILE / GSW_TRACEMALLOC: 需要 cProfile / 内存峰值的阶段名，逗号分隔，"all" 为全部
+METRICS_DIR = os.environ.get("GSW_METRICS_DIR", os.path.join(ROOT_DIR, "cache", "metrics"))
+PROFILE_STAGES = os.environ.get("GSW_PROFILE", "")
+TRACEMALLOC_STAGES = os.environ.get("GSW_TRACEMALLOC", "")
+
+# --- 并发与限速配置 ---
+# 每个 (host, 代理) 一个令牌桶: (每秒请求数, 突发容量)
+# 目标站按出口 IP 限流，所以速率预算属于每个代理各自一份
+# B-Ref 官方限制约 20 次/分钟，这里按 1 次/3 秒保守设置
+HOST_RATE_LIMITS = {
+    "www.basketball-reference.com": (1 / 3, 1),
+    "www.spotrac.com": (1 / 2, 2),
+}
+DEFAULT_RATE_LIMIT = (1.0, 1)
+
+# 并发抓取的线程数 (各 host 的速率由令牌桶单独控制)
+MAX_WORKERS = 8
+
+# --- 重试与熔断配置 ---
+# 暂时性失败按指数退避 + 抖动重试 (429/503 优先遵守 Retry-After)
+# 403: Spotrac 的反爬拦截，换 User-Agent 重试通常能恢复
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
+RETRY_STATUS = {403, 408, 429, 500, 502, 503, 504}
+# 同一 host 连续失败 BREAKER_THRESHOLD 次后熔断 BREAKER_COOLDOWN 秒
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 300
+
+# --- 连接池配置 ---
+# POOL_HOSTS: 缓存多少个 host 的连接池; POOL_MAXSIZE: 每个 host 最多保持的长连接数
+POOL_HOSTS = 10
+POOL_MAXSIZE = MAX_WORKERS
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from gsw_data.store import apply_schema
+
+# --- 特征配置 ---
+# 所有特征都在 (Team, Season) 分组内计算，全部用前缀和 / 累积运算一次性向量化完成，
+# 不按赛季或球队写 Python 循环，联盟级 (~6000+ 场) 赛程同样一次算完
+ROLLING_WINDOWS = (5, 10, 20)
+EWM_SPAN = 10
+
+
+def _group_keys(games):
+    return [k for k in ("Team", "Season") if k in games.columns]
+
+
+def _group_starts(games, keys):
+    """每一行所在分组的起始下标 (要求已按分组排序)"""
+    n = len(games)
+    if not keys or n == 0:
+        return np.zeros(n, dtype=np.int64)
+    codes = games.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = codes[1:] != codes[:-1]
+    return np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+
+def _prefix(values):
+    # 带前导 0 的前缀和: P[i+1] = values[0..i] 之和
+    out = np.zeros(len(values) + 1, dtype=np.float64)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _window_sum(prefix, starts, window=None):
+    """
+    分组内 [max(组起点, i-window+1), i] 区间的和与元素个数
+    window=None 表示从组起点累计到当前 (expanding)
+    """
+    idx = np.arange(len(starts))
+    lo = starts if window is None else np.maximum(starts, idx - window + 1)
+    return prefix[idx + 1] - prefix[lo], idx + 1 - lo
+
+
+def _lag(values, starts):
+    # 分组内整体后移一场 (只用赛前信息，避免特征泄露)
+    out = np.full(len(values), np.nan)
+    idx = np.arange(1, len(values))
+    keep = idx > starts[1:]
+    out[1:][keep] = values[:-1][keep]
+    return out
+
+
+def build_game_features(games, windows=ROLLING_WINDOWS, ewm_span=EWM_SPAN, lag=False):
+    """
+    逐场特征 (一次性向量化计算全部球队和赛季)
+    - Win_Rate_{w}: 近 w 场胜率 (不足 w 场时用赛季累计胜率，与 Recent_Win_Rate_10 一致)
+    - Win_Rate_EWM: 指数加权胜率 (span=ewm_span，等价于 pandas ewm(adjust=True))
+    - Point_Diff / Point_Diff_{w}: 单场与近 w 场场均净胜分
+    - Home_Win_Rate / Away_Win_Rate: 赛季至今主场 / 客场胜率 (需要 Home 列)
+    - Rest_Days / Back_To_Back: 距上一场的天数、是否背靠背
+    - Streak: 当前连胜 (+n) / 连败 (-n) 场数
+    lag=True 时所有滚动特征只使用赛前信息 (整体后移一场)，用于预测建模
+    """
+    keys = _group_keys(games)
+    games = apply_schema(games, "schedule")
+    games = games.sort_values(keys + ["Date"], kind="stable").reset_index(drop=True)
+    starts = _group_starts(games, keys)
+    idx = np.arange(len(games))
+
+    win = (games["Result"].astype("string") == "W").to_numpy(dtype=np.float64)
+    diff = (games["Points_Scored"] - games["Points_Allowed"]).to_numpy(dtype=np.float64, na_value=np.nan)
+    diff = np.nan_to_num(diff)
+
+    features = {"Win_Flag": win.astype(np.int8), "Point_Diff": diff}
+
+    win_prefix = _prefix(win)
+    diff_prefix = _prefix(diff)
+    for w in windows:
+        total, count = _window_sum(win_prefix, starts, w)
+        features[f"Win_Rate_{w}"] = total / count
+        total, count = _window_sum(diff_prefix, starts, w)
+        features[f"Point_Diff_{w}"] = total / count
+
+    # 指数加权: y_t = Σ x_k (1-a)^(t-k) / Σ (1-a)^(t-k)，分子分母同乘 (1-a)^(-t) 后变成累积和
+    # 权重随组内位置指数放大，必须用分组累积和 (不能跨组做差，否则大数相减丢精度)
+    # 分组内位置不超过一个赛季的场次 (~110)，不会溢出
+    alpha = 2.0 / (ewm_span + 1.0)
+    pos = idx - starts
+    weight = (1.0 - alpha) ** (-pos.astype(np.float64))
+    by_group = pd.Series(starts)
+    num = pd.Series(win * weight).groupby(by_group).cumsum().to_numpy()
+    den = pd.Series(weight).groupby(by_group).cumsum().to_numpy()
+    features["Win_Rate_EWM"] = num / den
+
+    if "Home" in games.columns:
+        home = games["Home"].to_numpy(dtype=np.float64, na_value=np.nan)
+        known = ~np.isnan(home)
+        home = np.nan_to_num(home)
+        away = np.where(known, 1.0 - home, 0.0)
+        for name, mask in (("Home", home), ("Away", away)):
+            wins, _ = _window_sum(_prefix(win * mask), starts)
+            played, _ = _window_sum(_prefix(mask), starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                features[f"{name}_Win_Rate"] = np.where(played > 0, wins / played, np.nan)
+
+    # 休息天数: 同组内与上一场的日期差
+    dates = games["Date"].to_numpy()
+    rest = np.full(len(games), np.nan)
+    has_prev = idx > starts
+    rest[has_prev] = (dates[has_prev] - dates[idx[has_prev] - 1]) / np.timedelta64(1, "D")
+    features["Rest_Days"] = rest
+    features["Back_To_Back"] = (rest == 1).astype(np.int8)
+
+    # 连胜/连败: 每段连续相同结果的起点，用累积最大值一次求出
+    run_start = np.ones(len(games), dtype=bool)
+    run_start[1:] = (win[1:] != win[:-1]) | (starts[1:] == idx[1:])
+    run_start_idx = np.maximum.accumulate(np.where(run_start, idx, 0))
+    features["Streak"] = (idx - run_start_idx + 1) * np.where(win == 1, 1, -1)
+
+    if lag:
+        for name in list(features):
+            if name not in ("Win_Flag", "Point_Diff", "Rest_Days", "Back_To_Back"):
+                features[name] = _lag(np.asarray(features[name], dtype=np.float64), starts)
+
+    games = games.drop(columns=[c for c in features if c in games.columns])
+    return pd.concat([games, pd.DataFrame(features, index=games.index)], axis=1)
+
+
+def build_season_features(game_features):
+    """
+    赛季级特征: 由逐场特征按 (Team, Season) 一次 groupby 聚合得到
+    (需要 lag=False 的逐场特征，否则主客场胜率和连胜会少算最后一场)
+    """
+    keys = _group_keys(game_features)
+    agg = {
+        "Games": ("Win_Flag", "size"),
+        "Wins": ("Win_Flag", "sum"),
+        "Win_Pct": ("Win_Flag", "mean"),
+        "Avg_Point_Diff": ("Point_Diff", "mean"),
+        "Longest_Win_Streak": ("Streak", "max"),
+        "Longest_Losing_Streak": ("Streak", "min"),
+        "Avg_Rest_Days": ("Rest_Days", "mean"),
+        "Back_To_Backs": ("Back_To_Back", "sum"),
+    }
+    if "Home_Win_Rate" in game_features.columns:
+        # 赛季最后一场的"至今"主客场胜率即为全季主客场胜率
+        agg["Home_Win_Pct"] = ("Home_Win_Rate", "last")
+        agg["Away_Win_Pct"] = ("Away_Win_Rate", "last")
+    season = game_features.groupby(keys, observed=True).agg(**agg).reset_index()
+    season["Longest_Losing_Streak"] = -season["Longest_Losing_Streak"].clip(upper=0)
+    return season
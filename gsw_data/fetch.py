@@ -0,0 +1,264 @@
+import datetime
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from gsw_data import config, metrics
+from gsw_data.proxypool import get_pool
+from gsw_data.retry import (backoff_delay, get_breaker, is_transient, record_metric,
+                            retry_after_seconds)
+from gsw_data.session import browser_headers, get_session
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """离线模式下缓存里没有该 URL"""
+
+
+def current_season(today=None):
+    """
+    当前进行中的赛季 (按结束年份命名，与 B-Ref 一致)
+    例: 2025年11月 -> 2026 赛季; 2026年3月 -> 2026 赛季
+    """
+    today = today or datetime.date.today()
+    return today.year + 1 if today.month >= 10 else today.year
+
+
+def season_ttl(url, season):
+    """
+    已结束的赛季永久缓存 (返回 None)，进行中的赛季按数据源 TTL 过期
+    """
+    if season < current_season():
+        return None
+    return source_ttl(url)
+
+
+def source_ttl(url):
+    return config.SOURCE_TTL.get(urlparse(url).netloc, config.DEFAULT_TTL)
+
+
+def replay_target(url):
+    """
+    回放模式下把真实 URL 改写到本地夹具服务器，返回实际请求的 URL
+    (回放模式的代理池默认为直连，见 config.REPLAY_PROXIES)
+    """
+    if not config.REPLAY_URL:
+        return url
+    parts = urlparse(url)
+    return f"{config.REPLAY_URL.rstrip('/')}/{parts.netloc}{parts.path}"
+
+
+def _cache_paths(url):
+    # 内容寻址: 以 URL 的 sha256 作为文件名，前两位做子目录避免单目录文件过多
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    folder = os.path.join(config.CACHE_DIR, key[:2])
+    return os.path.join(folder, key + ".body"), os.path.join(folder, key + ".json")
+
+
+def _read_cache(url):
+    body_path, meta_path = _cache_paths(url)
+    if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+        return None, None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(body_path, "rb") as f:
+        body = f.read()
+    return body, meta
+
+
+def _atomic_write(path, data):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _write_cache(url, body, meta):
+    body_path, meta_path = _cache_paths(url)
+    os.makedirs(os.path.dirname(body_path), exist_ok=True)
+    _atomic_write(body_path, body)
+    _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+
+def evict(url):
+    """
+    删除某个 URL 的缓存 (页面结构校验失败时调用)
+    否则挑战页 / 结构变化的页面会留在缓存里，已结束赛季永久有效，每次重跑都回放同一个坏页面
+    """
+    for path in _cache_paths(url):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _validated(url, response, validate):
+    # 校验缓存里的页面: 不通过时删掉缓存再抛出，下次运行重新联网
+    if validate is not None:
+        try:
+            validate(response)
+        except ValueError:
+            evict(url)
+            raise
+    return response
+
+
+def _touch_meta(url, meta):
+    _, meta_path = _cache_paths(url)
+    _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+
+def _build_response(url, body, meta):
+    # 把缓存内容包装成 requests.Response，脚本里的 status_code / text / raise_for_status 照常可用
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.url = url
+    response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    response.encoding = meta.get("encoding")
+    response.from_cache = True
+    return response
+
+
+_insecure_silenced = False
+
+
+def _silence_insecure_warning():
+    # 脚本对 B-Ref / Spotrac 用 verify=False (绕开 SSLEOFError): 第一次真正发出这种请求时才关掉 SSL 警告，
+    # 而不是在 import 脚本时就改全局的 warnings 设置
+    global _insecure_silenced
+    if not _insecure_silenced:
+        import urllib3
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        _insecure_silenced = True
+
+
+def fetch(url, headers=None, ttl=-1, cache_only=None, validate=None, **kwargs):
+    """
+    带磁盘缓存的 GET 请求，所有爬虫脚本共用
+
+    ttl: 缓存有效期 (秒)；None = 永久有效；默认按数据源 (SOURCE_TTL) 取值
+    cache_only: 只读缓存不联网 (默认读取 GSW_CACHE_ONLY 环境变量)
+    validate: 可选，校验 200 响应 (抛出 ValueError 表示页面不对); 通过校验的页面才写入缓存，
+              缓存命中但校验不通过时删掉该缓存
+    其余参数 (timeout / verify ...) 原样传给共享 Session 的 get
+    (代理由 gsw_data.proxypool 按健康度分配，每个代理一个 Session; 未指定 User-Agent 时自动轮换)
+
+    过期后如果有 ETag / Last-Modified，会先发条件请求，304 时直接复用缓存。
+    返回的 Response 带有 from_cache 属性，命中缓存时为 True (调用方可据此跳过礼貌性延迟)。
+    """
+    if ttl == -1:
+        ttl = source_ttl(url)
+    if cache_only is None:
+        cache_only = config.CACHE_ONLY
+
+    body, meta = _read_cache(url)
+
+    if body is not None:
+        age = time.time() - meta.get("fetched_at", 0)
+        if cache_only or ttl is None or age < ttl:
+            metrics.count("cache_hits")
+            return _validated(url, _build_response(url, body, meta), validate)
+    elif cache_only:
+        raise CacheMiss(f"离线模式下缓存缺失: {url}")
+
+    # --- 条件请求 (Revalidation) ---
+    request_headers = browser_headers(headers)
+    if body is not None:
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    # 真正联网前检查熔断器、从代理池借一个代理并按 (host, 代理) 取令牌 (缓存命中不消耗配额)
+    host = urlparse(url).netloc
+    breaker = get_breaker(host)
+    breaker.check()
+    target = replay_target(url)
+    record_metric(host, "requests")
+    if kwargs.get("verify") is False:
+        _silence_insecure_warning()
+    pool = get_pool()
+    # lease 内部先等令牌再占并发名额，进入 with 块时已经可以立即发请求
+    with pool.lease(host) as (proxy, wait):
+        metrics.count("rate_limit_wait_s", wait)
+        started = time.perf_counter()
+        try:
+            response = get_session(proxy.url).get(target, headers=request_headers, **kwargs)
+        except Exception as e:
+            pool.record(proxy, host, e, None)
+            breaker.record(not is_transient(e))
+            raise
+        pool.record(proxy, host, response, time.perf_counter() - started)
+    breaker.record(not is_transient(response))
+    metrics.count("http_requests")
+    metrics.count("bytes_downloaded", len(response.content))
+
+    if response.status_code == 304 and body is not None:
+        meta["fetched_at"] = time.time()
+        _touch_meta(url, meta)
+        return _validated(url, _build_response(url, body, meta), validate)
+
+    response.from_cache = False
+    if response.status_code == 200:
+        # 先校验再写缓存: 挑战页 / 结构变化的页面不进缓存 (旧缓存也一并删掉)
+        _validated(url, response, validate)
+        _write_cache(url, response.content, {
+            "url": url,
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+        })
+    return response
+
+
+def fetch_with_retry(url, validate=None, max_attempts=None, **kwargs):
+    """
+    带重试的 fetch: 暂时性失败 (429/5xx/断连/超时) 按指数退避 + 抖动重试，
+    429/503 带 Retry-After 时按服务端要求等待 (超过 RETRY_MAX_DELAY 则直接熔断该 host，不再等)
+    永久性失败不重试: 404 等状态码原样返回，熔断/缓存缺失的异常直接抛出
+
+    validate: 可选，对 200 响应做校验 (如解析出目标表格)，抛出 ValueError 表示页面结构变化，
+              属于永久性失败，不会重试，页面也不写入缓存
+    重试次数、等待时长等指标见 gsw_data.retry.retry_metrics()
+    """
+    host = urlparse(url).netloc
+    max_attempts = max_attempts or config.RETRY_MAX_ATTEMPTS
+    for attempt in range(1, max_attempts + 1):
+        try:
+            response = fetch(url, validate=validate, **kwargs)
+        except Exception as e:
+            transient = is_transient(e)
+            record_metric(host, "transient" if transient else "permanent")
+            if not transient or attempt == max_attempts:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            if response.status_code == 200:
+                return response
+            if not is_transient(response):
+                record_metric(host, "permanent")
+                return response
+            record_metric(host, "transient")
+            if attempt == max_attempts:
+                return response
+            delay = backoff_delay(attempt)
+            wait = retry_after_seconds(response)
+            # Retry-After 针对的是出口 IP: 代理池里还有没被封的代理时直接换代理重试，不必等
+            if wait is not None and not get_pool().any_available(host):
+                if wait > config.RETRY_MAX_DELAY:
+                    get_breaker(host).trip(wait)
+                    return response
+                delay = max(delay, wait)
+
+        record_metric(host, "retries")
+        record_metric(host, "wait_seconds", delay)
+        metrics.count("retries")
+        metrics.count("retry_wait_s", delay)
+        time.sleep(delay)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+from gsw_data import config
+from gsw_data.store import HAS_PARQUET, read_dataset, source_file
+
+# 建模用的核心数据集
+DATASETS = ["schedule", "salaries", "salary_ledger", "financing", "player_value", "player_advanced", "draft", "future_assets"]
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _fingerprint(path):
+    # 以 (路径, 修改时间, 文件大小) 作为缓存键，源文件一变就自动失效
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def load(dataset, path=None):
+    """
+    懒加载 + 记忆化读取一个数据集
+    同一进程内重复调用直接返回缓存的 DataFrame (源文件未变化时)
+    注意: 返回的是共享对象，需要修改时请先 .copy()
+    """
+    key = _fingerprint(source_file(dataset, path))
+    with _memo_lock:
+        cached = _memo.get(dataset)
+        if cached and cached[0] == key:
+            return cached[1]
+    df = read_dataset(dataset, key[0])
+    with _memo_lock:
+        _memo[dataset] = (key, df)
+    return df
+
+
+def schedule():
+    return load("schedule")
+
+
+def salaries():
+    return load("salaries")
+
+
+def salary_ledger():
+    return load("salary_ledger")
+
+
+def financing():
+    return load("financing")
+
+
+def player_value():
+    return load("player_value")
+
+
+def player_advanced():
+    return load("player_advanced")
+
+
+def draft():
+    return load("draft")
+
+
+def future_assets():
+    return load("future_assets")
+
+
+def clear_cache():
+    with _memo_lock:
+        _memo.clear()
+
+
+# --- 赛季级联表 ---
+_VIEW_SOURCES = ["schedule", "salaries", "financing", "player_value"]
+
+
+def _schedule_by_season(games):
+    # 赛程聚合: 每个赛季的场次、胜率、场均得失分
+    games = games.assign(Point_Diff=games["Points_Scored"] - games["Points_Allowed"])
+    agg = games.groupby("Season").agg(
+        Games=("Win_Flag", "size"),
+        Wins=("Win_Flag", "sum"),
+        Win_Pct=("Win_Flag", "mean"),
+        Avg_Points_Scored=("Points_Scored", "mean"),
+        Avg_Points_Allowed=("Points_Allowed", "mean"),
+        Avg_Point_Diff=("Point_Diff", "mean"),
+    )
+    return agg.astype("float64").reset_index()
+
+
+def _build_season_view():
+    view = _schedule_by_season(schedule())
+    for dataset, cols in [
+        ("salaries", ["Season", "Total_Salary_Expense", "Luxury_Tax"]),
+        ("financing", None),
+        ("player_value", None),
+    ]:
+        frame = load(dataset)
+        # 旧版数据文件可能缺少新加的列 (如 Luxury_Tax)，只取存在的
+        frame = frame[[c for c in cols if c in frame.columns]] if cols else frame
+        view = view.merge(frame, on="Season", how="outer")
+    return view.sort_values("Season").reset_index(drop=True)
+
+
+def _view_key():
+    fingerprints = [_fingerprint(source_file(d)) for d in _VIEW_SOURCES]
+    return hashlib.sha256(json.dumps(fingerprints).encode("utf-8")).hexdigest()[:16]
+
+
+def season_view():
+    """
+    预计算的赛季级联表: 赛程聚合 + 薪资 + 融资 + 球员价值 (按 Season 外连接)
+    - 进程内记忆化
+    - 同时落盘到 cache/views/，键为各源文件的指纹，跨进程的重复训练也不用重新 join
+    """
+    key = _view_key()
+    with _memo_lock:
+        cached = _memo.get("season_view")
+        if cached and cached[0] == key:
+            return cached[1]
+
+    ext = "parquet" if HAS_PARQUET else "pkl"
+    path = os.path.join(config.VIEW_CACHE_DIR, f"season_view-{key}.{ext}")
+    if os.path.exists(path):
+        view = pd.read_parquet(path) if HAS_PARQUET else pd.read_pickle(path)
+    else:
+        view = _build_season_view()
+        os.makedirs(config.VIEW_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        if HAS_PARQUET:
+            view.to_parquet(tmp, index=False)
+        else:
+            view.to_pickle(tmp)
+        os.replace(tmp, path)
+        # 清理旧指纹对应的过期视图
+        for name in os.listdir(config.VIEW_CACHE_DIR):
+            if name.startswith("season_view-") and not name.startswith(f"season_view-{key}"):
+                os.remove(os.path.join(config.VIEW_CACHE_DIR, name))
+
+    with _memo_lock:
+        _memo["season_view"] = (key, view)
+    return view
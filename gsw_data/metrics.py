@@ -0,0 +1,221 @@
+import contextvars
+import datetime
+import functools
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from gsw_data import config
+
+# --- 运行指标 ---
+# stage(): 计时上下文 (可嵌套，路径如 "schedule/clean/read_html")
+# count(): 计数器 (下载字节数、产出行数、重试次数、等待时长...)，归属到当前所在的阶段
+# run(): 一次运行的边界，结束时写出 JSONL 事件流 + JSON 汇总报告
+# 没有活动的 run 时 stage() / count() 什么都不做，脚本被当作库调用时没有额外开销
+#
+# 阶段路径保存在 contextvar 里，scheduler.run_parallel 会把它带进工作线程，
+# 所以并发抓取的字节数也能记到发起抓取的那个阶段上
+
+_path = contextvars.ContextVar("gsw_stage_path", default=())
+_children = contextvars.ContextVar("gsw_stage_children", default=None)
+_active = None
+_active_lock = threading.Lock()
+
+
+def _parse_stage_list(value):
+    return {s.strip() for s in value.split(",") if s.strip()}
+
+
+class Run:
+    """一次运行的指标收集器 (线程安全)"""
+
+    def __init__(self, name, report_dir=None, profile=None, trace_memory=None):
+        self.name = name
+        self.started = time.time()
+        self.start = time.perf_counter()
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.run_id = f"{name}-{stamp}-{os.getpid()}"
+        self.report_dir = report_dir or config.METRICS_DIR
+        self.profile = _parse_stage_list(config.PROFILE_STAGES if profile is None else profile)
+        self.trace_memory = _parse_stage_list(
+            config.TRACEMALLOC_STAGES if trace_memory is None else trace_memory)
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.profiles = {}
+        os.makedirs(self.report_dir, exist_ok=True)
+        self.events_path = os.path.join(self.report_dir, f"{self.run_id}.jsonl")
+        self.events = open(self.events_path, "w", encoding="utf-8")
+
+    def wants(self, selection, path):
+        # 按阶段名 (路径最后一段) 或完整路径选择，"all" 表示全部
+        return bool(selection) and ("all" in selection or path[-1] in selection
+                                    or "/".join(path) in selection)
+
+    def emit(self, event):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self.lock:
+            self.events.write(line + "\n")
+
+    def add_stage(self, key, seconds, self_seconds, extra):
+        with self.lock:
+            stats = self.stages.setdefault(key, {"count": 0, "seconds": 0.0, "self_seconds": 0.0,
+                                                 "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["self_seconds"] += self_seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if "mem_peak_bytes" in extra:
+                stats["mem_peak_bytes"] = max(stats.get("mem_peak_bytes", 0), extra["mem_peak_bytes"])
+
+    def add_count(self, key, name, value):
+        with self.lock:
+            stage = self.stages.setdefault(key, {"count": 0, "seconds": 0.0, "self_seconds": 0.0,
+                                                 "max_seconds": 0.0})
+            stage[name] = stage.get(name, 0) + value
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_profile(self, key, profiler):
+        with self.lock:
+            if key in self.profiles:
+                self.profiles[key].add(profiler)
+            else:
+                import pstats
+                self.profiles[key] = pstats.Stats(profiler)
+
+    def summary(self):
+        from gsw_data.retry import retry_metrics
+        return {
+            "run": self.name,
+            "run_id": self.run_id,
+            "started_at": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "seconds": time.perf_counter() - self.start,
+            "counters": dict(self.counters),
+            "stages": {key: self.stages[key] for key in sorted(self.stages)},
+            "retry": retry_metrics(),
+        }
+
+    def close(self):
+        summary = self.summary()
+        for key, stats in self.profiles.items():
+            path = os.path.join(self.report_dir, f"{self.run_id}.{re.sub(r'[^A-Za-z0-9_.-]', '_', key)}.prof")
+            stats.dump_stats(path)
+            summary["stages"][key]["profile"] = path
+        self.emit({"event": "run_end", **summary})
+        self.events.close()
+        path = os.path.join(self.report_dir, f"{self.run_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False, default=str)
+        return path, summary
+
+
+def active_run():
+    return _active
+
+
+@contextmanager
+def run(name, report_dir=None, profile=None, trace_memory=None):
+    """
+    一次运行的边界: 结束时写出 {METRICS_DIR}/{run_id}.jsonl (事件流) 与 .json (汇总)
+    已有活动的 run 时 (如脚本函数被流水线调用)，退化为一个普通阶段
+    profile / trace_memory: 需要 cProfile / tracemalloc 的阶段名，逗号分隔 ("all" 为全部)，
+    默认读取 GSW_PROFILE / GSW_TRACEMALLOC 环境变量
+    """
+    global _active
+    with _active_lock:
+        nested = _active is not None
+        if not nested:
+            _active = Run(name, report_dir, profile, trace_memory)
+    if nested:
+        with stage(name):
+            yield _active
+        return
+
+    current = _active
+    current.emit({"event": "run_start", "run": name, "run_id": current.run_id})
+    try:
+        yield current
+    finally:
+        with _active_lock:
+            _active = None
+        path, summary = current.close()
+        print(f"\n📊 运行指标: {path} (共 {summary['seconds']:.1f}s)")
+
+
+@contextmanager
+def stage(name, **tags):
+    """计时一个阶段，tags 会原样写进事件 (如 season=2024)"""
+    current = _active
+    if current is None:
+        yield
+        return
+
+    path = _path.get() + (name,)
+    key = "/".join(path)
+    parent_children = _children.get()
+    children = []
+    path_token = _path.set(path)
+    children_token = _children.set(children)
+
+    profiler = None
+    if current.wants(current.profile, path):
+        # 分析器只在需要时导入 (pstats 本身就要 20ms，不拖慢每个脚本的启动)
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 同一时刻只能有一个分析器 (并发阶段时后到的跳过)
+            profiler = None
+    trace = current.wants(current.trace_memory, path)
+    if trace:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _path.reset(path_token)
+        _children.reset(children_token)
+        if parent_children is not None:
+            parent_children.append(seconds)
+
+        extra = {}
+        if profiler is not None:
+            profiler.disable()
+            current.add_profile(key, profiler)
+        if trace:
+            # tracemalloc 是进程级的: 并发阶段的分配也会计入峰值
+            _, peak = tracemalloc.get_traced_memory()
+            extra["mem_peak_bytes"] = peak
+
+        self_seconds = max(0.0, seconds - sum(children))
+        current.add_stage(key, seconds, self_seconds, extra)
+        current.emit({"event": "stage", "stage": key, "seconds": round(seconds, 6),
+                      "self_seconds": round(self_seconds, 6), "thread": threading.current_thread().name,
+                      **tags, **extra})
+
+
+def timed(name=None):
+    """装饰器版的 stage()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """给当前阶段 (及整个运行) 的计数器加上 value"""
+    current = _active
+    if current is not None:
+        current.add_count("/".join(_path.get()) or "(run)", name, value)
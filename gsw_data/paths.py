@@ -0,0 +1,56 @@
+import importlib.util
+import os
+
+from gsw_data import config
+
+# --- 数据集文件路径 (不依赖 pandas) ---
+# 流水线的跳过判断、python -m gsw_data list 等只需要路径的地方从这里导入，
+# 不必为了拼一个文件名就加载 pandas / pyarrow; store 原样重新导出这些名字
+
+# Parquet 依赖 pyarrow; 没装时退回只写 CSV (并打印提示)
+# 只检查是否安装，不导入 (pyarrow 本身要几百毫秒，真正读写时由 pandas 按需加载)
+HAS_PARQUET = importlib.util.find_spec("pyarrow") is not None
+
+PRIMARY_EXT = "parquet" if HAS_PARQUET else "csv"
+
+# --- 数据集 -> data/ 下的文件名 (不含扩展名) ---
+DATASET_FILES = {
+    "schedule": "gsw_schedule_5years",
+    "salaries": "gsw_salaries_5years",
+    "salary_ledger": "gsw_salary_ledger",
+    "attendance": "gsw_ticket_revenue",
+    "game_attendance": "gsw_game_attendance",
+    "financing": "gsw_financing_5years",
+    "finance_bands": "gsw_finance_bands",
+    "player_value": "gsw_player_value",
+    "player_advanced": "gsw_player_advanced",
+    "draft": "gsw_draft_history",
+    "future_assets": "gsw_future_assets",
+    "transactions": "gsw_transaction_counts",
+}
+
+
+def dataset_path(dataset, ext=None, root=None):
+    """data/ 下某个数据集的文件路径 (默认主存储格式)"""
+    root = root or config.DATA_DIR
+    return os.path.join(root, f"{DATASET_FILES[dataset]}.{ext or PRIMARY_EXT}")
+
+
+def source_file(dataset, path=None):
+    """数据集实际会被读取的文件: 有 Parquet 用 Parquet，否则用 CSV"""
+    stem = os.path.splitext(path or dataset_path(dataset))[0]
+    if HAS_PARQUET and os.path.exists(stem + ".parquet"):
+        return stem + ".parquet"
+    return stem + ".csv"
+
+
+def partition_path(dataset, team, season, ext=None, root=None):
+    """
+    分区输出路径: data/team=GSW/season=2024/schedule.parquet
+    """
+    root = root or config.DATA_DIR
+    return os.path.join(root, f"team={team}", f"season={season}", f"{dataset}.{ext or PRIMARY_EXT}")
+
+
+def partition_exists(dataset, team, season, ext=None, root=None):
+    return os.path.exists(partition_path(dataset, team, season, ext, root))
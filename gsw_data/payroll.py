@@ -0,0 +1,197 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from gsw_data.store import apply_schema
+
+# --- 劳资协议 (CBA) 数字 ---
+# 赛季 -> (工资帽, 奢侈税线, 第一土豪线, 第二土豪线, 税档宽度)，单位: 美元
+# 2017 版 CBA (2021-2023 赛季) 只有一条土豪线 (即现在的第一土豪线)，没有第二土豪线；税档固定 500 万
+# 2023 版 CBA 起税档宽度随工资帽浮动
+CBA = {
+    2021: (109_140_000, 132_627_000, 138_928_000, None, 5_000_000),
+    2022: (112_414_000, 136_606_000, 143_002_000, None, 5_000_000),
+    2023: (123_655_000, 150_267_000, 156_983_000, None, 5_000_000),
+    2024: (136_021_000, 165_294_000, 172_346_000, 182_794_000, 5_168_000),
+    2025: (140_588_000, 170_814_000, 178_132_000, 188_931_000, 5_685_000),
+}
+
+# 超出税线部分的累进税率: 前四档 1.5 / 1.75 / 2.5 / 3.25，之后每档 +0.5
+# 重复纳税者 (前 4 个赛季里至少 3 个交过税) 每档再 +1.0
+TAX_RATES = (1.50, 1.75, 2.50, 3.25)
+RATE_STEP = 0.50
+REPEATER_SURCHARGE = 1.00
+N_BRACKETS = 64   # 按 500 万一档，足够覆盖超税线 3 亿美元
+
+# 账本窗口 (CBA 表从 2021 赛季开始) 之前交过奢侈税的赛季，按 B-Ref 球队代码; 赛季按结束年份记
+# 判断 2021-2024 赛季是否为重复纳税者要看前 4 个赛季 (最早到 2017)，这部分历史账本覆盖不到
+# 没有列出的球队只能按账本内的历史推断 (窗口前几个赛季一律视为非重复纳税者)
+TAX_HISTORY = {
+    "GSW": (2018, 2019),   # 2017-18 / 2018-19 交税; 2016-17 与 2019-20 在税线以下
+}
+
+# 薪资状态 (有序): 帽下 / 帽上 / 交税 / 超第一土豪线 / 超第二土豪线
+APRON_LEVELS = ["Under_Cap", "Over_Cap", "Taxpayer", "First_Apron", "Second_Apron"]
+
+
+@functools.lru_cache(maxsize=None)
+def tax_table(n_brackets=N_BRACKETS):
+    """
+    预计算的税档表 (整个进程只算一次):
+    seasons (S,), thresholds (S, 4) = 工资帽 / 税线 / 两条土豪线 (缺失的土豪线为 inf),
+    width (S,), rates (2, B) = [普通, 重复纳税者] 各档税率,
+    base (2, S, B) = 每一档起点处已累计的税额
+    """
+    seasons = np.array(sorted(CBA), dtype=np.int64)
+    rows = [CBA[s] for s in seasons]
+    thresholds = np.array([[cap, tax, apron1, np.inf if apron2 is None else apron2]
+                           for cap, tax, apron1, apron2, _ in rows], dtype=np.float64)
+    width = np.array([r[4] for r in rows], dtype=np.float64)
+
+    steps = np.arange(1, n_brackets - len(TAX_RATES) + 1) * RATE_STEP + TAX_RATES[-1]
+    rates = np.concatenate([TAX_RATES, steps])
+    rates = np.stack([rates, rates + REPEATER_SURCHARGE])
+    # base[r, s, k] = width[s] * (rates[r, 0] + ... + rates[r, k-1])
+    before = np.concatenate([np.zeros((2, 1)), np.cumsum(rates, axis=1)[:, :-1]], axis=1)
+    base = before[:, None, :] * width[None, :, None]
+    for table in (seasons, thresholds, width, rates, base):
+        table.flags.writeable = False
+    return seasons, thresholds, width, rates, base
+
+
+def _season_rows(season, n):
+    # 赛季 -> 税档表的行号，表中没有的赛季为 -1
+    seasons = tax_table()[0]
+    season = np.broadcast_to(np.asarray(season, dtype=np.int64), (n,))
+    row = np.clip(np.searchsorted(seasons, season), 0, len(seasons) - 1)
+    return np.where(seasons[row] == season, row, -1)
+
+
+def luxury_tax(payroll, season, repeater=False):
+    """
+    奢侈税 (向量化): payroll 为工资总额数组，season / repeater 可以是标量或等长数组
+    超出税线的部分按档累进: 先定位所在档，再用预计算的 "档起点累计税额 + 本档税率 x 档内金额"
+    CBA 表中没有的赛季返回 NaN
+    """
+    payroll = np.atleast_1d(np.asarray(payroll, dtype=np.float64))
+    n = len(payroll)
+    _, thresholds, width, rates, base = tax_table()
+    row = _season_rows(season, n)
+    valid = row >= 0
+    row = np.where(valid, row, 0)
+    rep = np.broadcast_to(np.asarray(repeater, dtype=bool), (n,)).astype(np.int64)
+
+    over = np.maximum(payroll - thresholds[row, 1], 0.0)
+    bracket = np.minimum((over // width[row]).astype(np.int64), rates.shape[1] - 1)
+    tax = base[rep, row, bracket] + rates[rep, bracket] * (over - bracket * width[row])
+    return np.where(valid, tax, np.nan)
+
+
+def apron_level(payroll, season):
+    """薪资状态档位 (0-4，对应 APRON_LEVELS)，表中没有的赛季为 -1"""
+    payroll = np.atleast_1d(np.asarray(payroll, dtype=np.float64))
+    row = _season_rows(season, len(payroll))
+    thresholds = tax_table()[1][np.where(row >= 0, row, 0)]
+    level = (payroll[:, None] > thresholds).sum(axis=1)
+    return np.where(row >= 0, level, -1)
+
+
+def _apron_status(level):
+    return pd.Categorical.from_codes(level, categories=APRON_LEVELS, ordered=True)
+
+
+def _cba_columns(season):
+    row = _season_rows(season, len(season))
+    thresholds = tax_table()[1][np.where(row >= 0, row, 0)]
+    thresholds[row < 0] = np.nan
+    return thresholds[:, 0], thresholds[:, 1]
+
+
+def team_payroll(ledger, repeaters=(), team=None):
+    """
+    由逐个球员的薪资账本汇总出每个 (Team, Season) 的工资总额、薪资状态与奢侈税
+    Payroll = 现役 Cap Hit + 死钱; Cap_Space / Tax_Room 为负表示已超出
+    重复纳税者按账本里的历史 + TAX_HISTORY 自动推断 (前 4 个赛季至少 3 个交税)，
+    所以账本要包含全部赛季一起算，不能逐个赛季单独汇总;
+    其余情况可以通过 repeaters=[(team, season), ...] 显式指定
+    team: 账本没有 Team 列 (单队) 时的 B-Ref 球队代码，用来查 TAX_HISTORY
+    """
+    ledger = apply_schema(ledger, "salary_ledger")
+    if "Team" not in ledger.columns:
+        ledger = ledger.assign(Team=team or "")
+    out = (ledger.assign(Active=ledger["Dead_Money"].fillna(0) == 0)
+           .groupby(["Team", "Season"], observed=True)
+           .agg(Active_Cap=("Cap_Hit", "sum"),
+                Dead_Money=("Dead_Money", "sum"),
+                Player_Count=("Active", "sum"))
+           .reset_index())
+    out["Payroll"] = out["Active_Cap"] + out["Dead_Money"]
+
+    payroll = out["Payroll"].to_numpy(dtype=np.float64)
+    season = out["Season"].to_numpy(dtype=np.int64)
+    cap, tax_line = _cba_columns(season)
+    out["Cap_Space"] = cap - payroll
+    out["Tax_Room"] = tax_line - payroll
+
+    taxpayer = payroll > tax_line
+    team = out["Team"].astype(str).to_numpy()
+    paid = pd.MultiIndex.from_arrays([team[taxpayer], season[taxpayer]])
+    history = [(t, s) for t in pd.unique(team) for s in TAX_HISTORY.get(t, ())]
+    if history:
+        paid = paid.append(pd.MultiIndex.from_tuples(history))
+    prior = sum(pd.MultiIndex.from_arrays([team, season - k]).isin(paid) for k in range(1, 5))
+    forced = pd.MultiIndex.from_arrays([team, season]).isin(
+        pd.MultiIndex.from_tuples(list(repeaters))) if repeaters else False
+    out["Repeater"] = (prior >= 3) | forced
+
+    out["Tax_Bill"] = luxury_tax(payroll, season, out["Repeater"].to_numpy())
+    out["Apron_Status"] = _apron_status(apron_level(payroll, season))
+    return out
+
+
+class RosterScenarios:
+    """
+    单个球队-赛季的 what-if 评估器: 账本只在构造时整理一次成 cap_hits 向量，
+    之后每批情景都是一次矩阵乘法 + 一次查表，一次评估上万种阵容组合
+    """
+
+    def __init__(self, ledger, team, season, repeater=False):
+        ledger = apply_schema(ledger, "salary_ledger")
+        rows = ledger[(ledger["Team"] == team) & (ledger["Season"] == season)] \
+            if "Team" in ledger.columns else ledger[ledger["Season"] == season]
+        dead = rows["Dead_Money"].fillna(0)
+        active = rows[dead == 0]
+        self.team = team
+        self.season = season
+        self.repeater = repeater
+        self.players = active["Player"].astype(str).tolist()
+        self.cap_hits = active["Cap_Hit"].fillna(0).to_numpy(dtype=np.float64)
+        self.dead_money = float(dead.sum())
+
+    def keep_mask(self, drop=()):
+        """现有阵容去掉 drop 中的球员后的保留向量 (1 x 球员数)"""
+        drop = set(drop)
+        return np.array([[p not in drop for p in self.players]])
+
+    def evaluate(self, keep=None, add=0.0, dead=0.0):
+        """
+        keep: (情景数, 球员数) 的 0/1 矩阵，1 表示该情景下保留该球员; None 为现有阵容
+        add: 每个情景新增的薪资 (签约 / 交易换回的合同)，标量或 (情景数,)
+        dead: 每个情景新增的死钱 (裁掉仍需支付的保障合同)，标量或 (情景数,)
+        返回每个情景一行: Payroll / Cap_Space / Tax_Bill / Total_Cost (工资 + 税) / Apron_Status
+        """
+        keep = np.ones((1, len(self.players))) if keep is None else np.atleast_2d(keep)
+        if keep.shape[1] != len(self.players):
+            raise ValueError(f"keep 的列数 ({keep.shape[1]}) 与球员数 ({len(self.players)}) 不一致")
+        payroll = keep.astype(np.float64) @ self.cap_hits + self.dead_money
+        payroll = payroll + np.asarray(add, dtype=np.float64) + np.asarray(dead, dtype=np.float64)
+        cap, _ = _cba_columns(np.full(len(payroll), self.season))
+        tax = luxury_tax(payroll, self.season, self.repeater)
+        return pd.DataFrame({
+            "Payroll": payroll,
+            "Cap_Space": cap - payroll,
+            "Tax_Bill": tax,
+            "Total_Cost": payroll + tax,
+            "Apron_Status": _apron_status(apron_level(payroll, self.season)),
+        })
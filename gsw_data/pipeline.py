@@ -0,0 +1,361 @@
+import ast
+import contextvars
+import glob
+import hashlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from gsw_data import config, metrics
+from gsw_data.paths import dataset_path, source_file
+
+# --- 流水线编排 ---
+# 每个阶段声明: 调用哪个脚本的哪个函数、产出哪些数据集、依赖哪些阶段 / 文件
+# 互不依赖的阶段并行执行 (网络阶段的访问频率仍由各 host 的令牌桶控制)
+# 阶段的代码哈希与输入哈希都没变、且产出文件齐全时直接跳过
+# 代码哈希覆盖: 脚本本身 + 它导入的其他脚本 + 整个 gsw_data 包 (解析 / 校验 / 存储改了都要重跑)
+SCRIPTS_DIR = os.path.join(config.ROOT_DIR, "scripts")
+STATE_FILE = os.path.join(config.ROOT_DIR, "cache", "pipeline_state.json")
+
+BREF_TTL = config.SOURCE_TTL["www.basketball-reference.com"]
+SPOTRAC_TTL = config.SOURCE_TTL["www.spotrac.com"]
+
+
+def import_script(name):
+    """
+    导入 scripts/ 下的脚本模块
+    脚本在真正运行时才导入 (各自会加载 pandas / requests 等)，列出阶段、判断是否跳过都不需要
+    """
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    return importlib.import_module(name)
+
+
+def _script_files(name, seen=None):
+    # 脚本及其 (递归) 导入的同目录脚本，如 get_player_value -> get_salaries / get_ticket_revenue
+    seen = [] if seen is None else seen
+    path = os.path.join(SCRIPTS_DIR, f"{name}.py")
+    if path in seen or not os.path.exists(path):
+        return seen
+    seen.append(path)
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            _script_files(module.split(".")[0], seen)
+    return seen
+
+
+class Stage:
+    """
+    流水线中的一个阶段
+    outputs: 产出的数据集名 (对应 store.DATASET_FILES)
+    deps: 上游阶段; inputs: 额外依赖的静态数据集 (不由任何阶段产出)
+    ttl: 联网阶段的有效期 (秒)，超过后即使代码和输入没变也要重跑; None = 纯本地计算
+    """
+
+    def __init__(self, name, script, func, outputs=(), deps=(), inputs=(), ttl=None, extra_files=()):
+        self.name = name
+        self.script = script
+        self.func = func
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.ttl = ttl
+        self.extra_files = list(extra_files)
+
+    def code_files(self):
+        files = _script_files(self.script) if self.script else []
+        files += [os.path.join(config.ROOT_DIR, f) for f in self.extra_files]
+        files += sorted(glob.glob(os.path.join(config.ROOT_DIR, "gsw_data", "*.py")))
+        return list(dict.fromkeys(files))
+
+    def output_kwargs(self):
+        # 输出路径一律传绝对路径，与当前工作目录无关
+        return {"output_file": dataset_path(self.outputs[0], "csv")} if self.outputs else {}
+
+    def run(self, func=None, **kwargs):
+        """
+        调用阶段函数，输出路径取 output_kwargs()
+        func / kwargs: 命令行子命令用来换一个入口 (如增量刷新赛程) 或追加参数
+        """
+        if self.script:
+            return getattr(import_script(self.script), func or self.func)(**self.output_kwargs(), **kwargs)
+        module, func = (func or self.func).rsplit(".", 1)
+        return getattr(importlib.import_module(module), func)(**kwargs)
+
+
+class TransactionsStage(Stage):
+    def output_kwargs(self):
+        return {"output_file": dataset_path("transactions", "csv"),
+                "events_file": os.path.join(config.DATA_DIR, "gsw_transaction_events.csv")}
+
+
+class SalariesStage(Stage):
+    def output_kwargs(self):
+        return {"output_file": dataset_path("salaries", "csv"),
+                "ledger_file": dataset_path("salary_ledger", "csv")}
+
+
+class PlayerValueStage(Stage):
+    def output_kwargs(self):
+        return {"output_file": dataset_path("player_advanced", "csv"),
+                "summary_file": dataset_path("player_value", "csv")}
+
+
+STAGES = [
+    Stage("schedule", "get_schedule", "get_schedule_multi_year", ["schedule"], ttl=BREF_TTL),
+    Stage("attendance", "get_ticket_revenue", "get_ticket_data_bref", ["attendance"], ttl=BREF_TTL),
+    # 比赛页面全部永久缓存: 只在赛程 (新增场次) 或票价模型变化时重跑
+    Stage("game_attendance", "get_ticket_revenue", "get_game_attendance", ["game_attendance"],
+          deps=["schedule"], extra_files=["gsw_data/pricing.py"]),
+    PlayerValueStage("player_value", "get_player_value", "get_player_value",
+                     ["player_advanced", "player_value"], ttl=BREF_TTL),
+    SalariesStage("salaries", "get_salaries", "get_salaries_hardcore", ["salaries", "salary_ledger"],
+                  ttl=SPOTRAC_TTL, extra_files=["gsw_data/payroll.py"]),
+    Stage("draft", "get_transactions_and_draft", "get_draft_history", ["draft"], ttl=BREF_TTL),
+    TransactionsStage("transactions", "get_transactions_and_draft", "get_transaction_activity",
+                      ["transactions"], ttl=BREF_TTL),
+    # 纯本地: Forbes 重构与未来选秀权都是硬编码数据，不联网
+    Stage("financing", "get_finance_structure", "generate_financing_data", ["financing"]),
+    Stage("future_assets", "get_transactions_and_draft", "generate_future_assets", ["future_assets"]),
+    # 下游: 蒙特卡洛财务推演 (纯本地，门票数据有则用、没有不阻塞)
+    Stage("finance_sim", "simulate_finance", "simulate_finance", ["finance_bands"],
+          deps=["financing", "schedule", "salaries"], inputs=["attendance"],
+          extra_files=["gsw_data/simulate.py", "gsw_data/payroll.py"]),
+    # 下游: 预计算赛季级联表 (写入 cache/views/)
+    Stage("season_view", None, "gsw_data.loader.season_view",
+          deps=["schedule", "salaries", "financing", "player_value"],
+          extra_files=["gsw_data/loader.py"]),
+]
+STAGE_INDEX = {stage.name: stage for stage in STAGES}
+# 摘要 / list 输出的阶段名列宽: 最长的阶段名 (game_attendance) 之后至少留两个空格
+NAME_WIDTH = max(len(stage.name) for stage in STAGES) + 2
+
+
+# --- 哈希与状态 ---
+def _hash_files(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        else:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def code_hash(stage):
+    return _hash_files(stage.code_files())
+
+
+def input_hash(stage):
+    """上游阶段产出 + 静态输入文件的内容哈希 (内容不变则上游重跑也不会触发本阶段)"""
+    datasets = [d for dep in stage.deps for d in STAGE_INDEX[dep].outputs] + stage.inputs
+    return _hash_files([source_file(d) for d in datasets])
+
+
+def _output_files(stage):
+    return [source_file(d) for d in stage.outputs]
+
+
+def _output_mtimes(stage):
+    return [os.stat(p).st_mtime_ns if os.path.exists(p) else None for p in _output_files(stage)]
+
+
+_state_lock = threading.Lock()
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def pending_checkpoint(stage):
+    """
+    本阶段的产出还有未完成的断点清单 (见 gsw_data.checkpoint): 上次运行有单元失败，
+    脚本只打印日志、照常合并了已完成的单元，清单保留待续跑 -> 产出是不完整的
+    """
+    for dataset in stage.outputs:
+        target = os.path.abspath(dataset_path(dataset, "csv"))
+        for path in glob.glob(os.path.join(config.CHECKPOINT_DIR, f"{dataset}-*", "manifest.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if (os.path.abspath(manifest.get("output", "")) == target
+                    and time.time() - manifest.get("created", 0) <= config.CHECKPOINT_MAX_AGE):
+                return True
+    return False
+
+
+def stale_reason(stage, state):
+    """阶段需要重跑的原因，已是最新时返回 None"""
+    record = state.get(stage.name)
+    if not record:
+        return "从未运行"
+    if not all(os.path.exists(p) for p in _output_files(stage)):
+        return "产出文件缺失"
+    if pending_checkpoint(stage):
+        return "上次未完成"
+    if record.get("code") != code_hash(stage):
+        return "代码已修改"
+    if record.get("inputs") != input_hash(stage):
+        return "上游数据已变化"
+    if stage.ttl is not None and time.time() - record.get("finished_at", 0) > stage.ttl:
+        return "超过有效期"
+    return None
+
+
+# --- 选择与调度 ---
+def downstream(names):
+    """names 及其全部下游阶段"""
+    selected = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for stage in STAGES:
+            if stage.name not in selected and any(dep in selected for dep in stage.deps):
+                selected.add(stage.name)
+                changed = True
+    return selected
+
+
+def select_stages(only=None, since=None):
+    """
+    only: 只运行这些阶段 (上游视为已完成，不会被带上)
+    since: 从这些阶段开始，连同全部下游一起强制重跑
+    返回 (按声明顺序排列的阶段名, 强制重跑的阶段名集合)
+    """
+    for name in list(only or []) + list(since or []):
+        if name not in STAGE_INDEX:
+            raise ValueError(f"未知的阶段: {name} (可选: {', '.join(STAGE_INDEX)})")
+    selected = set(only) if only else set(STAGE_INDEX)
+    forced = set()
+    if since:
+        forced = downstream(since)
+        selected = selected & forced if only else forced
+    return [s.name for s in STAGES if s.name in selected], forced
+
+
+class IncompleteStage(RuntimeError):
+    """阶段写出了产出，但还有单元未完成 (断点清单保留)"""
+
+
+def _run_stage(stage):
+    before = _output_mtimes(stage)
+    start = time.perf_counter()
+    with metrics.stage(stage.name):
+        stage.run()
+    elapsed = time.perf_counter() - start
+    # 脚本内部会吞掉网络异常只打印日志，这里以"产出文件是否被写出"判断成败
+    after = _output_mtimes(stage)
+    if stage.outputs and (None in after or after == before):
+        raise RuntimeError("阶段结束但没有写出新的产出文件")
+    if pending_checkpoint(stage):
+        raise IncompleteStage("部分单元未完成 (已完成的部分已写出，重跑时续跑其余单元)")
+    return elapsed
+
+
+def run_pipeline(only=None, since=None, force=False, max_workers=None, dry_run=False):
+    """
+    按依赖关系并行执行流水线，返回 {阶段名: (状态, 说明)}
+    状态: ran / skipped / incomplete (部分单元失败，不记为完成，下游照常运行) /
+          failed / blocked (上游失败) / planned (dry_run)
+    运行指标 (各阶段耗时、下载字节数、重试等) 写入 METRICS_DIR，见 gsw_data.metrics
+    """
+    if dry_run:
+        return _run_pipeline(only, since, force, max_workers, dry_run)
+    with metrics.run("pipeline"):
+        return _run_pipeline(only, since, force, max_workers, dry_run)
+
+
+def _run_pipeline(only, since, force, max_workers, dry_run):
+    names, forced = select_stages(only, since)
+    state = load_state()
+    deps = {name: [d for d in STAGE_INDEX[name].deps if d in names] for name in names}
+    results = {}
+    running = {}
+    max_workers = max_workers or config.MAX_WORKERS
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while len(results) < len(names):
+            for name in names:
+                if name in results or name in running.values():
+                    continue
+                if any(d not in results for d in deps[name]):
+                    continue
+                if any(results[d][0] in ("failed", "blocked") for d in deps[name]):
+                    results[name] = ("blocked", "上游阶段失败")
+                    print(f"   ⛔ {name}: 上游阶段失败，跳过")
+                    continue
+                stage = STAGE_INDEX[name]
+                reason = "强制重跑" if force or name in forced else stale_reason(stage, state)
+                if reason is None:
+                    results[name] = ("skipped", "已是最新")
+                    print(f"   ⏭️ {name}: 代码与输入均未变化，跳过")
+                    continue
+                if dry_run:
+                    results[name] = ("planned", reason)
+                    print(f"   📝 {name}: 将会运行 ({reason})")
+                    continue
+                print(f"   ▶️ {name}: 开始运行 ({reason})")
+                running[pool.submit(contextvars.copy_context().run, _run_stage, stage)] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    elapsed = future.result()
+                except IncompleteStage as e:
+                    # 不记录状态: 下次运行不会因为"代码与输入未变化"而跳过它
+                    with _state_lock:
+                        if state.pop(name, None) is not None:
+                            _save_state(state)
+                    results[name] = ("incomplete", str(e)[:100])
+                    print(f"   ⚠️ {name}: {e}")
+                    continue
+                except Exception as e:
+                    results[name] = ("failed", str(e)[:100])
+                    print(f"   ❌ {name}: 失败 - {str(e)[:100]}")
+                    continue
+                stage = STAGE_INDEX[name]
+                with _state_lock:
+                    state[name] = {"code": code_hash(stage), "inputs": input_hash(stage),
+                                   "finished_at": time.time(), "seconds": round(elapsed, 3)}
+                    _save_state(state)
+                results[name] = ("ran", f"{elapsed:.1f}s")
+                print(f"   ✅ {name}: 完成 ({elapsed:.1f}s)")
+    return {name: results[name] for name in names}
+
+
+def print_summary(results):
+    print("\n📋 流水线结果:")
+    status_width = max((len(status) for status, _ in results.values()), default=0) + 2
+    for name, (status, detail) in results.items():
+        print(f"   {name:<{NAME_WIDTH}}{status:<{status_width}}{detail}")
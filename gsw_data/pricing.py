@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+# --- 逐场票价模型 ---
+# 票价 = 赛季基准价 x 对手系数 x 星期系数 x 近况系数
+#   赛季基准价: BASE_TICKET_PRICE x (1 + 通胀)^(赛季 - 基准赛季) x 赛季系数 (夺冠年更贵)
+#   对手系数: 1 + opp_beta x (对手胜率 - 0.5) + 焦点对手溢价 (湖人 / 凯尔特人等)
+#   星期系数: 周五 / 周六晚场最贵，周一至周三最便宜
+#   近况系数: 1 + form_beta x (赛前近 10 场胜率 - 0.5)
+# 门票收入 = 上座人数 x 票价; 所有场次一次性数组运算，换一套参数重新定价只需几毫秒
+
+DEFAULT_PRICING = {
+    "base_price": 280.0,       # 勇士队平均票价极高 (美元)，与 get_ticket_revenue.BASE_TICKET_PRICE 一致
+    "base_season": 2022,
+    "inflation": 0.05,         # 票价每年涨 5%
+    "season_factor": {2022: 1.2},
+    "opp_beta": 0.5,
+    "marquee": {"LAL": 0.15, "BOS": 0.10, "NYK": 0.05},
+    # 周一 ... 周日
+    "weekday_factor": (0.95, 0.95, 0.97, 1.00, 1.08, 1.12, 1.05),
+    "form_beta": 0.4,
+}
+
+
+class GatePricer:
+    """
+    逐场门票收入的定价器: 构造时把场次特征整理成数组 (只做一次)，
+    之后每次 price() / revenue() 都只是几次向量运算，便于反复调整假设
+    games 需要的列: Season, Date, Attendance, Opp_Win_Pct, Pre_Game_Win_Rate_10, Opp_Code (可选)
+    """
+
+    def __init__(self, games):
+        self.games = games.reset_index(drop=True)
+        self.season = self.games["Season"].to_numpy(dtype=np.int64)
+        self.weekday = pd.to_datetime(self.games["Date"]).dt.weekday.to_numpy()
+        self.attendance = self.games["Attendance"].to_numpy(dtype=np.float64, na_value=0.0)
+        self.opp_win_pct = self.games["Opp_Win_Pct"].to_numpy(dtype=np.float64, na_value=0.5)
+        self.form = self.games["Pre_Game_Win_Rate_10"].to_numpy(dtype=np.float64, na_value=0.5)
+        opp = self.games["Opp_Code"] if "Opp_Code" in self.games.columns else pd.Series("", index=self.games.index)
+        self.opp_codes, self.opp_levels = pd.factorize(opp.astype(str))
+        self.seasons, self.season_codes = np.unique(self.season, return_inverse=True)
+
+    def price(self, params=None):
+        """每场的估算平均票价 (美元)"""
+        p = {**DEFAULT_PRICING, **(params or {})}
+        season_factor = np.array([p["season_factor"].get(s, 1.0) for s in self.seasons])[self.season_codes]
+        base = p["base_price"] * (1 + p["inflation"]) ** (self.season - p["base_season"]) * season_factor
+        marquee = np.array([p["marquee"].get(code, 0.0) for code in self.opp_levels])
+        marquee = marquee[self.opp_codes] if len(marquee) else 0.0
+        opponent = 1 + p["opp_beta"] * (self.opp_win_pct - 0.5) + marquee
+        weekday = np.asarray(p["weekday_factor"], dtype=np.float64)[self.weekday]
+        form = 1 + p["form_beta"] * (self.form - 0.5)
+        return base * opponent * weekday * form
+
+    def revenue(self, params=None):
+        """每场门票收入 (百万美元)"""
+        return self.attendance * self.price(params) / 1_000_000
+
+    def season_revenue(self, params=None):
+        """按赛季汇总的门票收入 (百万美元)，返回 Series(index=Season)"""
+        totals = np.bincount(self.season_codes, weights=self.revenue(params), minlength=len(self.seasons))
+        return pd.Series(totals, index=pd.Index(self.seasons, name="Season"), name="Gate_Revenue_M")
+
+    def priced(self, params=None):
+        """原始场次数据加上 Est_Ticket_Price / Gate_Revenue_M 两列"""
+        price = self.price(params)
+        return self.games.assign(Est_Ticket_Price=price.round(2),
+                                 Gate_Revenue_M=(self.attendance * price / 1_000_000).round(4))
@@ -0,0 +1,216 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from gsw_data import config
+from gsw_data.ratelimit import get_bucket
+from gsw_data.retry import retry_after_seconds
+
+# --- 代理池 ---
+# 每个代理记录: 延迟 (EWMA)、错误率 (EWMA)、在途请求数、各 host 的封禁期、连续连接失败次数
+# 每个请求挑选当前得分最低的代理:
+#   得分 = 令牌桶还要等多久 + 延迟 x (1 + 在途请求数)，再按错误率放大
+#   被该 host 封禁 (403 / 429) 或宕机 (连续连接失败) 的代理不参与挑选
+# 代理满载 (在途请求数达到上限) 时等待有空位; 全部代理都被封时选最早解封的那个
+# 令牌桶的等待在占用并发名额之前完成: 排队等令牌的请求不挡住走同一代理的其他 host
+# 限速按 (host, 代理) 计算 (见 ratelimit.get_bucket)，代理越多总吞吐越高
+
+EWMA_ALPHA = 0.2
+# 这些状态码说明出口 IP 被目标站限流 / 拦截: 换代理，当前代理在该 host 上冷却
+BAN_STATUS = {403, 429}
+# 连不上代理本身 (而不是目标站出错) 的异常
+_PROXY_ERRORS = (requests.exceptions.ProxyError, requests.exceptions.ConnectTimeout)
+
+
+class Proxy:
+    """代理池里的一个出口 (url=None 表示直连)"""
+
+    def __init__(self, url, max_concurrency=None):
+        self.url = url
+        self.max_concurrency = max_concurrency or config.PROXY_MAX_CONCURRENCY
+        self.in_flight = 0
+        self.latency = 0.0       # 秒，EWMA; 初始为 0，新代理会被优先试用
+        self.error_rate = 0.0    # EWMA
+        self.samples = 0
+        self.failures = 0        # 连续连接失败次数
+        self.down_until = 0.0
+        self.banned_until = {}   # host -> 解封时间 (monotonic)
+        self.stats = {"requests": 0, "errors": 0, "bans": 0}
+
+    @property
+    def name(self):
+        return self.url or "直连"
+
+    def available(self, host, now):
+        return self.down_until <= now and self.banned_until.get(host, 0.0) <= now
+
+    def score(self, host):
+        wait = get_bucket(host, self.url).delay()
+        return (wait + self.latency * (1 + self.in_flight)) * (1 + 10 * self.error_rate)
+
+    def _observe(self, error, latency=None):
+        self.error_rate += EWMA_ALPHA * (float(error) - self.error_rate)
+        if latency is not None:
+            self.latency = latency if not self.samples else self.latency + EWMA_ALPHA * (latency - self.latency)
+            self.samples += 1
+
+
+class ProxyPool:
+    """
+    按健康度路由请求的代理池 (线程安全)
+    urls: 代理地址列表，为空时池里只有一个"直连"出口 (行为与不用代理池相同)
+    sticky_hosts: 这些 host 固定走同一个代理，直到它被封或宕机
+    """
+
+    def __init__(self, urls, max_concurrency=None, sticky_hosts=None):
+        self.endpoints = tuple(urls or ())
+        self.proxies = [Proxy(url, max_concurrency) for url in (urls or [None])]
+        self.sticky_hosts = set(config.PROXY_STICKY_HOSTS if sticky_hosts is None else sticky_hosts)
+        self.sticky = {}
+        self.cond = threading.Condition()
+
+    def describe(self):
+        if self.proxies[0].url is None:
+            return "直连"
+        if len(self.proxies) == 1:
+            return self.proxies[0].url
+        return f"{len(self.proxies)} 个代理"
+
+    def _pick(self, host, now):
+        # 返回 None 表示需要等待空位
+        healthy = [p for p in self.proxies if p.available(host, now)]
+        if host in self.sticky_hosts:
+            current = self.sticky.get(host)
+            if current in healthy:
+                # 粘性代理满载时排队等它，不换出口
+                return current if current.in_flight < current.max_concurrency else None
+        if healthy:
+            # 有健康的代理时只在它们之间挑，满载就等，不把请求派给被封的代理
+            free = [p for p in healthy if p.in_flight < p.max_concurrency]
+            if not free:
+                return None
+            best = min(free, key=lambda p: p.score(host))
+        else:
+            # 全部被封 / 宕机: 选最早恢复的那个 (熔断器仍会按 host 兜底)
+            free = [p for p in self.proxies if p.in_flight < p.max_concurrency]
+            if not free:
+                return None
+            best = min(free, key=lambda p: max(p.down_until, p.banned_until.get(host, 0.0)))
+        if host in self.sticky_hosts:
+            self.sticky[host] = best
+        return best
+
+    def _reserve(self, host):
+        with self.cond:
+            while True:
+                proxy = self._pick(host, time.monotonic())
+                if proxy is not None:
+                    # 在池锁内预约令牌，避免多个线程同时看中同一个"空闲"的代理
+                    # (预约后该代理的 delay() 变大，下一个线程的得分随之变化)
+                    return proxy, get_bucket(host, proxy.url).reserve()
+                self.cond.wait(timeout=1.0)
+
+    def _occupy(self, proxy):
+        # 令牌等待结束后才占用并发名额; 等待期间名额被别的请求占满时排队
+        with self.cond:
+            while proxy.in_flight >= proxy.max_concurrency:
+                self.cond.wait(timeout=1.0)
+            proxy.in_flight += 1
+            proxy.stats["requests"] += 1
+
+    def _release(self, proxy):
+        with self.cond:
+            proxy.in_flight -= 1
+            # 等待挑选代理的和等令牌后占名额的请求都可能在等这个空位，全部唤醒
+            self.cond.notify_all()
+
+    @contextmanager
+    def lease(self, host):
+        """
+        为一次请求借出一个代理: with pool.lease(host) as (proxy, wait): ...
+        先按该代理的令牌桶预约并等待 wait 秒 (不占用并发名额，其他 host 仍可使用这个代理)，
+        再占用一个并发名额，with 块结束时归还
+        """
+        proxy, wait = self._reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+        self._occupy(proxy)
+        try:
+            yield proxy, wait
+        finally:
+            self._release(proxy)
+
+    def record(self, proxy, host, result, latency):
+        """记录一次请求的结果 (Response 或异常)，更新该代理的健康度"""
+        now = time.monotonic()
+        with self.cond:
+            if isinstance(result, Exception):
+                proxy.stats["errors"] += 1
+                proxy._observe(True)
+                if isinstance(result, _PROXY_ERRORS):
+                    proxy.failures += 1
+                    if proxy.failures >= config.PROXY_MAX_FAILURES:
+                        proxy.down_until = now + config.PROXY_DOWN_COOLDOWN
+                return
+            proxy.failures = 0
+            if result.status_code in BAN_STATUS:
+                proxy.stats["bans"] += 1
+                proxy._observe(True)
+                cooldown = retry_after_seconds(result)
+                proxy.banned_until[host] = now + (config.PROXY_BAN_COOLDOWN if cooldown is None else cooldown)
+                return
+            proxy._observe(result.status_code >= 500, latency)
+
+    def any_available(self, host):
+        """还有没有未被该 host 封禁、也没宕机的代理 (有的话 429 不必等 Retry-After，换代理即可)"""
+        now = time.monotonic()
+        with self.cond:
+            return any(p.available(host, now) for p in self.proxies)
+
+    def snapshot(self):
+        """各代理的健康度快照: [{proxy, in_flight, latency_ms, error_rate, requests, errors, bans, down}]"""
+        now = time.monotonic()
+        with self.cond:
+            return [{
+                "proxy": p.name,
+                "in_flight": p.in_flight,
+                "latency_ms": round(p.latency * 1000, 1),
+                "error_rate": round(p.error_rate, 3),
+                **p.stats,
+                "down": p.down_until > now,
+                "banned_hosts": sorted(h for h, t in p.banned_until.items() if t > now),
+            } for p in self.proxies]
+
+
+def format_pool(snapshot=None):
+    snapshot = get_pool().snapshot() if snapshot is None else snapshot
+    return "\n".join(
+        f"   🛰️ {s['proxy']}: 请求 {s['requests']} 次 | 延迟 {s['latency_ms']:.0f}ms | "
+        f"错误率 {s['error_rate']:.0%} | 被封 {s['bans']} 次"
+        + (" | 宕机" if s["down"] else "")
+        + (f" | 冷却中: {', '.join(s['banned_hosts'])}" if s["banned_hosts"] else "")
+        for s in snapshot
+    )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _endpoints():
+    return tuple(config.REPLAY_PROXIES if config.REPLAY_URL else config.PROXY_POOL)
+
+
+def get_pool():
+    """
+    进程内共享的代理池 (懒加载)，代理列表取自 config.PROXY_POOL (回放模式下为 REPLAY_PROXIES)
+    配置在运行中被修改时 (如基准测试切换替身代理) 自动重建
+    """
+    global _pool
+    endpoints = _endpoints()
+    with _pool_lock:
+        if _pool is None or _pool.endpoints != endpoints:
+            _pool = ProxyPool(list(endpoints))
+        return _pool
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from gsw_data import config
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+    rate: 每秒补充的令牌数; burst: 桶容量 (允许的突发请求数)
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """预约一个令牌 (允许透支)，返回需要等待的秒数，不在这里 sleep"""
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def delay(self):
+        """现在预约的话需要等待多久 (只查看，不消耗令牌)"""
+        with self.lock:
+            self._refill()
+            return (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+
+    def acquire(self):
+        # 先在锁内"预约"一个令牌，再在锁外等待，避免持锁 sleep
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host, proxy=None):
+    """(host, 代理) 的令牌桶: 目标站按出口 IP 限流，每个代理各有一份 host 的速率预算"""
+    key = (host, proxy)
+    with _buckets_lock:
+        if key not in _buckets:
+            rate, burst = config.HOST_RATE_LIMITS.get(host, config.DEFAULT_RATE_LIMIT)
+            _buckets[key] = TokenBucket(rate, burst)
+        return _buckets[key]
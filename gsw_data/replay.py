@@ -0,0 +1,342 @@
+import datetime
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from gsw_data import config
+from gsw_data.fetch import _read_cache, fetch
+
+# --- 夹具 (Fixture) 目录 ---
+# 原始 HTML 按 {host}/{path} 存放，例如:
+#   fixtures/www.basketball-reference.com/teams/GSW/2024_games.html
+#   fixtures/www.spotrac.com/nba/golden-state-warriors/cap/_/year/2023
+FIXTURE_DIR = os.path.join(config.ROOT_DIR, "fixtures")
+
+
+def fixture_path(url, fixture_dir=FIXTURE_DIR):
+    parts = urlparse(url)
+    path = parts.path.lstrip("/") or "index.html"
+    return os.path.join(fixture_dir, parts.netloc, *path.split("/"))
+
+
+def record(urls, fixture_dir=FIXTURE_DIR, from_cache=False):
+    """
+    把真实页面快照成夹具
+    from_cache=True 时只从 HTTP 缓存复制 (不联网)，否则走 fetch (缓存未命中才联网)
+    返回成功录制的 URL 列表
+    """
+    recorded = []
+    for url in urls:
+        if from_cache:
+            body, _ = _read_cache(url)
+            if body is None:
+                print(f"   ⚠️ 缓存中没有: {url}")
+                continue
+        else:
+            response = fetch(url, timeout=20, verify=False)
+            if response.status_code != 200:
+                print(f"   ⚠️ HTTP {response.status_code}: {url}")
+                continue
+            body = response.content
+        path = fixture_path(url, fixture_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+        recorded.append(url)
+    return recorded
+
+
+class FixtureServer:
+    """
+    本地夹具服务器 (替身 HTTP 服务)，配合 GSW_REPLAY_URL / config.REPLAY_URL 使用
+
+    latency: 每个请求的固定延迟 (秒); jitter: 额外的随机延迟上限
+    errors: 故障注入概率，如 {"429": 0.1, "eof": 0.05, "timeout": 0.02}
+        429     -> 返回 429 + Retry-After
+        eof     -> 不回包直接断开连接 (模拟 SSLEOFError / RemoteDisconnected)
+        timeout -> 挂起 hang_seconds 秒后才响应 (触发客户端超时)
+
+        with FixtureServer("fixtures", latency=0.05) as server:
+            config.REPLAY_URL = server.url
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, latency=0.0, jitter=0.0, errors=None,
+                 retry_after=1, hang_seconds=30, seed=None, port=0):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = dict(errors or {})
+        self.retry_after = retry_after
+        self.hang_seconds = hang_seconds
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.stats = {"requests": 0, "200": 0, "404": 0, "429": 0, "eof": 0, "timeout": 0}
+        self.stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self):
+        # 依次按概率决定本次请求注入哪种故障 (None = 正常)
+        with self.rng_lock:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            roll = self.rng.random()
+        for kind in ("429", "eof", "timeout"):
+            p = self.errors.get(kind, 0)
+            if roll < p:
+                return delay, kind
+            roll -= p
+        return delay, None
+
+    def _count(self, kind):
+        with self.stats_lock:
+            self.stats[kind] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._count("requests")
+                delay, fault = server._draw()
+                if delay:
+                    time.sleep(delay)
+
+                if fault == "eof":
+                    server._count("eof")
+                    self.close_connection = True
+                    return
+                if fault == "timeout":
+                    server._count("timeout")
+                    time.sleep(server.hang_seconds)
+                if fault == "429":
+                    server._count("429")
+                    self._send(429, b"Too Many Requests", {"Retry-After": str(server.retry_after)})
+                    return
+
+                server._serve(self)
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端已超时断开 (timeout 故障注入的正常结果)
+                    pass
+
+        return Handler
+
+    def _serve(self, handler):
+        path = os.path.join(self.fixture_dir, *urlparse(handler.path).path.lstrip("/").split("/"))
+        if not os.path.isfile(path):
+            self._count("404")
+            handler._send(404, b"Not Found")
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        self._count("200")
+        handler._send(200, body)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ProxyServer(FixtureServer):
+    """
+    本地替身代理 (HTTP 正向代理)，配合 GSW_REPLAY_PROXIES / config.REPLAY_PROXIES 测试代理池
+
+    收到 "GET http://夹具服务器/..." 后转发给夹具服务器并原样返回
+    latency / jitter / errors 的含义与 FixtureServer 相同 (故障发生在代理这一跳)
+    max_rate: 模拟目标站按出口 IP 限流，经这个代理的请求超过 max_rate 次/秒就返回 429
+
+        with FixtureServer(...) as site, ProxyServer(max_rate=5) as proxy:
+            config.REPLAY_URL = site.url
+            config.REPLAY_PROXIES = [proxy.url]
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, errors=None, max_rate=None, retry_after=1,
+                 hang_seconds=30, seed=None, port=0):
+        super().__init__(None, latency, jitter, errors, retry_after, hang_seconds, seed, port)
+        self.max_rate = max_rate
+        self.window = []
+        self.stats["forwarded"] = 0
+
+    def _over_rate(self):
+        # 滑动 1 秒窗口计数
+        if not self.max_rate:
+            return False
+        now = time.monotonic()
+        with self.stats_lock:
+            self.window = [t for t in self.window if now - t < 1.0]
+            if len(self.window) >= self.max_rate:
+                return True
+            self.window.append(now)
+            return False
+
+    def _serve(self, handler):
+        if self._over_rate():
+            self._count("429")
+            handler._send(429, b"Too Many Requests", {"Retry-After": str(self.retry_after)})
+            return
+        # 代理请求的请求行是完整 URL，直连夹具服务器转发 (不经过系统代理)
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        try:
+            with opener.open(handler.path, timeout=self.hang_seconds) as upstream:
+                status, body = upstream.status, upstream.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        self._count("forwarded")
+        self._count("200" if status == 200 else "404")
+        handler._send(status, body)
+
+
+# --- 合成夹具 ---
+# 没有录制好的真实页面时，按 B-Ref / Spotrac 的页面结构生成等价的合成页面，
+# 保证基准测试在任何环境下都能跑 (规模可调，用于发现解析性能回退)
+_FILLER = "<div class='filler'>" + "<p>lorem ipsum dolor sit amet</p>" * 200 + "</div>"
+
+
+def _synthetic_games(n_games, season):
+    # (场次, 日期, 是否主场): 奇数场为客场
+    months = ["Oct", "Nov", "Dec", "Jan", "Feb", "Mar", "Apr"]
+    for i in range(1, n_games + 1):
+        month = months[i * 7 // (n_games + 1)]
+        year = season - 1 if month in ("Oct", "Nov", "Dec") else season
+        yield i, datetime.datetime.strptime(f"{month} {1 + i % 28} {year}", "%b %d %Y"), i % 2 == 0
+
+
+def _games_page(n_games, season):
+    rows = []
+    for i, date, home in _synthetic_games(n_games, season):
+        rows.append(
+            f"<tr><th>{i}</th><td>Tue, {date:%b} {date.day}, {date.year}</td><td>7:30p</td><td></td>"
+            f"<td><a>Box Score</a></td><td>{'' if home else '@'}</td><td>Team {i % 29}</td>"
+            f"<td>{'W' if i % 3 else 'L'}</td><td></td><td>{100 + i % 20}</td><td>{98 + i % 17}</td></tr>"
+        )
+    return (
+        f"<html><body>{_FILLER}<table id='games'><thead><tr><th>G</th><th>Date</th><th>Start (ET)</th>"
+        "<th></th><th></th><th></th><th>Opponent</th><th></th><th></th><th>Tm</th><th>Opp</th></tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table>{_FILLER}</body></html>"
+    )
+
+
+_OPPONENTS = ["ATL", "BOS", "BRK", "CHO", "CHI", "CLE", "DAL", "DEN", "DET", "HOU", "IND", "LAC", "LAL",
+              "MEM", "MIA", "MIL", "MIN", "NOP", "NYK", "OKC", "ORL", "PHI", "PHO", "POR", "SAC", "SAS",
+              "TOR", "UTA", "WAS"]
+
+
+def _boxscore_page(i, season, team_code):
+    # scorebox (客队在前，带各自战绩) + 底部的 Attendance 一行
+    opp, wins = _OPPONENTS[i % 29], i // 2
+    return (f"<html><body><div class='scorebox'><div><strong><a href=\"/teams/{opp}/{season}.html\">Team {i % 29}"
+            f"</a></strong><div class='scores'><div class='score'>98</div></div><div>{wins}-{i - wins}</div></div>"
+            f"<div><strong><a href=\"/teams/{team_code}/{season}.html\">Golden State</a></strong>"
+            f"<div class='scores'><div class='score'>100</div></div><div>{i - 1}-1</div></div></div>{_FILLER}"
+            f"<div><strong>Attendance:</strong>&nbsp;{18_064 - i * 7 % 900:,}</div></body></html>")
+
+
+def _season_page():
+    misc = (
+        "<table id='team_misc'><thead><tr><th></th><th>Attendance</th><th>Attend./G</th></tr></thead>"
+        "<tbody><tr><th>Team</th><td>740624</td><td>18064</td></tr>"
+        "<tr><th>Lg Rank</th><td>5</td><td>5</td></tr></tbody></table>"
+    )
+    advanced = "".join(
+        f"<tr><th>{i + 1}</th><td>Player {i}</td><td>{22 + i % 12}</td><td>{40 + i % 40}</td>"
+        f"<td>{300 + i * 150}</td><td>{10 + i % 15}.{i % 10}</td><td>{i % 9}.{i % 7}</td>"
+        f"<td>.{100 + i * 7 % 150}</td><td>{i % 7 - 3}.{i % 10}</td><td>{i % 4}.{i % 10}</td></tr>"
+        for i in range(17)
+    )
+    advanced = ("<table id='advanced'><thead><tr><th>Rk</th><th>Player</th><th>Age</th><th>G</th>"
+                "<th>MP</th><th>PER</th><th>WS</th><th>WS/48</th><th>BPM</th><th>VORP</th></tr></thead>"
+                f"<tbody>{advanced}</tbody></table>")
+    # 与 B-Ref 一致: 目标表格藏在 HTML 注释里，前面还有若干其他表格
+    other = "".join(f"<!-- <table id='t{i}'><tr><td>{i}</td></tr></table> -->" for i in range(20))
+    return (f"<html><body>{_FILLER}{other}<!--\n{misc}\n--><!--\n{advanced}\n-->"
+            f"{_FILLER}</body></html>")
+
+
+def _cap_page(n_players=15):
+    # 现役名单 (带合计行) + 死钱表，与 Spotrac 的页面结构一致
+    options = ["", "", "Player Option", "", "Team Option"]
+    rows = "".join(f"<tr><td>Player {i}</td><td>{'GFC'[i % 3]}</td><td>${(2_000_000 + i * 1_000_000):,}</td>"
+                   f"<td>{options[i % 5]}</td></tr>" for i in range(n_players))
+    total = sum(2_000_000 + i * 1_000_000 for i in range(n_players))
+    dead = "".join(f"<tr><td>Waived {i}</td><td>${(1_500_000 + i * 500_000):,}</td></tr>" for i in range(2))
+    return (f"<html><body>{_FILLER}<table><caption>Active Roster</caption><thead><tr><th>Player</th>"
+            f"<th>Pos</th><th>Cap Hit</th><th>Option</th></tr></thead><tbody>{rows}</tbody>"
+            f"<tfoot><tr><td>Totals</td><td></td><td>${total:,}</td><td></td></tr></tfoot></table>"
+            "<table><caption>Dead Cap</caption><thead><tr><th>Player</th><th>Cap Hit</th></tr></thead>"
+            f"<tbody>{dead}</tbody></table>{_FILLER}</body></html>")
+
+
+def _draft_page(n_years=60):
+    rows = "".join(f"<tr><th>{2025 - i}</th><td>{1 + i % 2}</td><td>{1 + i % 30}</td>"
+                   f"<td>Player {i}</td><td>College {i % 40}</td></tr>" for i in range(n_years))
+    return ("<html><body><table id='draft'><thead><tr><th>Year</th><th>Round</th><th>Pick</th>"
+            f"<th>Player</th><th>College</th></tr></thead><tbody>{rows}</tbody></table></body></html>")
+
+
+def _transactions_page(n_days=3000):
+    months = ["January", "February", "March", "June", "July", "October", "December"]
+    items = "".join(
+        f"<li><span>{months[i % 7]} {1 + i % 28}, {1950 + i * 75 // n_days}</span>: "
+        "<p>Traded <a>A</a> to the <a>X</a> for <a>B</a>.</p>"
+        "<p>Signed <a>C</a> to a 2-year contract.</p></li>"
+        for i in range(n_days)
+    )
+    return f"<html><body><ul class='page_index'>{items}</ul></body></html>"
+
+
+def make_synthetic_fixtures(fixture_dir=FIXTURE_DIR, team_code="GSW", team_slug="golden-state-warriors",
+                            seasons=range(2021, 2026), n_games=82):
+    """生成一套合成夹具，返回写入的 URL 列表"""
+    bref = "https://www.basketball-reference.com/teams"
+    pages = {f"{bref}/{team_code}/draft.html": _draft_page(),
+             f"{bref}/{team_code}/transactions.html": _transactions_page()}
+    for season in seasons:
+        pages[f"{bref}/{team_code}/{season}_games.html"] = _games_page(n_games, season)
+        for i, date, home in _synthetic_games(n_games, season):
+            if home:
+                pages[f"https://www.basketball-reference.com/boxscores/{date:%Y%m%d}0{team_code}.html"] = \
+                    _boxscore_page(i, season, team_code)
+        pages[f"{bref}/{team_code}/{season}.html"] = _season_page()
+        pages[f"https://www.spotrac.com/nba/{team_slug}/cap/_/year/{season - 1}"] = _cap_page()
+    for url, html in pages.items():
+        path = fixture_path(url, fixture_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+    return list(pages)
@@ -0,0 +1,145 @@
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+from gsw_data import config
+
+# --- 失败分类 ---
+# 暂时性失败 (值得重试): 限流 / 服务端错误 / 连接断开 / 超时
+# 永久性失败 (不重试): 404 等其他状态码、离线缓存缺失、表格结构变化 (解析抛 ValueError)
+_TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,   # 含 SSLError / ProxyError / RemoteDisconnected
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """该 host 的熔断器处于打开状态，请求被直接拒绝"""
+
+
+def is_transient(result):
+    """判断一次请求的结果 (Response 或异常) 是否为暂时性失败"""
+    if isinstance(result, requests.Response):
+        return result.status_code in config.RETRY_STATUS
+    if isinstance(result, CircuitOpenError):
+        return False
+    return isinstance(result, _TRANSIENT_ERRORS)
+
+
+def retry_after_seconds(response):
+    """解析 Retry-After 头 (秒数或 HTTP 日期)，没有或无法解析时返回 None"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """
+    指数退避 + 全抖动 (full jitter): 在 [0, min(cap, base * 2^(attempt-1))] 内均匀取值
+    多个线程同时失败时不会在同一时刻一起重试
+    """
+    base = config.RETRY_BASE_DELAY if base is None else base
+    cap = config.RETRY_MAX_DELAY if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+# --- 指标 ---
+METRIC_KEYS = ["requests", "retries", "transient", "permanent", "wait_seconds",
+               "breaker_trips", "short_circuited"]
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def record_metric(host, key, value=1):
+    with _metrics_lock:
+        stats = _metrics.setdefault(host, dict.fromkeys(METRIC_KEYS, 0))
+        stats[key] += value
+
+
+def retry_metrics():
+    """各 host 的重试指标快照: {host: {requests, retries, ..., wait_seconds}}"""
+    with _metrics_lock:
+        return {host: dict(stats) for host, stats in _metrics.items()}
+
+
+def format_metrics(metrics=None):
+    metrics = retry_metrics() if metrics is None else metrics
+    return "\n".join(
+        f"   📈 {host}: 请求 {m['requests']} 次 | 重试 {m['retries']} 次 | "
+        f"暂时性失败 {m['transient']} | 永久性失败 {m['permanent']} | "
+        f"等待 {m['wait_seconds']:.1f}s | 熔断 {m['breaker_trips']} 次 (拒绝 {m['short_circuited']})"
+        for host, m in sorted(metrics.items())
+    )
+
+
+# --- 熔断器 ---
+class CircuitBreaker:
+    """
+    按 host 熔断: 连续 threshold 次暂时性失败后打开 cooldown 秒，期间请求直接失败，
+    不再白白消耗整轮抓取的时间预算
+    冷却结束后放行请求 (半开)，成功一次即关闭，再失败一次则立即重新打开
+    """
+
+    def __init__(self, host, threshold=None, cooldown=None):
+        self.host = host
+        self.threshold = threshold or config.BREAKER_THRESHOLD
+        self.cooldown = cooldown or config.BREAKER_COOLDOWN
+        self.failures = 0
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def check(self):
+        with self.lock:
+            remaining = self.open_until - time.monotonic()
+        if remaining > 0:
+            record_metric(self.host, "short_circuited")
+            raise CircuitOpenError(f"{self.host} 已熔断，{remaining:.0f} 秒后才会重新尝试")
+
+    def record(self, ok):
+        with self.lock:
+            if ok:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures < self.threshold:
+                return
+            self.open_until = time.monotonic() + self.cooldown
+        record_metric(self.host, "breaker_trips")
+
+    def trip(self, seconds):
+        # 服务端要求等待的时间超过上限 (Retry-After 过长) 时，直接按该时长熔断
+        with self.lock:
+            self.open_until = max(self.open_until, time.monotonic() + seconds)
+        record_metric(self.host, "breaker_trips")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host):
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def reset_retry_state():
+    """清空熔断器与指标 (基准测试 / 重新开始一轮抓取时使用)"""
+    with _breakers_lock:
+        _breakers.clear()
+    with _metrics_lock:
+        _metrics.clear()
@@ -0,0 +1,55 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from gsw_data import config
+from gsw_data.fetch import fetch_with_retry
+from gsw_data.validate import SchemaDrift
+
+
+def run_parallel(func, items, max_workers=None, fail_fast=False):
+    """
+    用线程池并发执行 func(item)，按 items 的顺序返回结果
+    单个任务抛出的异常会作为结果返回，不影响其他任务
+    调用方的上下文 (当前指标阶段) 会带进工作线程
+
+    fail_fast: 页面结构变化时快速失败 (见 gsw_data.validate)
+               先单独执行第一个任务探路，任何任务抛出 SchemaDrift 后，
+               还没开始的任务不再执行 (不再花抓取预算)，直接以这个 SchemaDrift 作为结果
+    """
+    items = list(items)
+    max_workers = max_workers or config.MAX_WORKERS
+    drift = []
+
+    def _safe(item):
+        if drift:
+            return drift[0]
+        try:
+            return func(item)
+        except SchemaDrift as e:
+            if fail_fast:
+                drift.append(e)
+            return e
+        except Exception as e:
+            return e
+
+    head = []
+    if fail_fast and items:
+        head, items = [_safe(items[0])], items[1:]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items) or 1))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _safe, item) for item in items]
+        return head + [f.result() for f in futures]
+
+
+def fetch_all(jobs, max_workers=None):
+    """
+    并发抓取一批页面 (可以混合多个数据源)
+    jobs: {key: {"url": ..., 其余参数传给 fetch}}
+    返回: {key: Response 或 Exception}
+
+    各 host 的速率由 fetch 内部的令牌桶独立控制:
+    B-Ref 和 Spotrac 互不阻塞，总耗时取决于最慢的那个 host 的速率预算。
+    暂时性失败自动重试 (见 fetch_with_retry)，被熔断的 host 会快速失败。
+    """
+    keys = list(jobs)
+    results = run_parallel(lambda k: fetch_with_retry(**jobs[k]), keys, max_workers)
+    return dict(zip(keys, results))
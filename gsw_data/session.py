@@ -0,0 +1,40 @@
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from gsw_data import config
+
+_sessions = {}
+_session_lock = threading.Lock()
+
+
+def get_session(proxy=None):
+    """
+    进程内共享的 requests.Session (懒加载)，每个代理一个 (proxy=None 为直连)
+    - 每个 host 一个有上限的连接池，keep-alive 复用 TCP+TLS 连接
+    - Cookie 跟着代理走: 同一出口 IP 始终带同一组 Cookie，不会在代理之间串号
+    - 忽略系统环境变量里的代理 (trust_env=False)，代理由 gsw_data.proxypool 分配
+    """
+    with _session_lock:
+        session = _sessions.get(proxy)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=config.POOL_HOSTS,
+                                  pool_maxsize=config.POOL_MAXSIZE,
+                                  pool_block=True)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.trust_env = False
+            if proxy:
+                session.proxies.update({"http": proxy, "https": proxy})
+            _sessions[proxy] = session
+        return session
+
+
+def browser_headers(headers=None):
+    """在调用方给的 headers 上补一个随机 User-Agent (调用方已指定则保留)"""
+    merged = dict(headers or {})
+    merged.setdefault("User-Agent", random.choice(config.USER_AGENTS))
+    return merged
@@ -0,0 +1,185 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from gsw_data.payroll import CBA, luxury_tax
+
+# --- 蒙特卡洛财务模拟 ---
+# 以最近一个赛季的真实数据为起点，向后推演 horizon 个赛季:
+#   胜率 (均值回归) -> 上座率 -> 营收; 工资帽增长 -> 工资总额 -> 奢侈税;
+#   营收 - 工资 - 奢侈税 - 其他成本 = 运营利润; 营收倍数 (随机游走) x 营收 = 估值; 债务随利润滚动
+# 全部路径同时推进: 每个赛季一次 (路径数,) 的数组运算，没有按路径的 Python 循环
+# 金额单位与 gsw_financing_5years.csv 一致: 百万美元 (估值为十亿美元)
+
+DEFAULT_PARAMS = {
+    # 胜率: w_t = w_{t-1} + reversion * (win_mean - w_{t-1}) + win_vol * e
+    "win_mean": 0.55,
+    "win_reversion": 0.35,
+    "win_vol": 0.08,
+    # 上座率 (占球馆容量的比例): base + win_beta * (w_t - 0.5) + vol * e，上限 1.0
+    "attendance_base": 0.97,
+    "attendance_win_beta": 0.30,
+    "attendance_vol": 0.02,
+    # 营收对数增长: drift + 胜率变化 / 上座率变化的弹性 + 随机冲击
+    "revenue_drift": 0.05,
+    "revenue_vol": 0.06,
+    "revenue_win_beta": 0.60,
+    "revenue_attendance_beta": 0.50,
+    # 工资帽年增长 (CBA 规定单年涨幅不超过 10%)，工资总额围绕工资帽增长波动
+    "cap_growth": 0.07,
+    "cap_growth_vol": 0.03,
+    "cap_growth_max": 0.10,
+    "payroll_vol": 0.08,
+    "repeater": False,
+    # 估值 = 营收倍数 x 营收，倍数做对数随机游走
+    "multiple_drift": 0.0,
+    "multiple_vol": 0.08,
+    # 债务: 按利率滚动，利润的一部分用于还债，亏损由新增债务弥补
+    "interest_rate": 0.05,
+    "debt_paydown": 0.10,
+}
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+METRICS = ["Win_Pct", "Attendance_Util", "Payroll_M", "Luxury_Tax_M", "Revenue_M",
+           "Operating_Income_M", "Operating_Margin", "Team_Value_B", "Debt_Amount_M",
+           "Debt_Percent", "Equity_Value_M"]
+
+ARENA_CAPACITY = 18_064   # Chase Center 篮球赛容量
+
+
+def initial_state():
+    """
+    从已有数据集取模拟起点 (最近一个赛季): 营收 / 利润 / 估值 / 债务率 (Forbes)、
+    胜率 (赛程)、工资总额 (薪资)、上座率 (门票，没有时用 attendance_base)
+    """
+    from gsw_data import loader
+
+    financing = loader.financing().sort_values("Season").iloc[-1]
+    season = int(financing["Season"])
+    state = {
+        "Season": season,
+        "Revenue_M": float(financing["Revenue_M"]),
+        "Operating_Income_M": float(financing["Operating_Income_M"]),
+        "Team_Value_B": float(financing["Team_Value_B"]),
+        "Debt_Percent": float(financing["Debt_Percent"]),
+    }
+    games = loader.schedule()
+    games = games[games["Season"] == season]
+    if len(games):
+        state["Win_Pct"] = float(games["Win_Flag"].mean())
+    salaries = loader.salaries()
+    salaries = salaries[salaries["Season"] == season]
+    if len(salaries):
+        state["Payroll_M"] = float(salaries["Total_Salary_Expense"].iloc[0]) / 1e6
+    try:
+        attendance = loader.load("attendance")
+        attendance = attendance[attendance["Season"] == season]
+        if len(attendance):
+            state["Attendance_Util"] = min(float(attendance["Home_Avg_Attendance"].iloc[0]) / ARENA_CAPACITY, 1.0)
+    except FileNotFoundError:
+        pass
+    return state
+
+
+def _tax_m(payroll_m, scale, season, repeater):
+    # 税线与税档都随工资帽同比例放大: tax(p; 放大后的表) = scale * tax(p / scale; 基准表)
+    return luxury_tax(payroll_m * 1e6 / scale, season, repeater) * scale / 1e6
+
+
+def _simulate_chunk(start, params, horizon, n_paths, seed):
+    """模拟一批路径，返回 {指标: (n_paths, horizon) 数组}; 供进程池调用，必须是模块级函数"""
+    p = params
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((6, horizon, n_paths))
+    base_season = start["Season"] if start["Season"] in CBA else max(CBA)
+
+    win = np.full(n_paths, start.get("Win_Pct", p["win_mean"]))
+    att = np.full(n_paths, start.get("Attendance_Util", p["attendance_base"]))
+    revenue = np.full(n_paths, float(start["Revenue_M"]))
+    payroll = np.full(n_paths, start.get("Payroll_M", 0.0))
+    scale = np.ones(n_paths)
+    value_m = start["Team_Value_B"] * 1000
+    multiple = np.full(n_paths, value_m / start["Revenue_M"])
+    debt = np.full(n_paths, value_m * start["Debt_Percent"] / 100)
+
+    # 其他成本 (场馆运营、管理费用等) 占营收的比例，用起点赛季的真实利润反推
+    tax0 = _tax_m(payroll[:1], 1.0, base_season, p["repeater"])[0]
+    other_ratio = (start["Revenue_M"] - start["Operating_Income_M"] - payroll[0] - tax0) / start["Revenue_M"]
+    other_ratio = min(max(other_ratio, 0.0), 0.8)
+
+    # 按 (赛季, 路径) 存放，每个赛季写入一整段连续内存，返回时再转置成 (路径, 赛季) 视图
+    out = {m: np.empty((horizon, n_paths)) for m in METRICS}
+    for t in range(horizon):
+        e_win, e_att, e_rev, e_cap, e_pay, e_mult = shocks[:, t]
+
+        prev_win, prev_att = win, att
+        win = np.clip(win + p["win_reversion"] * (p["win_mean"] - win) + p["win_vol"] * e_win, 0.15, 0.85)
+        att = np.clip(p["attendance_base"] + p["attendance_win_beta"] * (win - 0.5)
+                      + p["attendance_vol"] * e_att, 0.5, 1.0)
+
+        growth = (p["revenue_drift"] + p["revenue_win_beta"] * (win - prev_win)
+                  + p["revenue_attendance_beta"] * (att - prev_att)
+                  + p["revenue_vol"] * e_rev - 0.5 * p["revenue_vol"] ** 2)
+        revenue = revenue * np.exp(growth)
+
+        cap_growth = np.clip(p["cap_growth"] + p["cap_growth_vol"] * e_cap, 0.0, p["cap_growth_max"])
+        scale = scale * (1 + cap_growth)
+        payroll = payroll * (1 + cap_growth) * np.exp(p["payroll_vol"] * e_pay - 0.5 * p["payroll_vol"] ** 2)
+        tax = _tax_m(payroll, scale, base_season, p["repeater"])
+
+        income = revenue * (1 - other_ratio) - payroll - tax
+        multiple = multiple * np.exp(p["multiple_drift"] + p["multiple_vol"] * e_mult
+                                     - 0.5 * p["multiple_vol"] ** 2)
+        value_m = multiple * revenue
+        debt = np.maximum(debt * (1 + p["interest_rate"]) - p["debt_paydown"] * np.maximum(income, 0)
+                          + np.maximum(-income, 0), 0.0)
+
+        for name, values in (("Win_Pct", win), ("Attendance_Util", att), ("Payroll_M", payroll),
+                             ("Luxury_Tax_M", tax), ("Revenue_M", revenue), ("Operating_Income_M", income),
+                             ("Operating_Margin", income / revenue), ("Team_Value_B", value_m / 1000),
+                             ("Debt_Amount_M", debt), ("Debt_Percent", debt / value_m * 100),
+                             ("Equity_Value_M", value_m - debt)):
+            out[name][t] = values
+    return {m: values.T for m, values in out.items()}
+
+
+def simulate(start=None, horizon=5, n_paths=100_000, params=None, seed=0, workers=1, chunk_size=50_000):
+    """
+    蒙特卡洛推演未来 horizon 个赛季，返回 (赛季数组, {指标: (n_paths, horizon) 数组})
+    start: 起点状态 (见 initial_state，默认从数据集读取); params: 覆盖 DEFAULT_PARAMS 中的参数
+    路径按 chunk_size 分块，每块有独立的随机种子 (由 seed 派生)，
+    因此结果只取决于 seed 和 chunk_size，与 workers (进程数) 无关
+    """
+    start = start or initial_state()
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    sizes = [min(chunk_size, n_paths - i) for i in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(start, params, horizon, size, s) for size, s in zip(sizes, seeds)]
+
+    workers = min(workers or os.cpu_count() or 1, len(args))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        chunks = [_simulate_chunk(*a) for a in args]
+
+    paths = {m: np.concatenate([c[m] for c in chunks]) if len(chunks) > 1 else chunks[0][m] for m in METRICS}
+    seasons = np.arange(start["Season"] + 1, start["Season"] + 1 + horizon)
+    return seasons, paths
+
+
+def quantile_bands(seasons, paths, quantiles=QUANTILES):
+    """
+    每个 (赛季, 指标) 一行: 均值与各分位数 (P05 / P25 / P50 / P75 / P95)
+    """
+    frames = []
+    for name, values in paths.items():
+        bands = np.quantile(values, quantiles, axis=0)   # (分位数个数, horizon)
+        frame = pd.DataFrame({"Season": seasons, "Metric": name, "Mean": values.mean(axis=0)})
+        for q, band in zip(quantiles, bands):
+            frame[f"P{round(q * 100):02d}"] = band
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).sort_values(["Metric", "Season"], kind="stable") \
+        .reset_index(drop=True)
@@ -0,0 +1,282 @@
+import glob
+import os
+
+import pandas as pd
+
+from gsw_data import config
+from gsw_data.metrics import count, stage
+# 路径相关的名字定义在 paths (不依赖 pandas)，这里重新导出，原有的导入方式不变
+from gsw_data.paths import (  # noqa: F401
+    DATASET_FILES, HAS_PARQUET, PRIMARY_EXT, dataset_path, partition_exists, partition_path, source_file,
+)
+
+# B-Ref 日期格式: "Tue, Dec 22, 2020"
+BREF_DATE_FORMAT = "%a, %b %d, %Y"
+
+# --- 各数据集的类型声明 ---
+# datetime: 按 B-Ref 日期格式解析; category: 低基数字符串; Int64: 可空整数
+# 金额统一用 float64 (百万美元 / 美元)
+SCHEMAS = {
+    "schedule": {
+        "Team": "category",
+        "Date": "datetime",
+        "Opponent": "category",
+        "Result": "category",
+        "Points_Scored": "Int64",
+        "Points_Allowed": "Int64",
+        "Season": "int32",
+        "Home": "Int8",
+        "Win_Flag": "int8",
+        "Recent_Win_Rate_10": "float64",
+    },
+    "salaries": {
+        "Team": "category",
+        "Season": "int32",
+        "Total_Salary_Expense": "float64",
+        "Dead_Money": "float64",
+        "Luxury_Tax": "float64",
+        "Apron_Status": "category",
+        "Source": "category",
+    },
+    "salary_ledger": {
+        "Team": "category",
+        "Season": "int32",
+        "Player": "string",
+        "Cap_Hit": "float64",
+        "Dead_Money": "float64",
+        "Option": "category",
+    },
+    "attendance": {
+        "Team": "category",
+        "Season": "int32",
+        "Home_Total_Attendance": "int64",
+        "Home_Avg_Attendance": "int64",
+        "Est_Avg_Ticket_Price": "float64",
+        "Gate_Revenue_M": "float64",
+        "Source": "category",
+    },
+    "game_attendance": {
+        "Season": "int32",
+        "Date": "datetime",
+        "Opponent": "category",
+        "Opp_Code": "category",
+        "Opp_Win_Pct": "float64",
+        "Pre_Game_Win_Rate_10": "float64",
+        "Attendance": "Int64",
+        "Est_Ticket_Price": "float64",
+        "Gate_Revenue_M": "float64",
+    },
+    "financing": {
+        "Season": "int32",
+        "Team_Value_B": "float64",
+        "Revenue_M": "float64",
+        "Operating_Income_M": "float64",
+        "Debt_Percent": "float64",
+        "Notes": "string",
+        "Debt_Amount_M": "float64",
+        "Equity_Value_M": "float64",
+        "Operating_Margin": "float64",
+    },
+    "finance_bands": {
+        "Season": "int32",
+        "Metric": "category",
+        "Mean": "float64",
+        "P05": "float64",
+        "P25": "float64",
+        "P50": "float64",
+        "P75": "float64",
+        "P95": "float64",
+    },
+    "player_value": {
+        "Team": "category",
+        "Season": "int32",
+        "Avg_PER": "float64",
+        "Avg_WS": "float64",
+        "Top_Player_PER": "float64",
+        "Player_Count": "int32",
+        "Total_Cap_Hit": "float64",
+    },
+    "player_advanced": {
+        "Team": "category",
+        "Season": "int32",
+        "Player": "string",
+        "Age": "Int64",
+        "G": "Int64",
+        "MP": "Int64",
+        "PER": "float64",
+        "WS": "float64",
+        "WS_48": "float64",
+        "BPM": "float64",
+        "VORP": "float64",
+        "Cap_Hit": "float64",
+    },
+    "draft": {
+        "Year": "Int64",
+        "Round": "Int64",
+        "Pick": "Int64",
+        "Player": "string",
+        "College": "string",
+    },
+    "future_assets": {
+        "Season": "int32",
+        "First_Round_Pick": "float64",
+        "Second_Round_Pick": "float64",
+        "Note": "string",
+    },
+    "transactions": {
+        "Season": "int32",
+        "Trades": "int32",
+        "Acquisitions": "int32",
+        "Waived": "int32",
+        "Released": "int32",
+        "Claimed": "int32",
+        "Drafted": "int32",
+        "Other": "int32",
+    },
+}
+
+
+def format_bref_date(dates):
+    """
+    把 datetime 列换回 B-Ref 原始日期文本 ("Fri, Jan 1, 2021")
+    B-Ref 的日期不补零，strftime 的 %d 会写成 "Jan 01"，所以日和年单独拼接
+    """
+    return dates.map(lambda d: f"{d:%a, %b} {d.day}, {d.year}" if pd.notna(d) else None)
+
+
+def apply_schema(df, dataset):
+    """
+    按 SCHEMAS 把 DataFrame 转成声明的类型 (未声明的列原样保留)
+    """
+    schema = SCHEMAS.get(dataset, {})
+    out = df.copy()
+    for col, dtype in schema.items():
+        if col not in out.columns:
+            continue
+        if dtype == "datetime":
+            if not pd.api.types.is_datetime64_any_dtype(out[col]):
+                parsed = pd.to_datetime(out[col], format=BREF_DATE_FORMAT, errors="coerce")
+                # 兜底: 其他日期格式 (如 ISO 格式的 CSV)
+                missing = parsed.isna() & out[col].notna()
+                if missing.any():
+                    parsed[missing] = pd.to_datetime(out.loc[missing, col], errors="coerce")
+                out[col] = parsed
+        elif dtype in ("category", "string"):
+            out[col] = out[col].astype(dtype)
+        else:
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype(dtype)
+    return out
+
+
+def _atomic(path, writer):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        writer(tmp)
+    except BaseException:
+        # 写到一半失败: 删掉临时文件，目标文件保持原样
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+
+
+def write_dataset(df, dataset, csv_path, export_csv=None):
+    """
+    写出一个数据集: 带类型的 Parquet (主存储) + 可选 CSV 导出
+    csv_path: 脚本原来的输出路径 (如 data/gsw_schedule_5years.csv)，Parquet 写在同名 .parquet
+    CSV 导出保持原始格式 (不做类型转换)，方便 MATLAB / Excel 直接打开
+    """
+    if export_csv is None:
+        export_csv = config.CSV_EXPORT
+    with stage("write", dataset=dataset):
+        written, typed = _write_dataset(df, dataset, csv_path, export_csv)
+    count("rows", len(df))
+    # data/ 下的正式文件: 记录与上一次写出相比的行级变更 (见 gsw_data.changes)
+    from gsw_data import changes
+    if changes.tracked(dataset, csv_path):
+        changes.capture(dataset, typed)
+    return written
+
+
+def _write_dataset(df, dataset, csv_path, export_csv):
+    written = []
+    typed = apply_schema(df, dataset)
+
+    if HAS_PARQUET:
+        parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
+        _atomic(parquet_path, lambda p: typed.to_parquet(p, index=False))
+        written.append(parquet_path)
+    else:
+        print("   ⚠️ 未安装 pyarrow，跳过 Parquet 输出 (pip install pyarrow)")
+        export_csv = True
+
+    if export_csv:
+        _atomic(csv_path, lambda p: df.to_csv(p, index=False))
+        written.append(csv_path)
+    return written, typed
+
+
+def read_dataset(dataset, path=None):
+    """
+    读取一个数据集: 优先 Parquet (memory-map，零解析)，没有时回退到 CSV 并套用 schema
+    """
+    path = source_file(dataset, path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, memory_map=True)
+    return apply_schema(pd.read_csv(path), dataset)
+
+
+def write_partition(df, dataset, team, season, root=None):
+    """
+    原子写入单个分区 (先写临时文件再 rename)，中途崩溃不会留下半个文件，
+    断点续跑时可以放心地以"文件存在"作为完成标志
+    CSV 导出先写、主存储最后写，保证主存储文件存在时分区一定完整
+    """
+    with stage("write", dataset=dataset):
+        path, typed = _write_partition(df, dataset, team, season, root)
+    count("rows", len(df))
+    if root is None:
+        # 只比较这一个 (球队, 赛季) 分区
+        from gsw_data import changes
+        changes.capture(dataset, typed, team=team, season=season)
+    return path
+
+
+def _write_partition(df, dataset, team, season, root):
+    path = partition_path(dataset, team, season, root=root)
+    typed = apply_schema(df, dataset)
+    if PRIMARY_EXT == "parquet":
+        if config.CSV_EXPORT:
+            _atomic(partition_path(dataset, team, season, "csv", root),
+                    lambda p: df.to_csv(p, index=False))
+        _atomic(path, lambda p: typed.to_parquet(p, index=False))
+    else:
+        _atomic(path, lambda p: df.to_csv(p, index=False))
+    return path, typed
+
+
+def read_partitions(dataset, teams=None, seasons=None, root=None):
+    """
+    读取联盟模式的分区数据并合并 (Parquet 分区为 memory-map 读取)
+    """
+    root = root or config.DATA_DIR
+    frames = []
+    for path in sorted(glob.glob(os.path.join(root, "team=*", "season=*", f"{dataset}.{PRIMARY_EXT}"))):
+        season_dir = os.path.dirname(path)
+        team = os.path.basename(os.path.dirname(season_dir)).split("=", 1)[1]
+        season = int(os.path.basename(season_dir).split("=", 1)[1])
+        if (teams and team not in teams) or (seasons and season not in seasons):
+            continue
+        if PRIMARY_EXT == "parquet":
+            frames.append(pd.read_parquet(path, memory_map=True))
+        else:
+            frames.append(apply_schema(pd.read_csv(path), dataset))
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    # 各分区的 category 取值不同，concat 后会退化成 object，这里统一恢复
+    for col, dtype in SCHEMAS.get(dataset, {}).items():
+        if dtype == "category" and col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
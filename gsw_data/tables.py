@@ -0,0 +1,177 @@
+import re
+from io import StringIO
+
+import pandas as pd
+
+from gsw_data.metrics import stage
+
+# 只做字符串扫描定位目标 <table>，不构建整页 DOM
+# 注意: B-Ref 把很多表格藏在 HTML 注释里，字符串扫描对注释内的表格同样有效
+# 需要在同一页面上多次查找时用 TableIndex: 扫描一遍，之后按 id 直接取切片
+_TABLE_OPEN = re.compile(r"<table\b", re.I)
+_TABLE_CLOSE = re.compile(r"</table\s*>", re.I)
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+
+
+def iter_table_spans(html, start=0):
+    """逐个产出页面中 <table>...</table> 的 (起点, 终点) 下标，线性扫描"""
+    while True:
+        m = _TABLE_OPEN.search(html, start)
+        if not m:
+            return
+        end = _TABLE_CLOSE.search(html, m.end())
+        if not end:
+            return
+        yield m.start(), end.end()
+        start = end.end()
+
+
+def _header_text(table_html):
+    # 表头区域: <thead> 存在时取 </thead> 之前，否则取第一行 </tr> 之前
+    lower = table_html.lower()
+    cut = lower.find("</thead>")
+    if cut < 0:
+        cut = lower.find("</tr>")
+    head = table_html if cut < 0 else table_html[:cut]
+    return _SPACE.sub("", _TAG.sub(" ", head))
+
+
+# 预扫描: 一次线性扫描同时找出 HTML 注释边界与 <table> 起止标签
+_MARKERS = r"(?P<co><!--)|(?P<cc>-->)|(?P<to><table\b[^>]*>)|(?P<tc></table\s*>)"
+_TABLE_ID = r"""\bid\s*=\s*["']([^"']+)["']"""
+_PATTERNS = {
+    str: (re.compile(_MARKERS, re.I), re.compile(_TABLE_ID)),
+    bytes: (re.compile(_MARKERS.encode(), re.I), re.compile(_TABLE_ID.encode())),
+}
+
+
+class TableIndex:
+    """
+    整页只扫描一遍的表格索引:
+    - ranges: 表格 id -> (起点, 终点) 下标，html 为 bytes 时就是字节区间，只解码需要的那一段
+    - comments: 包裹着表格的注释块 (B-Ref 的高阶 / Misc 等表格都藏在 <!-- --> 里)
+    同一页面要找多张表 (或按 id 找不到再按表头兜底) 时，先建索引再传给 read_table / find_table_html
+    """
+
+    def __init__(self, html, encoding="utf-8"):
+        self.html = html
+        self.encoding = encoding
+        self.spans = []      # [(起点, 终点, id, 是否在注释里)]
+        self.ranges = {}
+        self.comments = []
+        markers, table_id = _PATTERNS[bytes if isinstance(html, bytes) else str]
+
+        comment_start, comment_has_table = None, False
+        table_start, current_id = None, None
+        for m in markers.finditer(html):
+            kind = m.lastgroup
+            if kind == "co":
+                # 表格内部的注释不是包裹层，忽略
+                if comment_start is None and table_start is None:
+                    comment_start, comment_has_table = m.start(), False
+            elif kind == "cc":
+                if comment_start is not None and table_start is None:
+                    if comment_has_table:
+                        self.comments.append((comment_start, m.end()))
+                    comment_start = None
+            elif kind == "to":
+                if table_start is None:
+                    table_start = m.start()
+                    found = table_id.search(m.group())
+                    current_id = self._decode(found.group(1)) if found else None
+            elif table_start is not None:
+                self.spans.append((table_start, m.end(), current_id, comment_start is not None))
+                if current_id is not None:
+                    self.ranges.setdefault(current_id, (table_start, m.end()))
+                comment_has_table = comment_has_table or comment_start is not None
+                table_start = None
+
+    def _decode(self, chunk):
+        return chunk.decode(self.encoding, errors="replace") if isinstance(chunk, bytes) else chunk
+
+    def text(self, start, end):
+        """取出 [start, end) 这一段 (bytes 页面只解码这一段)"""
+        return self._decode(self.html[start:end])
+
+    def table_html(self, table_id):
+        span = self.ranges.get(table_id)
+        return self.text(*span) if span else None
+
+    def iter_table_html(self, headers=None, any_headers=None):
+        signature = [_SPACE.sub("", h) for h in (headers or [])]
+        alternatives = [_SPACE.sub("", h) for h in (any_headers or [])]
+        for start, end, _, _ in self.spans:
+            table_html = self.text(start, end)
+            head = _header_text(table_html)
+            if all(h in head for h in signature) and (not alternatives or any(h in head for h in alternatives)):
+                yield table_html
+
+    def unwrapped(self):
+        """去掉包裹表格的注释符号后的整页 (一次拼接，不按表格逐个复制整页)"""
+        pieces, pos = [], 0
+        for start, end in self.comments:
+            pieces += [self.html[pos:start], self.html[start + 4:end - 3]]
+            pos = end
+        pieces.append(self.html[pos:])
+        return self.html[:0].join(pieces)
+
+
+def table_index(html):
+    """html 可以是 str / bytes / 已建好的 TableIndex"""
+    return html if isinstance(html, TableIndex) else TableIndex(html)
+
+
+def find_table_html(html, table_id=None, headers=None):
+    """
+    定位单个表格，返回其 HTML 片段 (找不到返回 None)
+    html: 页面 (str / bytes) 或 TableIndex
+    table_id: 按 id 属性定位 (如 'team_misc')
+    headers: 表头特征，表头文字中必须包含全部列名 (忽略空格, 如 'Cap Hit' 与 'CapHit' 等价)
+    """
+    with stage("decomment"):
+        return next(iter_table_html(html, table_id=table_id, headers=headers), None)
+
+
+def iter_table_html(html, table_id=None, headers=None, any_headers=None):
+    """
+    按 id 或表头特征逐个产出匹配的表格 HTML 片段
+    any_headers: 表头文字中至少包含其中一个 (与 headers 同时给出时两个条件都要满足)
+    """
+    index = table_index(html)
+    if table_id is not None:
+        table_html = index.table_html(table_id)
+        if table_html is not None:
+            yield table_html
+        return
+    yield from index.iter_table_html(headers=headers, any_headers=any_headers)
+
+
+def _to_frame(table_html, flatten=True, **read_html_kwargs):
+    with stage("read_html"):
+        df = pd.read_html(StringIO(table_html), **read_html_kwargs)[0]
+    # B-Ref 的双层表头 (over_header) 只保留最后一层
+    if flatten and isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(-1)
+    return df
+
+
+def read_table(html, table_id=None, headers=None, flatten=True, **read_html_kwargs):
+    """
+    只把目标表格解析成 DataFrame (其余表格不解析)，找不到返回 None
+    """
+    table_html = find_table_html(html, table_id=table_id, headers=headers)
+    if table_html is None:
+        return None
+    return _to_frame(table_html, flatten=flatten, **read_html_kwargs)
+
+
+def iter_tables(html, headers=None, flatten=True, with_header=False, any_headers=None, **read_html_kwargs):
+    """
+    惰性解析所有符合表头特征的表格，调用方找到想要的就可以停止
+    with_header=True 时产出 (表头文字, DataFrame)，表头文字含 <caption>、已去掉空格，
+    用于区分表头相同、标题不同的表格 (如 Spotrac 的现役名单与死钱表)
+    """
+    for table_html in iter_table_html(html, headers=headers, any_headers=any_headers):
+        df = _to_frame(table_html, flatten=flatten, **read_html_kwargs)
+        yield (_header_text(table_html), df) if with_header else df
@@ -0,0 +1,65 @@
+# --- 联盟 30 支球队 ---
+# B-Ref 球队代码 -> 全称 / Spotrac URL slug
+# 注意 B-Ref 的代码与常见缩写不同: BRK (非 BKN)、CHO (非 CHA)、PHO (非 PHX)
+TEAMS = {
+    "ATL": {"name": "Atlanta Hawks", "spotrac": "atlanta-hawks"},
+    "BOS": {"name": "Boston Celtics", "spotrac": "boston-celtics"},
+    "BRK": {"name": "Brooklyn Nets", "spotrac": "brooklyn-nets"},
+    "CHO": {"name": "Charlotte Hornets", "spotrac": "charlotte-hornets"},
+    "CHI": {"name": "Chicago Bulls", "spotrac": "chicago-bulls"},
+    "CLE": {"name": "Cleveland Cavaliers", "spotrac": "cleveland-cavaliers"},
+    "DAL": {"name": "Dallas Mavericks", "spotrac": "dallas-mavericks"},
+    "DEN": {"name": "Denver Nuggets", "spotrac": "denver-nuggets"},
+    "DET": {"name": "Detroit Pistons", "spotrac": "detroit-pistons"},
+    "GSW": {"name": "Golden State Warriors", "spotrac": "golden-state-warriors"},
+    "HOU": {"name": "Houston Rockets", "spotrac": "houston-rockets"},
+    "IND": {"name": "Indiana Pacers", "spotrac": "indiana-pacers"},
+    "LAC": {"name": "Los Angeles Clippers", "spotrac": "la-clippers"},
+    "LAL": {"name": "Los Angeles Lakers", "spotrac": "los-angeles-lakers"},
+    "MEM": {"name": "Memphis Grizzlies", "spotrac": "memphis-grizzlies"},
+    "MIA": {"name": "Miami Heat", "spotrac": "miami-heat"},
+    "MIL": {"name": "Milwaukee Bucks", "spotrac": "milwaukee-bucks"},
+    "MIN": {"name": "Minnesota Timberwolves", "spotrac": "minnesota-timberwolves"},
+    "NOP": {"name": "New Orleans Pelicans", "spotrac": "new-orleans-pelicans"},
+    "NYK": {"name": "New York Knicks", "spotrac": "new-york-knicks"},
+    "OKC": {"name": "Oklahoma City Thunder", "spotrac": "oklahoma-city-thunder"},
+    "ORL": {"name": "Orlando Magic", "spotrac": "orlando-magic"},
+    "PHI": {"name": "Philadelphia 76ers", "spotrac": "philadelphia-76ers"},
+    "PHO": {"name": "Phoenix Suns", "spotrac": "phoenix-suns"},
+    "POR": {"name": "Portland Trail Blazers", "spotrac": "portland-trail-blazers"},
+    "SAC": {"name": "Sacramento Kings", "spotrac": "sacramento-kings"},
+    "SAS": {"name": "San Antonio Spurs", "spotrac": "san-antonio-spurs"},
+    "TOR": {"name": "Toronto Raptors", "spotrac": "toronto-raptors"},
+    "UTA": {"name": "Utah Jazz", "spotrac": "utah-jazz"},
+    "WAS": {"name": "Washington Wizards", "spotrac": "washington-wizards"},
+}
+
+
+def spotrac_slug(team_code):
+    return TEAMS[team_code]["spotrac"]
+
+
+def team_from_slug(slug):
+    """Spotrac slug -> B-Ref 球队代码 (找不到返回 None)"""
+    return next((code for code, team in TEAMS.items() if team["spotrac"] == slug), None)
+
+
+def parse_team_list(value):
+    """
+    解析命令行里的球队列表: 'all' 或逗号分隔的 B-Ref 代码 (如 'GSW,LAL')
+    """
+    if not value or value.lower() == "all":
+        return list(TEAMS)
+    codes = [c.strip().upper() for c in value.split(",") if c.strip()]
+    unknown = [c for c in codes if c not in TEAMS]
+    if unknown:
+        raise ValueError(f"未知的球队代码: {', '.join(unknown)}")
+    return codes
+
+
+def parse_seasons(value):
+    # 支持 '2021-2025' 或 '2021,2023'
+    if "-" in value:
+        first, last = value.split("-", 1)
+        return list(range(int(first), int(last) + 1))
+    return [int(s) for s in value.split(",") if s.strip()]
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from gsw_data import config
+from gsw_data.metrics import count
+from gsw_data.store import BREF_DATE_FORMAT, _atomic
+
+# --- 页面结构声明与校验 ---
+# 每个数据源声明: 页面表格必须有的列 (headers，按 aliases 改名之后)、列名别名、
+# 以及清洗后每一列的规则 (类型 / 非空 / 取值范围 / 允许的取值)
+# 两步校验:
+#   conform(df, source): 刚解析出来的原始表格 -> 计算布局指纹，统一列名，检查必需列
+#   validate_frame(df, source): 清洗后的数据 -> 按列规则整列向量化检查，不逐行循环
+# 不符合声明时抛出 SchemaDrift (ValueError 的子类: fetch_with_retry 视为永久性失败，不重试)
+# 配合 scheduler.run_parallel(fail_fast=True): 第一个页面就发现结构变化时，其余页面不再抓取
+
+SOURCE_SCHEMAS = {
+    "schedule": {
+        # Result / 主客场两列在 B-Ref 上没有表头 (Unnamed: N)，按取值定位 (见 locate_column)
+        "headers": ["G", "Date", "Opponent", "Tm", "Opp"],
+        "rules": {
+            "Date": {"dtype": "datetime", "format": BREF_DATE_FORMAT, "not_null": True},
+            "Opponent": {"not_null": True},
+            "Result": {"values": ["W", "L"], "not_null": True},
+            "Points_Scored": {"dtype": "number", "min": 40, "max": 200},
+            "Points_Allowed": {"dtype": "number", "min": 40, "max": 200},
+            "Home": {"values": [0, 1], "required": False},
+        },
+        # 尚未开赛的赛季页面只有赛程没有结果，清洗后可以是 0 行
+        "min_rows": 0,
+        "max_rows": 110,
+    },
+    "attendance": {
+        "headers": ["Attendance"],
+        "rules": {
+            "Home_Total_Attendance": {"dtype": "number", "min": 0, "max": 1_500_000},
+            "Home_Avg_Attendance": {"dtype": "number", "min": 0, "max": 30_000},
+        },
+    },
+    "player_advanced": {
+        "headers": ["Player", "G", "MP", "PER", "WS", "VORP"],
+        "rules": {
+            "Player": {"not_null": True},
+            "Age": {"dtype": "number", "min": 17, "max": 50, "required": False},
+            "G": {"dtype": "number", "min": 0, "max": 90},
+            "MP": {"dtype": "number", "min": 0, "max": 4500},
+            "PER": {"dtype": "number", "min": -100, "max": 200},
+            "WS": {"dtype": "number", "min": -10, "max": 30},
+            "VORP": {"dtype": "number", "min": -10, "max": 20},
+        },
+    },
+    "salary_ledger": {
+        # 现役名单的总薪资不可能低于这个数: 低于它说明选错了表 (如 Cap Holds) 或金额列变了
+        "min_total": {"Cap_Hit": 50_000_000},
+        "rules": {
+            "Player": {"not_null": True},
+            "Cap_Hit": {"dtype": "number", "min": 0, "max": 100_000_000},
+            "Dead_Money": {"dtype": "number", "min": 0, "max": 100_000_000},
+            "Option": {"values": ["Player", "Team", "ETO"]},
+        },
+    },
+    "draft": {
+        # 当前的 B-Ref 选秀页把轮次 / 顺位写作 Rd / Pk
+        "aliases": {"Rd": "Round", "Pk": "Pick"},
+        "headers": ["Year", "Round", "Pick", "Player"],
+        "rules": {
+            "Year": {"dtype": "number", "min": 1947, "max": 2100, "not_null": True},
+            "Round": {"dtype": "number", "min": 1, "max": 10},
+            "Pick": {"dtype": "number", "min": 1, "max": 250},
+            "Player": {"not_null": True},
+        },
+        "min_rows": 0,
+    },
+}
+
+
+class SchemaDrift(ValueError):
+    """页面结构与 SOURCE_SCHEMAS 的声明不符 (缺列 / 类型不对 / 取值越界)"""
+
+    def __init__(self, source, problems, fingerprint=None):
+        self.source = source
+        self.problems = list(problems)
+        self.fingerprint = fingerprint
+        where = f" (布局指纹 {fingerprint})" if fingerprint else ""
+        super().__init__(f"{source} 页面结构变化{where}: " + "; ".join(self.problems))
+
+
+# --- 布局指纹 ---
+# 指纹 = 表格列名序列 (含 Unnamed: N 这类位置列名) 的哈希，记录在 SCHEMA_DIR/fingerprints.json
+# 新出现的指纹只提示不报错 (不同赛季的页面本来就可能多一两列)，缺少必需列才算结构变化
+
+FINGERPRINTS = "fingerprints.json"
+_known = {}   # 文件路径 -> {数据源: {指纹: 布局}}
+_known_lock = threading.Lock()
+
+
+def fingerprint(columns):
+    text = "\x1f".join(str(c) for c in columns)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _fingerprint_path():
+    return os.path.join(config.SCHEMA_DIR, FINGERPRINTS)
+
+
+def _load_known(path):
+    if path not in _known:
+        try:
+            with open(path, encoding="utf-8") as f:
+                _known[path] = json.load(f)
+        except (OSError, ValueError):
+            _known[path] = {}
+    return _known[path]
+
+
+def _save_known(path, known):
+    def writer(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(known, f, ensure_ascii=False, indent=1)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _atomic(path, writer)
+
+
+def record_layout(source, columns):
+    """
+    记录一个页面的表格布局，返回指纹
+    指纹第一次出现时 (该数据源已有其他指纹) 打印与最近一次布局的差异
+    """
+    columns = [str(c) for c in columns]
+    fp = fingerprint(columns)
+    path = _fingerprint_path()
+    with _known_lock:
+        known = _load_known(path)
+        layouts = known.setdefault(source, {})
+        if fp in layouts:
+            return fp
+        previous = max(layouts.values(), key=lambda l: l["seen"], default=None)
+        layouts[fp] = {"columns": columns, "seen": time.strftime("%Y-%m-%d %H:%M:%S")}
+        _save_known(path, known)
+    if previous is not None:
+        count("layout_changes")
+        added = [c for c in columns if c not in previous["columns"]]
+        removed = [c for c in previous["columns"] if c not in columns]
+        print(f"   ⚠️ {source} 表格布局有变化 (指纹 {fp}): 新增列 {added}，缺少列 {removed}")
+    return fp
+
+
+def conform(df, source):
+    """
+    刚解析出来的原始表格: 记录布局指纹，按别名统一列名，检查必需列
+    返回改名后的 DataFrame，缺少必需列时抛出 SchemaDrift
+    """
+    spec = SOURCE_SCHEMAS[source]
+    df.columns = [str(c) for c in df.columns]
+    fp = record_layout(source, df.columns)
+    aliases = {old: new for old, new in spec.get("aliases", {}).items() if old in df.columns}
+    if aliases:
+        df = df.rename(columns=aliases)
+    missing = [c for c in spec.get("headers", []) if c not in df.columns]
+    if missing:
+        count("schema_drift")
+        raise SchemaDrift(source, [f"缺少列 {missing}，当前列名: {df.columns.tolist()}"], fp)
+    return df
+
+
+def locate_column(df, values, columns=None, min_share=0.9):
+    """
+    按取值定位没有表头的列: 非空值中至少 min_share 落在 values 里、占比最高的那一列
+    (如 B-Ref 赛程表的胜负列只有 W / L)，找不到返回 None
+    """
+    best, best_share = None, min_share
+    for col in (df.columns if columns is None else columns):
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s):
+            continue
+        present = s.notna().to_numpy()
+        n = present.sum()
+        if not n:
+            continue
+        share = (s.isin(values).to_numpy() & present).sum() / n
+        if share >= best_share:
+            best, best_share = col, share
+    return best
+
+
+def _violations(s, rule):
+    # 每条规则一个布尔掩码 (numpy)，整列一次算完
+    present = s.notna().to_numpy()
+    if rule.get("not_null"):
+        yield "为空", ~present
+    values = None
+    kind = rule.get("dtype")
+    if kind == "number":
+        values = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        yield "不是数值", present & np.isnan(values)
+    elif kind == "datetime":
+        parsed = pd.to_datetime(s, format=rule.get("format"), errors="coerce")
+        yield "日期格式不符", present & parsed.isna().to_numpy()
+    if values is not None:
+        # NaN 与任何数比较都是 False，缺失值不算越界
+        if "min" in rule:
+            yield f"小于 {rule['min']}", values < rule["min"]
+        if "max" in rule:
+            yield f"大于 {rule['max']}", values > rule["max"]
+    if "values" in rule:
+        yield f"不在 {rule['values']} 中", present & ~s.isin(rule["values"]).to_numpy()
+
+
+def validate_frame(df, source):
+    """
+    清洗后的数据按 SOURCE_SCHEMAS[source] 的 rules / min_total 逐列向量化校验
+    全部通过原样返回 df，否则抛出 SchemaDrift (列出每条违规的行数和一个示例值)
+    """
+    spec = SOURCE_SCHEMAS[source]
+    problems = []
+    rows = len(df)
+    if rows < spec.get("min_rows", 1):
+        problems.append(f"只有 {rows} 行")
+    if rows > spec.get("max_rows", float("inf")):
+        problems.append(f"有 {rows} 行，超过 {spec['max_rows']}")
+    for col, rule in spec.get("rules", {}).items():
+        if col not in df.columns:
+            if rule.get("required", True):
+                problems.append(f"缺少列 {col}")
+            continue
+        s = df[col]
+        for reason, mask in _violations(s, rule):
+            n = int(mask.sum())
+            if n:
+                example = s.iloc[mask.argmax()]
+                example = example.item() if hasattr(example, "item") else example
+                problems.append(f"{col} 有 {n} 行{reason} (如 {example!r})")
+    for col, low in spec.get("min_total", {}).items():
+        total = pd.to_numeric(df[col], errors="coerce").sum() if col in df.columns else 0
+        if total < low:
+            problems.append(f"{col} 合计 {total:,.0f}，低于 {low:,.0f}")
+    if problems:
+        count("schema_drift")
+        raise SchemaDrift(source, problems)
+    return df
+
+
+def drift_in(results):
+    """run_parallel 的结果里第一个 SchemaDrift (没有返回 None)"""
+    return next((r for r in results if isinstance(r, SchemaDrift)), None)
@@ -0,0 +1,343 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data import config
+from gsw_data.proxypool import format_pool, get_pool
+from gsw_data.replay import FIXTURE_DIR, FixtureServer, ProxyServer, make_synthetic_fixtures, record
+from gsw_data.retry import reset_retry_state, retry_metrics
+from gsw_data.scheduler import fetch_all
+from gsw_data.store import write_dataset
+from gsw_data.tables import TableIndex, _to_frame, find_table_html, iter_table_html
+from gsw_data.teams import spotrac_slug
+
+from get_ticket_revenue import parse_attendance, season_url
+from get_salaries import parse_salary_page, salary_url
+from get_schedule import parse_schedule, schedule_url
+from get_transactions_and_draft import (TRANSACTION_COLUMNS, draft_url, iter_transactions,
+                                        parse_draft, transaction_season, transactions_url)
+
+# --- 配置 ---
+# 离线基准测试: 所有请求发到本地夹具服务器 (gsw_data.replay)，不访问真实网站，
+# 按阶段计时 (fetch / decomment / read_html / clean / write)，用于发现性能回退
+TEAM_CODE = "GSW"
+SEASONS = list(range(2021, 2026))
+STAGES = ["fetch", "decomment", "read_html", "clean", "write"]
+
+
+def _row_frame(row):
+    return pd.DataFrame([row]) if row else pd.DataFrame()
+
+
+# 每个数据源: 数据集名、URL 列表、在表格索引上定位目标表格 (含注释内的表格)、完整解析函数
+# 交易页面是流式解析 (lxml iterparse)，没有表格定位这一步，单独处理
+SOURCES = {
+    "schedule": {
+        "dataset": "schedule",
+        "urls": lambda team, seasons: {s: schedule_url(team, s) for s in seasons},
+        "locate": lambda index: find_table_html(index, table_id="games"),
+        "parse": parse_schedule,
+    },
+    "attendance": {
+        "dataset": "attendance",
+        "urls": lambda team, seasons: {s: season_url(team, s) for s in seasons},
+        "locate": lambda index: (find_table_html(index, table_id="team_misc")
+                                 or find_table_html(index, headers=["Attendance"])),
+        "parse": lambda html, season: _row_frame(parse_attendance(html, season)),
+    },
+    "salaries": {
+        "dataset": "salaries",
+        "urls": lambda team, seasons: {s: salary_url(spotrac_slug(team), s) for s in seasons},
+        "locate": lambda index: find_table_html(index, headers=["Cap Hit"]),
+        "parse": lambda html, season: _row_frame(parse_salary_page(html, season)),
+    },
+    "draft": {
+        "dataset": "draft",
+        "urls": lambda team, seasons: {"draft": draft_url(team)},
+        "locate": lambda index: (find_table_html(index, table_id="draft")
+                                 or next(iter_table_html(index, headers=["Player"], any_headers=["Pick", "Pk"]), None)),
+        "parse": lambda html, _: parse_draft(html),
+    },
+    "transactions": {
+        "dataset": "transactions",
+        "urls": lambda team, seasons: {"transactions": transactions_url(team)},
+    },
+}
+
+
+def all_urls(team=TEAM_CODE, seasons=SEASONS, sources=SOURCES):
+    return [url for name in sources for url in SOURCES[name]["urls"](team, seasons).values()]
+
+
+def _parse_transactions(body, times):
+    # read_html: 流式解析出全部事件; clean: 按赛季累计各类型次数
+    start = time.perf_counter()
+    events = list(iter_transactions(body))
+    times["read_html"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    counts = {}
+    for date, kind, _ in events:
+        row = counts.setdefault(transaction_season(date), dict.fromkeys(TRANSACTION_COLUMNS, 0))
+        row[kind] += 1
+    df = pd.DataFrame([{"Season": season, **row} for season, row in sorted(counts.items())])
+    times["clean"] += time.perf_counter() - start
+    return df, len(events)
+
+
+def bench_source(name, team, seasons, out_dir, timeout=20):
+    """
+    跑一遍单个数据源的完整管线，返回各阶段耗时 (秒) 与行数 / 失败数
+    decomment: 单次扫描建立表格索引 (B-Ref 的表格多藏在 HTML 注释里) 并定位目标表格
+    read_html: 把目标表格片段解析成 DataFrame
+    clean: 完整解析函数的耗时减去上面两步 (即清洗 / 特征计算部分)
+    """
+    spec = SOURCES[name]
+    times = dict.fromkeys(STAGES, 0.0)
+    urls = spec["urls"](team, seasons)
+
+    start = time.perf_counter()
+    responses = fetch_all({key: {"url": url, "timeout": timeout, "verify": False}
+                           for key, url in urls.items()})
+    times["fetch"] = time.perf_counter() - start
+
+    frames, rows, failures, n_bytes = [], 0, 0, 0
+    for key, response in responses.items():
+        if isinstance(response, Exception) or response.status_code != 200:
+            failures += 1
+            continue
+        n_bytes += len(response.content)
+        try:
+            if name == "transactions":
+                df, rows_read = _parse_transactions(response.content, times)
+            else:
+                # 与爬虫一致: 直接处理原始字节，decomment = 建表格索引 + 定位
+                html = response.content
+                t0 = time.perf_counter()
+                table_html = spec["locate"](TableIndex(html))
+                t1 = time.perf_counter()
+                if table_html is not None:
+                    _to_frame(table_html)
+                t2 = time.perf_counter()
+                df = spec["parse"](html, key)
+                t3 = time.perf_counter()
+                times["decomment"] += t1 - t0
+                times["read_html"] += t2 - t1
+                times["clean"] += max(t3 - t2 - (t2 - t0), 0.0)
+                rows_read = len(df)
+        except Exception:
+            failures += 1
+            continue
+        rows += rows_read
+        frames.append(df)
+
+    frames = [df for df in frames if not df.empty]
+    if frames:
+        start = time.perf_counter()
+        write_dataset(pd.concat(frames, ignore_index=True), spec["dataset"],
+                      os.path.join(out_dir, f"{name}.csv"), export_csv=True)
+        times["write"] = time.perf_counter() - start
+
+    total = sum(times.values())
+    metrics = retry_metrics().values()
+    return {
+        "pages": len(urls),
+        "failures": failures,
+        "retries": sum(m["retries"] for m in metrics),
+        "retry_wait": sum(m["wait_seconds"] for m in metrics),
+        "breaker_trips": sum(m["breaker_trips"] for m in metrics),
+        "bytes": n_bytes,
+        "rows": rows,
+        **times,
+        "total": total,
+        "rows_per_sec": rows / total if total else 0.0,
+    }
+
+
+def run_benchmark(fixture_dir, sources, team=TEAM_CODE, seasons=SEASONS, repeat=3,
+                  latency=0.0, jitter=0.0, errors=None, seed=0, timeout=5, real_rates=False,
+                  retry_base=0.1, proxies=0, proxy_latency=0.0):
+    """
+    启动夹具服务器，把 fetch 指向它，对每个数据源重复跑 repeat 次，取各指标的中位数
+    每一轮使用全新的 HTTP 缓存目录，保证 fetch 阶段真正经过 (本地) 网络
+    proxies: 启动几个本地替身代理组成代理池 (0 = 直连); 限速按 (host, 代理) 计算，
+             配合 real_rates 可以看到 fetch 吞吐随代理数量增长
+    """
+    if not real_rates:
+        # 默认不限速: 测的是管线本身，而不是礼貌性等待
+        config.HOST_RATE_LIMITS = {}
+        config.DEFAULT_RATE_LIMIT = (1000.0, 1000)
+    # 退避基数按比例缩小 (Retry-After 仍由夹具服务器决定)，重试次数与熔断阈值保持真实配置
+    config.RETRY_BASE_DELAY = retry_base
+
+    work_dir = tempfile.mkdtemp(prefix="gsw_bench_")
+    # 夹具页面的布局指纹记在临时目录，不混进真实运行的指纹记录
+    config.SCHEMA_DIR = os.path.join(work_dir, "schema")
+    results = {}
+    proxy_servers = [ProxyServer(latency=proxy_latency, hang_seconds=timeout * 2).start()
+                     for _ in range(proxies)]
+    try:
+        with FixtureServer(fixture_dir, latency=latency, jitter=jitter, errors=errors,
+                           hang_seconds=timeout * 2, seed=seed) as server:
+            config.REPLAY_URL = server.url
+            config.REPLAY_PROXIES = [p.url for p in proxy_servers]
+            for name in sources:
+                runs = []
+                for i in range(repeat):
+                    config.CACHE_DIR = os.path.join(work_dir, f"http-{name}-{i}")
+                    reset_retry_state()
+                    runs.append(bench_source(name, team, seasons, work_dir, timeout=timeout))
+                results[name] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            server_stats = dict(server.stats)
+            if proxy_servers:
+                print(format_pool(get_pool().snapshot()))
+    finally:
+        for proxy in proxy_servers:
+            proxy.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results, server_stats
+
+
+# --- 启动开销 ---
+# 每个入口在全新进程里跑一遍 python -X importtime，按顶层包汇总导入耗时
+# CLI 用 --help / list 这类不联网、不写文件的命令; 脚本只 import 不运行 (__main__ 不执行)
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_TARGETS = {
+    "cli --help": ["-m", "gsw_data", "--help"],
+    "cli list": ["-m", "gsw_data", "list"],
+    "get_schedule": ["-c", "import get_schedule"],
+    "get_transactions_and_draft": ["-c", "import get_transactions_and_draft"],
+    "simulate_finance": ["-c", "import simulate_finance"],
+}
+
+
+def parse_importtime(stderr):
+    """-X importtime 的输出 -> (导入总耗时 (秒), {顶层包: 自身耗时 (秒)})"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue   # 表头行
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    return sum(packages.values()), packages
+
+
+def startup_profile(targets=STARTUP_TARGETS, repeat=3, top=3):
+    """每个入口重复 repeat 次取中位数: 进程总耗时、导入总耗时、自身导入耗时最多的 top 个包"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        p for p in (config.ROOT_DIR, SCRIPTS_DIR, os.environ.get("PYTHONPATH")) if p))
+    profile = {}
+    for name, args in targets.items():
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True,
+                                  text=True, env=env, cwd=config.ROOT_DIR)
+            wall = time.perf_counter() - start
+            runs.append((wall, *parse_importtime(proc.stderr)))
+        wall, imports, packages = sorted(runs, key=lambda r: r[0])[len(runs) // 2]
+        heaviest = sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+        profile[name] = {"wall": wall, "imports": imports, "heaviest": dict(heaviest)}
+    return profile
+
+
+def print_startup(profile):
+    print("\n🚀 启动开销 (python -X importtime):")
+    for name, p in profile.items():
+        heaviest = " | ".join(f"{pkg} {sec * 1000:.0f}ms" for pkg, sec in p["heaviest"].items())
+        print(f"   {name:<28}进程 {p['wall'] * 1000:>6.0f}ms  导入 {p['imports'] * 1000:>6.0f}ms  ({heaviest})")
+
+
+def print_report(results, server_stats):
+    header = f"{'source':<13}{'pages':>6}{'fail':>6}{'retry':>6}{'rows':>8}" \
+             + "".join(f"{s:>11}" for s in STAGES) + f"{'total':>10}{'rows/s':>11}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<13}{r['pages']:>6.0f}{r['failures']:>6.0f}{r['retries']:>6.0f}{r['rows']:>8.0f}"
+              + "".join(f"{r[s] * 1000:>9.1f}ms" for s in STAGES)
+              + f"{r['total'] * 1000:>8.1f}ms{r['rows_per_sec']:>11.0f}")
+    print(f"\n🌐 夹具服务器: {server_stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线回放基准测试 (本地夹具服务器，不访问真实网站)")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="夹具目录 (默认 fixtures/)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="使用合成夹具 (夹具目录为空时自动启用)")
+    parser.add_argument("--games", type=int, default=82, help="合成赛程页面每季的场次")
+    parser.add_argument("--record", action="store_true",
+                        help="把真实页面录制到夹具目录后退出 (缓存未命中时会联网)")
+    parser.add_argument("--from-cache", action="store_true", help="录制时只从 HTTP 缓存复制，不联网")
+    parser.add_argument("--sources", default=",".join(SOURCES), help="数据源: " + ",".join(SOURCES))
+    parser.add_argument("--repeat", type=int, default=3, help="每个数据源重复次数 (取中位数)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外的随机延迟上限 (秒)")
+    parser.add_argument("--error-429", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--error-eof", type=float, default=0.0, help="直接断开连接的概率")
+    parser.add_argument("--error-timeout", type=float, default=0.0, help="挂起直到客户端超时的概率")
+    parser.add_argument("--timeout", type=float, default=5, help="客户端请求超时 (秒)")
+    parser.add_argument("--seed", type=int, default=0, help="故障注入的随机种子 (保证可复现)")
+    parser.add_argument("--retry-base", type=float, default=0.1, help="重试退避基数 (秒)")
+    parser.add_argument("--real-rates", action="store_true", help="保留各 host 的真实限速配置")
+    parser.add_argument("--proxies", type=int, default=0, help="本地替身代理的数量 (0 = 直连)")
+    parser.add_argument("--proxy-latency", type=float, default=0.0, help="替身代理每跳的固定延迟 (秒)")
+    parser.add_argument("--no-startup", action="store_true", help="不测量各入口的启动 (导入) 开销")
+    parser.add_argument("--json", help="把结果另存为 JSON 文件")
+    args = parser.parse_args()
+
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    unknown = [s for s in sources if s not in SOURCES]
+    if unknown:
+        parser.error(f"未知的数据源: {', '.join(unknown)}")
+
+    if args.record:
+        urls = all_urls(sources=sources)
+        recorded = record(urls, args.fixtures, from_cache=args.from_cache)
+        print(f"📼 已录制 {len(recorded)}/{len(urls)} 个页面到 {args.fixtures}")
+        sys.exit(0)
+
+    fixture_dir = args.fixtures
+    synthetic_dir = None
+    if args.synthetic or not os.path.isdir(fixture_dir) or not os.listdir(fixture_dir):
+        synthetic_dir = fixture_dir = tempfile.mkdtemp(prefix="gsw_fixtures_")
+        make_synthetic_fixtures(fixture_dir, TEAM_CODE, spotrac_slug(TEAM_CODE), SEASONS, args.games)
+        print(f"🧪 使用合成夹具 ({args.games} 场/赛季)")
+
+    errors = {"429": args.error_429, "eof": args.error_eof, "timeout": args.error_timeout}
+    try:
+        results, server_stats = run_benchmark(
+            fixture_dir, sources, repeat=args.repeat, latency=args.latency, jitter=args.jitter,
+            errors=errors, seed=args.seed, timeout=args.timeout, real_rates=args.real_rates,
+            retry_base=args.retry_base, proxies=args.proxies, proxy_latency=args.proxy_latency,
+        )
+    finally:
+        if synthetic_dir:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+    print_report(results, server_stats)
+    startup = None if args.no_startup else startup_profile(repeat=args.repeat)
+    if startup:
+        print_startup(startup)
+    if args.json:
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k not in ("json", "record", "from_cache")},
+            "results": results,
+            "server": server_stats,
+            "startup": startup,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 结果已保存至: {args.json}")
@@ -1,5 +1,10 @@
 import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data.metrics import run
+from gsw_data.store import write_dataset
 
 # --- 配置 ---
 OUTPUT_FILE = "data/gsw_financing_5years.csv"
@@ -54,8 +59,8 @@ FORBES_DATA = [
     }
 ]
 
-def generate_financing_data():
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+def generate_financing_data(output_file=OUTPUT_FILE):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
     print("🏦 正在构建融资结构数据 (数据源: Forbes 2021-2025 年报)...")
 
     df = pd.DataFrame(FORBES_DATA)
@@ -82,9 +87,10 @@ def generate_financing_data():
     print("\n📊 勇士队财务结构预览 (Verified Data):")
     print(df[['Season', 'Revenue_M', 'Operating_Income_M', 'Debt_Amount_M', 'Equity_Value_M']])
 
-    df.to_csv(OUTPUT_FILE, index=False)
-    print(f"\n💾 融资数据已保存至: {OUTPUT_FILE}")
+    write_dataset(df, "financing", output_file)
+    print(f"\n💾 融资数据已保存至: {output_file}")
     print("✅ 数据真实性说明: 本文件数据直接来源于 Forbes 历年发布的 'NBA Team Valuations' 榜单。")
 
 if __name__ == "__main__":
-    generate_financing_data()
\ No newline at end of file
+    with run("get_finance_structure"):
+        generate_financing_data()
\ No newline at end of file
@@ -1,140 +1,202 @@
 import pandas as pd
-import requests
+import argparse
 import os
-import time
-import random
-import urllib3
-import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data.checkpoint import Checkpoint
+from gsw_data.fetch import evict, season_ttl
+from gsw_data.metrics import run, stage
+from gsw_data.scheduler import fetch_all, run_parallel
+from gsw_data.store import read_dataset, write_dataset
+from gsw_data.tables import TableIndex, read_table
+from gsw_data.teams import parse_seasons, parse_team_list, spotrac_slug
+from gsw_data.validate import SchemaDrift, conform, drift_in, validate_frame
+
+from get_salaries import parse_player_cap_hits, salary_url
+from get_ticket_revenue import season_url
 
 # --- 配置 ---
 SEASONS = list(range(2021, 2026))
-OUTPUT_FILE = "data/gsw_ticket_revenue.csv"
 TEAM_CODE = "GSW"
+OUTPUT_FILE = "data/gsw_player_advanced.csv"   # 逐个球员-赛季的高阶数据 + Cap Hit
+OUTPUT_SUMMARY = "data/gsw_player_value.csv"   # 由上表 groupby 得到的赛季汇总
+
+# B-Ref 高阶数据表 (id="advanced"，旧版页面藏在 HTML 注释里) 中保留的列
+ADVANCED_COLUMNS = ["Player", "Age", "G", "MP", "PER", "WS", "WS/48", "BPM", "VORP"]
+NUMERIC_COLUMNS = ["Age", "G", "MP", "PER", "WS", "WS/48", "BPM", "VORP"]
+
+# Top_Player_PER 只统计上场时间足够的球员 (几分钟的垃圾时间会产生离谱的 PER)
+MIN_MINUTES = 500
+
+# --- 网络配置 ---
+# 代理 (默认 127.0.0.1:7897)、连接池和 User-Agent 轮换统一由 gsw_data.session 管理
+
+def parse_advanced(html, season):
+    """
+    从球队赛季主页解析高阶数据表，返回每个球员一行
+    找不到表格返回 None，表格缺少必需列或数值越界时抛出 SchemaDrift
+    """
+    # TableIndex 扫描一遍记下所有表格 (含注释内) 的位置，只解析这一张表
+    # 建索引这一遍扫描就是去注释的开销，计入 decomment 阶段
+    with stage("decomment"):
+        index = TableIndex(html)
+    df = read_table(index, table_id="advanced")
+    if df is None:
+        # 兜底: 按表头特征寻找同时包含 PER 和 VORP 的表格
+        df = read_table(index, headers=["PER", "VORP"])
+    if df is None:
+        return None
+
+    # 记录布局指纹，检查 Player / G / MP / PER / WS / VORP 等必需列
+    df = conform(df, "player_advanced")
+
+    # 过滤重复表头行和 "Team Totals" 汇总行
+    df = df[df['Player'].notna() & (df['Player'] != 'Player') & ~df['Player'].str.contains('Team Total', na=False)]
+    df = df[[c for c in ADVANCED_COLUMNS if c in df.columns]].copy()
+
+    # 数值列一次性转换 (B-Ref 名人堂球员名字后带 '*'，一并去掉)
+    numeric = [c for c in NUMERIC_COLUMNS if c in df.columns]
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce')
+    df['Player'] = df['Player'].str.rstrip('*').str.strip()
+    validate_frame(df, "player_advanced")
+    df.insert(0, 'Season', season)
+    return df.rename(columns={'WS/48': 'WS_48'})
+
+def name_key(names):
+    """
+    球员姓名的匹配键 (向量化): 去重音、小写、去标点和 Jr./III 等后缀
+    B-Ref 与 Spotrac 的写法不完全一致，如 'Gary Payton II' / 'Gary Payton', 'Nikola Jokić' / 'Nikola Jokic'
+    """
+    return (names.astype(str)
+            .str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('ascii')
+            .str.lower()
+            .str.replace(r"[^a-z0-9 ]", "", regex=True)
+            .str.replace(r"\b(jr|sr|ii|iii|iv)\b", "", regex=True)
+            .str.split().str.join(" "))
+
+def join_cap_hits(players, cap_hits):
+    """
+    按 (Team, Season, 姓名匹配键) 把 Spotrac 的 Cap Hit 左连接到高阶数据上
+    同一匹配键出现多次时 (Spotrac 表中重复的球员行) 只保留第一条
+    """
+    if cap_hits is None or cap_hits.empty:
+        return players.assign(Cap_Hit=float('nan'))
+    keys = ['Team', 'Season', 'Key']
+    cap_hits = (cap_hits.assign(Key=name_key(cap_hits['Player']))
+                .drop_duplicates(keys)[keys + ['Cap_Hit']])
+    merged = players.assign(Key=name_key(players['Player'])).merge(cap_hits, on=keys, how='left')
+    return merged.drop(columns='Key')
 
-# --- 代理设置 (端口 7897) ---
-PROXIES = {
-    "http": "http://127.0.0.1:7897",
-    "https": "http://127.0.0.1:7897",
-}
-os.environ.pop("http_proxy", None)
-os.environ.pop("https_proxy", None)
-
-# 禁用 SSL 警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# --- 票价估算模型 (Ticket Price Estimator) ---
-# 由于没有网站公开每日门票收入，我们建立一个简单的估算模型
-# 基础票价(Base) * (1 + 通胀率) * 球队表现系数
-BASE_TICKET_PRICE = 280  # 勇士队平均票价极高 (美元)
-
-def get_ticket_data_bref():
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    all_data = []
-
-    print(f"🎫 启动 B-Ref 门票数据爬虫 (纯净模式: 无保底数据)...")
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    }
-
-    for season in SEASONS:
-        # Basketball-Reference 赛季主页
-        url = f"https://www.basketball-reference.com/teams/{TEAM_CODE}/{season}.html"
-        print(f"\n   ⏳ [正在抓取] {season} 赛季: {url}")
-        
-        try:
-            # 发送请求 (死磕模式: 必须成功，否则该年为空)
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=20, verify=False)
-            
-            if response.status_code == 200:
-                # B-Ref 的 Misc 表格通常包含上座率
-                # 我们寻找 id="team_misc" 的表格
-                
-                # 技巧: 有些表格被注释隐藏了，先清洗
-                html = response.text.replace('', '')
-                
-                # 读取所有表格
-                dfs = pd.read_html(html)
-                
-                found_data = False
-                
-                for df in dfs:
-                    # 将列名转为字符串处理
-                    df.columns = [str(c) for c in df.columns]
-                    
-                    # 寻找包含 'Attendance' 的表格
-                    if 'Attendance' in df.columns:
-                        # 通常这个表只有两行 (Team, League Avg) 或一行
-                        # 我们取第一行 (Team)
-                        
-                        # 提取总上座人数
-                        att_val = df.iloc[0]['Attendance']
-                        
-                        # 处理数据清洗 (有些年份可能是 NaN, 如2021)
-                        if pd.isna(att_val):
-                            home_total = 0
-                        else:
-                            home_total = int(att_val)
-                            
-                        # 场均上座 (Attendance/G)
-                        if 'Attend./G' in df.columns:
-                            avg_val = df.iloc[0]['Attend./G']
-                            home_avg = int(avg_val) if not pd.isna(avg_val) else 0
-                        else:
-                            # 如果没有场均列，手动计算 (假设41场主场)
-                            home_avg = int(home_total / 41) if home_total > 0 else 0
-                        
-                        # --- 收入模型计算 ---
-                        # 2021年特殊处理 (疫情空场)
-                        if season == 2021:
-                            est_price = 0
-                        else:
-                            # 票价每年涨 5% (通胀)
-                            inflation_factor = 1.05 ** (season - 2022)
-                            # 表现系数: 夺冠年(2022) 票价更贵
-                            perf_factor = 1.2 if season == 2022 else 1.0
-                            
-                            est_price = BASE_TICKET_PRICE * inflation_factor * perf_factor
-                        
-                        # 计算总收入 (百万美元)
-                        # Revenue = (Total_Attendance * Price) / 1,000,000
-                        revenue_m = (home_total * est_price) / 1_000_000
-                        
-                        # 记录数据
-                        row = {
-                            "Season": season,
-                            "Home_Total_Attendance": home_total,
-                            "Home_Avg_Attendance": home_avg,
-                            "Est_Avg_Ticket_Price": round(est_price, 2),
-                            "Gate_Revenue_M": round(revenue_m, 2),
-                            "Source": "Basketball-Reference Scraped"
-                        }
-                        all_data.append(row)
-                        print(f"      ✅ 抓取成功: 总人数 {home_total:,} | 估算收入 ${revenue_m:.1f}M")
-                        found_data = True
-                        break # 找到就跳出表格循环
-                
-                if not found_data:
-                    print(f"      ⚠️ 页面下载成功，但未找到 'Attendance' 列。")
-                    # 这里不再使用保底数据，直接跳过
-            
-            else:
-                print(f"      ❌ HTTP {response.status_code} - 抓取失败")
-
-        except Exception as e:
-            print(f"      ❌ 严重错误: {e}")
-        
-        # 礼貌性延迟，防止 B-Ref 封 IP
-        time.sleep(random.uniform(3, 5))
-
-    # --- 保存结果 ---
-    if all_data:
-        df_result = pd.DataFrame(all_data)
-        df_result.to_csv(OUTPUT_FILE, index=False)
-        print(f"\n💾 数据已保存至: {OUTPUT_FILE}")
-        print(df_result)
-    else:
-        print("\n⚠️ 警告: 未获取到任何数据 (由于禁用了保底数据，请检查网络连接)")
+def summarize_player_value(players, by_team=False):
+    """
+    赛季汇总 (一次 groupby 完成): 平均 PER / WS、头号球员 PER、球员人数、总 Cap Hit
+    by_team=False 时按赛季汇总 (单队输出，保持原来的 gsw_player_value.csv 格式)
+    """
+    keys = ['Team', 'Season'] if by_team else ['Season']
+    qualified_per = players['PER'].where(players['MP'] >= MIN_MINUTES)
+    summary = (players.assign(Qualified_PER=qualified_per)
+               .groupby(keys, observed=True)
+               .agg(Avg_PER=('PER', 'mean'),
+                    Avg_WS=('WS', 'mean'),
+                    Top_Player_PER=('Qualified_PER', 'max'),
+                    Player_Count=('Player', 'size'),
+                    Total_Cap_Hit=('Cap_Hit', 'sum'),
+                    Cap_Hit_Count=('Cap_Hit', 'count'))
+               .reset_index())
+    # 整个赛季都没匹配到 Cap Hit 时记为缺失，而不是 0
+    summary['Total_Cap_Hit'] = summary['Total_Cap_Hit'].where(summary.pop('Cap_Hit_Count') > 0)
+    cols = ['Avg_PER', 'Avg_WS', 'Top_Player_PER']
+    summary[cols] = summary[cols].round(2)
+    return summary
+
+def scrape_unit(team, season):
+    """
+    抓取并解析单个 (球队, 赛季): 高阶数据 + Cap Hit，返回 DataFrame (找不到高阶数据表返回 None)
+    B-Ref 与 Spotrac 两个页面并发抓取，两个 host 各自按令牌桶限速、互不阻塞
+    赛季主页与门票脚本共用同一个 URL，HTTP 缓存可以直接复用
+    """
+    jobs = {}
+    url = season_url(team, season)
+    jobs["bref"] = {"url": url, "timeout": 20, "verify": False, "ttl": season_ttl(url, season)}
+    url = salary_url(spotrac_slug(team), season)
+    jobs["spotrac"] = {"url": url, "timeout": 20, "verify": False, "ttl": season_ttl(url, season)}
+    with stage("fetch", team=team, season=season):
+        responses = fetch_all(jobs)
+
+    parsed = {}
+    with stage("clean", team=team, season=season):
+        for source, response in responses.items():
+            if isinstance(response, Exception) or response.status_code != 200:
+                status = response if isinstance(response, Exception) else f"HTTP {response.status_code}"
+                print(f"   ⚠️ {team} {season} {source}: {str(status)[:100]}")
+                continue
+            try:
+                if source == "bref":
+                    df = parse_advanced(response.content, season)
+                else:
+                    df = parse_player_cap_hits(response.text)
+                    if df is not None:
+                        df.insert(0, 'Season', season)
+            except SchemaDrift:
+                evict(jobs[source]["url"])
+                raise
+            except Exception as e:
+                print(f"   ❌ {team} {season} {source}: 解析失败 - {e}")
+                continue
+            if df is None:
+                print(f"   ⚠️ {team} {season} {source}: 页面中未找到目标表格")
+                continue
+            df.insert(0, 'Team', team)
+            parsed[source] = df
+
+        if "bref" not in parsed:
+            return None
+        return join_cap_hits(parsed["bref"], parsed.get("spotrac"))
+
+def get_player_value(team_codes=(TEAM_CODE,), seasons=SEASONS, output_file=OUTPUT_FILE, summary_file=OUTPUT_SUMMARY):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    team_codes = list(team_codes)
+    units = [(team, season) for team in team_codes for season in seasons]
+    # 断点续跑: 每个 (球队, 赛季) 解析完立即落盘，联盟级运行中途失败后重跑只补未完成的单元
+    checkpoint = Checkpoint("player_advanced", output_file, scope={"teams": team_codes})
+    todo = checkpoint.pending(units)
+    print(f"⭐ 开始抓取球员高阶数据: {len(team_codes)} 支球队 x {len(seasons)} 个赛季 (B-Ref Advanced + Spotrac Cap Hit)...")
+    if len(todo) < len(units):
+        print(f"   ⏩ 已完成 {len(units) - len(todo)} 个单元 (断点续跑)，本次处理 {len(todo)} 个")
+
+    def scrape(unit):
+        players = scrape_unit(*unit)
+        if players is not None:
+            checkpoint.write(unit, players)
+
+    drift = drift_in(run_parallel(scrape, todo, fail_fast=True))
+    if drift is not None:
+        print(f"\n❌ {drift}")
+        raise drift
+
+    if not checkpoint.compact(units):
+        print("\n⚠️ 未获取到任何高阶数据，请检查网络设置。")
+        return None
+    checkpoint.finish(units)
+
+    # 赛季汇总需要全部球员: 从合并后的文件读回 (Parquet memory-map 读取)
+    players = read_dataset("player_advanced", output_file)
+    with stage("clean"):
+        summary = summarize_player_value(players, by_team=len(team_codes) > 1)
+
+    matched = players['Cap_Hit'].notna().mean()
+    print(f"   ✅ 共 {len(players)} 个球员-赛季，{matched:.0%} 匹配到 Cap Hit")
+    write_dataset(summary, "player_value", summary_file)
+    print(f"\n💾 球员数据已保存至: {output_file}，赛季汇总: {summary_file}")
+    print(summary)
+    return players
 
 if __name__ == "__main__":
-    get_ticket_data_bref()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="抓取球员级高阶数据 (PER / WS / WS48 / BPM / VORP + Cap Hit)")
+    parser.add_argument("--teams", default=TEAM_CODE, help="B-Ref 球队代码，逗号分隔，或 'all'")
+    parser.add_argument("--seasons", default=f"{SEASONS[0]}-{SEASONS[-1]}", help="如 2021-2025 或 2021,2023")
+    args = parser.parse_args()
+
+    with run("get_player_value"):
+        get_player_value(parse_team_list(args.teams), parse_seasons(args.seasons))
@@ -1,136 +1,241 @@
 import pandas as pd
-import requests
 import os
-import time
-import random
-import urllib3
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data.checkpoint import Checkpoint
+from gsw_data.fetch import fetch_with_retry, season_ttl
+from gsw_data.metrics import run, stage
+from gsw_data.payroll import team_payroll
+from gsw_data.retry import format_metrics
+from gsw_data.scheduler import run_parallel
+from gsw_data.store import read_dataset, write_dataset
+from gsw_data.tables import iter_tables
+from gsw_data.teams import team_from_slug
+from gsw_data.validate import SchemaDrift, drift_in, record_layout, validate_frame
 
 # --- 配置 ---
 # 目标：抓取 2021-2025 赛季 (对应 Spotrac year 参数 2020-2024)
 SEASONS = list(range(2021, 2026)) 
 TEAM_SLUG = "golden-state-warriors"
 OUTPUT_FILE = "data/gsw_salaries_5years.csv"
+LEDGER_FILE = "data/gsw_salary_ledger.csv"   # 逐个球员-赛季的薪资账本 (Cap Hit / 死钱 / 合同选项)
+
+# --- 网络配置 ---
+# 代理 (默认 127.0.0.1:7897)、连接池和 User-Agent 轮换统一由 gsw_data.session 管理
+
+# verify=False 时的 SSL 警告由 gsw_data.fetch 在第一次发出请求时关闭
+
+def salary_url(team_slug, season):
+    # Spotrac URL 逻辑：
+    # 2021 赛季 -> year/2020
+    # 2025 赛季 -> year/2024
+    return f"https://www.spotrac.com/nba/{team_slug}/cap/_/year/{season - 1}"
+
+# 合计 / 小计行: 和球员行混在同一张表里，求和时会重复计算
+_TOTAL_ROW = re.compile(r"^\s*(?:(?:team|active|roster)\s+)?(?:sub)?totals?\b|^\s*(?:cap\s+space|active\s+roster)", re.I)
+LEDGER_COLUMNS = ["Player", "Cap_Hit", "Dead_Money", "Option"]
+
+def _money(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    return pd.to_numeric(series.astype(str).str.replace(r'[\$,]', '', regex=True), errors='coerce')
+
+def _option(series):
+    # 合同选项统一成 Player / Team / ETO 三类，其余为空
+    text = series.astype(str).str.lower()
+    out = pd.Series(pd.NA, index=series.index, dtype="object")
+    out[text.str.contains("player")] = "Player"
+    out[text.str.contains("team|club")] = "Team"
+    out[text.str.contains(r"\beto\b|early termination")] = "ETO"
+    return out
+
+def _ledger_rows(head, df):
+    """
+    把一张薪资表转成账本行 (Player, Amount, Option)，去掉合计 / 小计行
+    返回 (DataFrame, 是否死钱表)，不是薪资表返回 (None, False)
+    """
+    dead = 'dead' in head.lower()
+    # 清洗列名
+    df.columns = [str(c).replace(' ', '') for c in df.columns] # 去除列名空格
+
+    # 查找金额列: 现役表为 CapHit，死钱表可能只写 DeadCap / Dead
+    hit_col = next((c for c in df.columns if 'CapHit' in c), None) \
+        or next((c for c in df.columns[1:] if dead and 'Dead' in c), None)
+    if hit_col is None:
+        return None, False
+    player_col = next((c for c in df.columns if c.startswith('Player')), df.columns[0])
+    option_col = next((c for c in df.columns if c.startswith(('Option', 'Status'))), None)
+
+    players = df[player_col].astype(str).str.strip()
+    keep = df[player_col].notna() & (players != '') & ~players.str.contains(_TOTAL_ROW)
+    rows = pd.DataFrame({
+        "Player": players[keep],
+        "Amount": _money(df.loc[keep, hit_col]).fillna(0),
+        "Option": _option(df.loc[keep, option_col]) if option_col else pd.NA,
+    })
+    return rows, dead
+
+def parse_salary_ledger(html):
+    """
+    从 Spotrac 页面解析逐个球员的薪资账本: DataFrame[Player, Cap_Hit, Dead_Money, Option]
+    现役名单取标题含 'Active' 的薪资表 (没有标题时取合计最大的那张)，死钱表全部计入；
+    合计行不计入，同名球员只保留一次
+    页面上没有薪资表返回 None，账本不符合 SOURCE_SCHEMAS["salary_ledger"] 时抛出 SchemaDrift
+    """
+    active, candidates, dead = None, [], []
+    # 只解析表头含 'Cap Hit' 或 'Dead' 的表格
+    for head, df in iter_tables(html, with_header=True, any_headers=["Cap Hit", "Dead"]):
+        rows, is_dead = _ledger_rows(head, df)
+        if rows is None or rows.empty:
+            continue
+        if is_dead:
+            dead.append(rows)
+        elif active is None and 'active' in head.lower():
+            active = (rows, df.columns)
+        else:
+            candidates.append((rows, df.columns))
+    if active is None and candidates:
+        # 按结构认不出现役名单时才按金额兜底: 现役名单是合计最大的那张 (Cap Holds / 双向合同都小得多)
+        active = max(candidates, key=lambda c: c[0]["Amount"].sum())
+    if active is None:
+        return None
+    active, columns = active
+    record_layout("salary_ledger", columns)
 
-# --- 代理设置 (端口 7897) ---
-PROXIES = {
-    "http": "http://127.0.0.1:7897",
-    "https": "http://127.0.0.1:7897",
-}
-# 清除环境变量干扰
-os.environ.pop("http_proxy", None)
-os.environ.pop("https_proxy", None)
-
-# 禁用 SSL 警告 (因为我们要用 verify=False)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# --- 浏览器伪装池 ---
-USER_AGENTS = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/119.0"
-]
-
-def get_salaries_hardcore():
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    all_data = []
+    frames = [active.rename(columns={"Amount": "Cap_Hit"}).assign(Dead_Money=0.0)]
+    frames += [d.rename(columns={"Amount": "Dead_Money"}).assign(Cap_Hit=0.0) for d in dead]
+    ledger = pd.concat(frames, ignore_index=True)
+    ledger = ledger[ledger["Cap_Hit"] + ledger["Dead_Money"] != 0]
+    ledger = ledger.drop_duplicates(["Player", "Dead_Money"])
+    # 金额范围、选项取值、现役总额下限 (选错表或金额列变了会在这里暴露，而不是悄悄写出错误的总额)
+    return validate_frame(ledger[LEDGER_COLUMNS].reset_index(drop=True), "salary_ledger")
+
+def season_totals(ledger, team=None):
+    """
+    账本 -> 每个赛季一行: 总薪资支出 (现役 + 死钱)、死钱、奢侈税与薪资状态 (见 gsw_data.payroll)
+    重复纳税者要看前几个赛季，账本应包含全部赛季; team 为单队账本的 B-Ref 代码 (查 TAX_HISTORY)
+    """
+    payroll = team_payroll(ledger, team=team)
+    totals = pd.DataFrame({
+        "Season": payroll["Season"],
+        "Total_Salary_Expense": payroll["Payroll"],
+        "Dead_Money": payroll["Dead_Money"],
+        "Luxury_Tax": payroll["Tax_Bill"],
+        "Apron_Status": payroll["Apron_Status"].astype(str),
+        "Source": "Spotrac_Scraped",
+    })
+    if ledger.get("Team") is not None:
+        totals.insert(0, "Team", payroll["Team"].astype(str))
+    return totals
+
+def parse_salary_page(html, season):
+    """
+    从 Spotrac 页面解析总薪资，找到有效薪资表返回一行数据，否则返回 None
+    """
+    ledger = parse_salary_ledger(html)
+    if ledger is None:
+        return None
+    return season_totals(ledger.assign(Season=season)).iloc[0].to_dict()
+
+def parse_player_cap_hits(html):
+    """
+    逐个球员的 Cap Hit (现役名单)，返回 DataFrame[Player, Cap_Hit]
+    """
+    ledger = parse_salary_ledger(html)
+    if ledger is None:
+        return None
+    return ledger.loc[ledger["Dead_Money"] == 0, ["Player", "Cap_Hit"]].reset_index(drop=True)
+
+def scrape_season(season, team_slug=TEAM_SLUG):
+    """
+    抓取单个球队单个赛季的总薪资 (死磕模式: 暂时性失败自动重试)
+    限流 / 断连 / SSLEOFError 由 fetch_with_retry 按指数退避 + 抖动重试 (遵守 Retry-After)，
+    404 或页面结构变化属于永久性失败，不再重试
+    成功返回该赛季的薪资账本 (带 Season 列)，彻底失败返回 None
+    """
+    year_param = season - 1
+    url = salary_url(team_slug, season)
+    
+    print(f"\n   🎯 目标: {season} 赛季 ({year_param}-{season}) -> {url}")
+    
+    # 每次请求随机切换 User-Agent (由 fetch 从 USER_AGENTS 中随机挑选)
+    headers = {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Referer": "https://www.spotrac.com/nba/cap/",
+    }
+    parsed = {}
+
+    def validate(response):
+        # 页面对了但没数，说明表格结构变了: 重试也没用，直接判为永久性失败
+        with stage("clean", season=season):
+            parsed["ledger"] = parse_salary_ledger(response.text)
+        if parsed["ledger"] is None:
+            raise SchemaDrift("salary_ledger", ["页面中没有 Cap Hit 薪资表"])
+
+    try:
+        # 关键修改：verify=False 忽略 SSL 证书验证，解决 SSLEOFError
+        # 重试复用共享 Session 的长连接，不再每次重新握手
+        with stage("fetch", season=season):
+            response = fetch_with_retry(url, validate=validate, headers=headers, timeout=20,
+                                        verify=False, ttl=season_ttl(url, season))
+    except SchemaDrift as e:
+        # 交给调用方快速失败 (run_parallel(fail_fast=True))，其余赛季不再抓取
+        print(f"      ⚠️ {season} 页面下载成功，但未解析到有效总薪资，表格结构变了: {e}")
+        raise
+    except Exception as e:
+        print(f"      💀 {season} 赛季彻底失败: {str(e)[:100]}") # 只打印前100个字符
+        return None
+
+    if response.status_code != 200:
+        print(f"      ❌ {season} HTTP {response.status_code}")
+        if response.status_code == 404:
+            print("      ⚠️ 404 Not Found, 该年份页面可能不存在。")
+        return None
+
+    ledger = parsed["ledger"]
+    ledger.insert(0, "Season", season)
+    total = ledger["Cap_Hit"].sum() + ledger["Dead_Money"].sum()
+    print(f"      ✅ {season} 抓取成功: ${total:,.0f} ({len(ledger)} 条合同)")
+    return ledger
+
+def get_salaries_hardcore(team_slug=TEAM_SLUG, seasons=SEASONS, output_file=OUTPUT_FILE, ledger_file=LEDGER_FILE):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    # 断点续跑: 每个赛季的球员账本抓到就落盘，重跑只抓取未完成的赛季
+    checkpoint = Checkpoint("salary_ledger", ledger_file, scope={"team": team_slug})
+    todo = checkpoint.pending(seasons)
 
     print(f"💰 开始抓取薪资数据 (死磕模式：不使用保底，直到成功)...")
+    if len(todo) < len(seasons):
+        print(f"   ⏩ 已完成 {len(seasons) - len(todo)} 个赛季 (断点续跑)，本次处理 {todo}")
+
+    def scrape(season):
+        ledger = scrape_season(season, team_slug)
+        if ledger is not None:
+            checkpoint.write(season, ledger)
 
-    for season in SEASONS:
-        # Spotrac URL 逻辑：
-        # 2021 赛季 -> year/2020
-        # 2025 赛季 -> year/2024
-        year_param = season - 1
-        url = f"https://www.spotrac.com/nba/{TEAM_SLUG}/cap/_/year/{year_param}"
-        
-        print(f"\n   🎯 目标: {season} 赛季 ({year_param}-{season}) -> {url}")
-        
-        success = False
-        attempt = 0
-        max_retries = 10  # 最大尝试次数，防止死循环
-        
-        while not success and attempt < max_retries:
-            attempt += 1
-            # 每次请求随机切换 User-Agent
-            headers = {
-                "User-Agent": random.choice(USER_AGENTS),
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://www.spotrac.com/nba/cap/",
-                "Connection": "keep-alive" # 保持连接
-            }
-
-            try:
-                # 关键修改：verify=False 忽略 SSL 证书验证，解决 SSLEOFError
-                response = requests.get(url, headers=headers, proxies=PROXIES, timeout=20, verify=False)
-                
-                if response.status_code == 200:
-                    dfs = pd.read_html(response.text)
-                    
-                    found_salary = False
-                    # 遍历所有表格寻找薪资数据
-                    for df in dfs:
-                        # 清洗列名
-                        df.columns = [str(c).replace(' ', '') for c in df.columns] # 去除列名空格
-                        
-                        # 查找包含 CapHit 的列
-                        hit_col = next((c for c in df.columns if 'CapHit' in c), None)
-                        
-                        if hit_col:
-                            # 清洗数值
-                            if df[hit_col].dtype == object:
-                                clean_series = df[hit_col].replace('[\$,]', '', regex=True)
-                                clean_series = pd.to_numeric(clean_series, errors='coerce').fillna(0)
-                            else:
-                                clean_series = df[hit_col]
-                            
-                            # 逻辑判断：如果是有效的薪资表，总和应该很大
-                            total_cap = clean_series.sum()
-                            
-                            # 勇士队薪资通常 > 1亿 (100,000,000)
-                            if total_cap > 100000000:
-                                all_data.append({
-                                    "Season": season,
-                                    "Total_Salary_Expense": total_cap,
-                                    "Source": "Spotrac_Scraped"
-                                })
-                                print(f"      ✅ [第{attempt}次] 抓取成功: ${total_cap:,.0f}")
-                                success = True
-                                break
-                    
-                    if not success:
-                        print(f"      ⚠️ [第{attempt}次] 页面下载成功，但未解析到有效总薪资，可能是表格结构变了。")
-                        # 如果页面对了但没数，可能需要人工检查，这里我们选择重试
-                        raise ValueError("Data Validation Failed")
-
-                else:
-                    print(f"      ❌ [第{attempt}次] HTTP {response.status_code}")
-                    if response.status_code == 404:
-                         print("      ⚠️ 404 Not Found, 该年份页面可能不存在。")
-                         break # 404就不重试了
-
-            except Exception as e:
-                print(f"      ❌ [第{attempt}次] 错误: {str(e)[:100]}...") # 只打印前100个字符
-            
-            if not success:
-                # 失败后的退避策略：休息时间随重试次数增加 (3s, 6s, 9s...)
-                wait_time = attempt * 3 + random.uniform(1, 3)
-                print(f"      ⏳ 休息 {wait_time:.1f} 秒后重试...")
-                time.sleep(wait_time)
-
-        if not success:
-            print(f"      💀 {season} 赛季彻底失败，即使尝试了 {max_retries} 次。")
-            # 如果你真的想要“宁缺毋滥”，这里就不添加任何数据
-            # 如果想至少占个位，可以在这里加个空行
+    # 各赛季并发抓取，Spotrac 的访问频率由令牌桶统一控制
+    drift = drift_in(run_parallel(scrape, todo, fail_fast=True))
+    print(format_metrics())
+    if drift is not None:
+        print(f"\n❌ {drift}")
+        raise drift
 
     # --- 保存 ---
-    if all_data:
-        final_df = pd.DataFrame(all_data)
-        final_df.to_csv(OUTPUT_FILE, index=False)
-        print(f"\n💾 真实薪资数据已保存至: {OUTPUT_FILE}")
+    if checkpoint.compact(seasons):
+        checkpoint.finish(seasons)
+        # 赛季汇总放在一起算: 重复纳税者要看前几个赛季是否交过奢侈税 (账本很小，合并后整体读回)
+        ledger = read_dataset("salary_ledger", ledger_file)
+        with stage("clean"):
+            final_df = season_totals(ledger, team=team_from_slug(team_slug))
+        write_dataset(final_df, "salaries", output_file)
+        print(f"\n💾 真实薪资数据已保存至: {output_file}，球员账本: {ledger_file}")
         print(final_df)
     else:
         print("\n⚠️ 未获取到任何数据。")
 
 if __name__ == "__main__":
-    get_salaries_hardcore()
\ No newline at end of file
+    with run("get_salaries"):
+        get_salaries_hardcore()
\ No newline at end of file
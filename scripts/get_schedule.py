@@ -1,90 +1,149 @@
 import pandas as pd
 import requests
+import argparse
 import os
-import time
-import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data.checkpoint import Checkpoint
+from gsw_data.fetch import current_season, evict, fetch_with_retry, season_ttl
+from gsw_data.metrics import run, stage
+from gsw_data.proxypool import get_pool
+from gsw_data.scheduler import fetch_all, run_parallel
+from gsw_data.store import BREF_DATE_FORMAT, format_bref_date, read_dataset, source_file, write_dataset
+from gsw_data.tables import read_table
+from gsw_data.validate import SchemaDrift, conform, drift_in, locate_column, validate_frame
 
 # --- 配置 ---
 SEASONS = list(range(2021, 2027)) 
 TEAM_CODE = "GSW"
 OUTPUT_FILE = "data/gsw_schedule_5years.csv"
 
-# --- 关键网络配置 ---
-# 1. 设置你的代理地址 (端口 7897)
-PROXIES = {
-    "http": "http://127.0.0.1:7897",
-    "https": "http://127.0.0.1:7897",
-}
+# --- 网络配置 ---
+# 代理池 (默认 127.0.0.1:7897，GSW_PROXIES 可配置多个) 由 gsw_data.proxypool 管理，
+# 连接池和 User-Agent 轮换由 gsw_data.session 管理
+
+def schedule_url(team_code, season):
+    return f"https://www.basketball-reference.com/teams/{team_code}/{season}_games.html"
+
+def clean_schedule(html, season):
+    """
+    解析单个赛季的赛程页面，只做清洗 (不计算胜率特征)
+    """
+    # 只解析 id="games" 的赛程表，不解析页面上的其他表格
+    season_df = read_table(html, table_id="games")
+    if season_df is None:
+        raise SchemaDrift("schedule", ["页面中未找到赛程表 (id=games)"])
+
+    # 记录布局指纹并检查必需列 (G / Date / Opponent / Tm / Opp)，缺列时第一页就报错
+    season_df = conform(season_df, "schedule")
+    
+    # 过滤表头
+    season_df = season_df[season_df['G'] != 'G'].copy()
+    
+    # 胜负列与主客场列在 B-Ref 上没有表头 (Unnamed: N，位置随页面版本变化)，
+    # 在无表头的列里按取值定位: 胜负列只有 W / L，主客场列只有 '@' (客场) 或空
+    unnamed = [c for c in season_df.columns if c.startswith('Unnamed')]
+    result_col = locate_column(season_df, ['W', 'L'], unnamed)
+    venue_col = locate_column(season_df, ['@'], unnamed)
+    if result_col is None:
+        raise SchemaDrift("schedule", [f"未找到胜负列 (W/L)，当前列名: {season_df.columns.tolist()}"])
+    season_df.rename(columns={result_col: 'Result'}, inplace=True)
+
+    season_df.rename(columns={'Tm': 'Points_Scored', 'Opp': 'Points_Allowed'}, inplace=True)
+    
+    # 主客场: '@' 表示客场
+    home = (season_df[venue_col] != '@').astype('int8') if venue_col else None
+    
+    # 筛选列
+    cols_to_keep = ['Date', 'Opponent', 'Result', 'Points_Scored', 'Points_Allowed']
+    season_df = season_df[cols_to_keep]
+    
+    # 丢弃未开赛场次
+    season_df = season_df.dropna(subset=['Result'])
+    
+    # 添加赛季标签
+    season_df['Season'] = season
+    if home is not None:
+        season_df['Home'] = home.loc[season_df.index]
 
-# 2. 清除系统环境变量干扰 (防止与其他软件冲突)
-os.environ.pop("http_proxy", None)
-os.environ.pop("https_proxy", None)
+    season_df['Points_Scored'] = pd.to_numeric(season_df['Points_Scored'], errors='coerce')
+    season_df['Points_Allowed'] = pd.to_numeric(season_df['Points_Allowed'], errors='coerce')
+    # 类型 / 取值范围整列校验 (日期格式、W/L、比分 40-200)
+    validate_frame(season_df, "schedule")
+    return season_df
 
-def get_schedule_multi_year():
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    all_seasons_data = [] 
+def add_win_features(season_df, history=None):
+    """
+    计算 Win_Flag 与 Recent_Win_Rate_10 (单个赛季内)
+    history: 同赛季已存储场次的 Win_Flag (增量模式用)，只取窗口尾部参与计算，
+             这样新增场次的特征只需 O(新增场次) 的计算量
+    """
+    season_df = season_df.copy()
+    
+    # 胜负逻辑 (向量化比较)
+    season_df['Win_Flag'] = (season_df['Result'] == 'W').astype('int64')
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    # 前 9 场用赛季累计胜率填充，所以历史不足一个窗口时要带上整季的记录
+    window = 10
+    if history is None:
+        history = pd.Series([], dtype='int64')
+    elif len(history) >= window - 1:
+        history = history.iloc[-(window - 1):]
+    flags = pd.concat([history, season_df['Win_Flag']], ignore_index=True)
+    
+    # 计算近期胜率
+    recent = flags.rolling(window=window).mean()
+    recent = recent.fillna(flags.expanding().mean())
+    season_df['Recent_Win_Rate_10'] = recent.iloc[len(history):].to_numpy()
+    return season_df
 
-    print(f"🏀 开始抓取 {SEASONS[0]}-{SEASONS[-1]} 赛季数据 (使用代理: 127.0.0.1:7897)...")
+def parse_schedule(html, season):
+    """
+    解析单个赛季的赛程页面，返回清洗后的 DataFrame (含 Win_Flag / Recent_Win_Rate_10)
+    """
+    return add_win_features(clean_schedule(html, season))
 
-    for season in SEASONS:
-        url = f"https://www.basketball-reference.com/teams/{TEAM_CODE}/{season}_games.html"
+def get_schedule_multi_year(team_code=TEAM_CODE, seasons=SEASONS, output_file=OUTPUT_FILE):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    # 断点续跑: 每个赛季解析完立即落盘并记入清单，崩溃 / 被封后重跑只处理未完成的赛季
+    checkpoint = Checkpoint("schedule", output_file, scope={"team": team_code})
+    todo = checkpoint.pending(seasons)
+
+    print(f"🏀 开始抓取 {team_code} {seasons[0]}-{seasons[-1]} 赛季数据 (使用代理: {get_pool().describe()})...")
+    if len(todo) < len(seasons):
+        print(f"   ⏩ 已完成 {len(seasons) - len(todo)} 个赛季 (断点续跑)，本次处理 {todo}")
+
+    def scrape(season):
+        # 抓取 -> 解析 -> 落盘在同一个工作线程里完成，内存里只有这一个赛季的数据
+        # B-Ref 的访问频率由令牌桶统一控制 (不再逐个 sleep)，共享 Session 复用 keep-alive 连接
+        # 已结束的赛季走永久缓存，只有当前赛季会真正联网; timeout=20 防止一直卡住
+        url = schedule_url(team_code, season)
         print(f"   ⏳ 正在处理 {season} 赛季: {url} ...")
-        
         try:
-            # 关键：这里传入 proxies 参数，强制走 7897 端口
-            # timeout=20 防止一直卡住
-            response = requests.get(url, headers=headers, proxies=PROXIES, timeout=20)
-            
+            with stage("fetch", season=season):
+                response = fetch_with_retry(url, timeout=20, ttl=season_ttl(url, season))
+
             if response.status_code == 404:
                 print(f"   ⚠️ {season} 赛季页面不存在，跳过。")
-                continue
-                
+                checkpoint.skip(season)
+                return
+
             response.raise_for_status()
-            
+
             # --- 解析与清洗 ---
-            dfs = pd.read_html(response.text)
-            season_df = dfs[0]
-            
-            # 过滤表头
-            season_df = season_df[season_df['G'] != 'G'].copy()
-            
-            # 列名处理
-            if 'Unnamed: 7' not in season_df.columns and 'Unnamed: 5' in season_df.columns:
-                season_df.rename(columns={'Unnamed: 5': 'Result'}, inplace=True)
-            else:
-                season_df.rename(columns={'Unnamed: 7': 'Result'}, inplace=True)
-
-            season_df.rename(columns={'Tm': 'Points_Scored', 'Opp': 'Points_Allowed'}, inplace=True)
-            
-            # 筛选列
-            cols_to_keep = ['Date', 'Opponent', 'Result', 'Points_Scored', 'Points_Allowed']
-            season_df = season_df[[c for c in cols_to_keep if c in season_df.columns]]
-            
-            # 丢弃未开赛场次
-            season_df = season_df.dropna(subset=['Result'])
-            
-            # 添加赛季标签
-            season_df['Season'] = season
-            
-            # 胜负逻辑
-            season_df['Win_Flag'] = season_df['Result'].apply(lambda x: 1 if x == 'W' else 0)
-            
-            # 计算近期胜率
-            season_df['Recent_Win_Rate_10'] = season_df['Win_Flag'].rolling(window=10).mean()
-            season_df['Recent_Win_Rate_10'] = season_df['Recent_Win_Rate_10'].fillna(
-                season_df['Win_Flag'].expanding().mean()
-            )
-            
-            all_seasons_data.append(season_df)
-            print(f"   ✅ {season} 赛季获取成功 ({len(season_df)} 场)。")
+            with stage("clean", season=season):
+                season_df = parse_schedule(response.content, season)
 
-            # 随机休眠
-            time.sleep(random.uniform(2, 4))
+            checkpoint.write(season, season_df)
+            print(f"   ✅ {season} 赛季获取成功 ({len(season_df)} 场)。")
 
+        except SchemaDrift:
+            # 页面结构变了: 删掉这个页面的缓存 (修好解析前不回放坏页面)，
+            # 再交给 run_parallel 快速失败，其余赛季不再抓取
+            evict(url)
+            raise
         except requests.exceptions.ProxyError:
             print(f"   ❌ 代理连接失败: 请确认你的代理软件正在运行，且端口确实是 7897。")
         except requests.exceptions.SSLError:
@@ -92,16 +151,103 @@ def get_schedule_multi_year():
         except Exception as e:
             print(f"   ❌ {season} 赛季抓取失败: {e}")
 
-    # --- 保存 ---
-    if all_seasons_data:
-        final_df = pd.concat(all_seasons_data, ignore_index=True)
-        final_df['Points_Scored'] = pd.to_numeric(final_df['Points_Scored'], errors='coerce')
-        final_df['Points_Allowed'] = pd.to_numeric(final_df['Points_Allowed'], errors='coerce')
-        
-        final_df.to_csv(OUTPUT_FILE, index=False)
-        print(f"\n💾 5年完整数据已保存至: {OUTPUT_FILE}")
+    drift = drift_in(run_parallel(scrape, todo, fail_fast=True))
+    if drift is not None:
+        # 已完成的赛季留在断点里，修好解析后重跑即可续上
+        print(f"   ❌ {drift}")
+        raise drift
+
+    # --- 保存: 把各赛季的分片按赛季顺序流式合并 ---
+    if checkpoint.compact(seasons):
+        checkpoint.finish(seasons)
+        print(f"\n💾 5年完整数据已保存至: {output_file} (+ .parquet)")
     else:
         print("\n⚠️ 未获取到任何数据，请检查网络设置。")
 
+def _game_dates(dates):
+    # B-Ref 日期格式: "Tue, Dec 22, 2020"
+    return pd.to_datetime(dates, format=BREF_DATE_FORMAT, errors="coerce")
+
+def refresh_schedule_incremental(team_code=TEAM_CODE, seasons=SEASONS, output_file=OUTPUT_FILE):
+    """
+    增量刷新: 读取已有数据 (优先 Parquet 主存储，关闭 CSV 导出时也能用)，已结束的赛季原样保留，
+    只抓取进行中赛季 (以及已有数据中缺失的赛季)，并只追加最后一个 Date 之后的新比赛
+    """
+    if not os.path.exists(source_file("schedule", output_file)):
+        print(f"   ⚠️ {output_file} 不存在，改为全量抓取。")
+        return get_schedule_multi_year(team_code, seasons, output_file)
+
+    stored = read_dataset("schedule", output_file)
+    # Parquet 里的 Date 是 datetime: 换回 B-Ref 原始文本 (日期不补零)，与新抓取的比赛一致，
+    # 已结束赛季重新导出的 CSV 与原文件逐字节相同
+    stored['Date'] = format_bref_date(stored['Date'])
+    live_season = current_season()
+    stored_seasons = set(stored['Season'].unique())
+
+    # 已结束且已存储的赛季不再处理
+    to_fetch = [s for s in seasons if s >= live_season or s not in stored_seasons]
+    closed = [s for s in seasons if s not in to_fetch]
+    print(f"🔄 增量刷新 {team_code}: 已结束赛季 {closed} 保持不变，需要抓取 {to_fetch}")
+    if not to_fetch:
+        print("   ✅ 没有需要更新的赛季。")
+        return
+
+    jobs = {}
+    for season in to_fetch:
+        url = schedule_url(team_code, season)
+        jobs[season] = {"url": url, "timeout": 20, "ttl": season_ttl(url, season)}
+    with stage("fetch"):
+        responses = fetch_all(jobs)
+
+    new_parts = []
+    for season in to_fetch:
+        try:
+            response = responses[season]
+            if isinstance(response, Exception):
+                raise response
+            if response.status_code == 404:
+                print(f"   ⚠️ {season} 赛季页面不存在，跳过。")
+                continue
+            response.raise_for_status()
+
+            with stage("clean", season=season):
+                season_df = clean_schedule(response.content, season)
+                history = stored[stored['Season'] == season]
+                if not history.empty:
+                    # 只保留最后一个已存储日期之后的比赛
+                    last_date = _game_dates(history['Date']).max()
+                    season_df = season_df[_game_dates(season_df['Date']) > last_date]
+
+                # 只对新增场次计算滚动胜率 (带上窗口尾部的历史)
+                season_df = add_win_features(season_df, history['Win_Flag'].reset_index(drop=True))
+            new_parts.append(season_df)
+            print(f"   ✅ {season} 赛季新增 {len(season_df)} 场。")
+
+        except SchemaDrift as e:
+            print(f"   ❌ {e}")
+            evict(jobs[season]["url"])
+            raise
+        except Exception as e:
+            print(f"   ❌ {season} 赛季抓取失败: {e}")
+
+    new_parts = [p for p in new_parts if not p.empty]
+    if not new_parts:
+        print("\n✅ 没有新比赛，文件保持不变。")
+        return
+
+    final_df = pd.concat([stored] + new_parts, ignore_index=True)
+    final_df = final_df.sort_values('Season', kind='stable').reset_index(drop=True)
+    write_dataset(final_df, "schedule", output_file)
+    print(f"\n💾 增量数据已写入: {output_file} (共 {len(final_df)} 场)")
+
 if __name__ == "__main__":
-    get_schedule_multi_year()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="抓取赛程并计算 Rolling Win Rate")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式: 只抓取进行中的赛季，追加新比赛")
+    args = parser.parse_args()
+
+    with run("get_schedule"):
+        if args.incremental:
+            refresh_schedule_incremental()
+        else:
+            get_schedule_multi_year()
@@ -0,0 +1,252 @@
+import pandas as pd
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data.checkpoint import Checkpoint
+from gsw_data.fetch import evict, fetch_with_retry, season_ttl
+from gsw_data.metrics import count, run, stage
+from gsw_data.pricing import GatePricer
+from gsw_data.scheduler import fetch_all, run_parallel
+from gsw_data.store import read_dataset, write_dataset
+from gsw_data.tables import TableIndex, read_table
+from gsw_data.validate import SchemaDrift, conform, drift_in, validate_frame
+
+# --- 配置 ---
+SEASONS = list(range(2021, 2026))
+OUTPUT_FILE = "data/gsw_ticket_revenue.csv"
+GAMES_OUTPUT_FILE = "data/gsw_game_attendance.csv"   # 逐个主场的上座人数 + 票价模型估算的门票收入
+TEAM_CODE = "GSW"
+
+# --- 网络配置 ---
+# 代理 (默认 127.0.0.1:7897)、连接池和 User-Agent 轮换统一由 gsw_data.session 管理
+
+# verify=False 时的 SSL 警告由 gsw_data.fetch 在第一次发出请求时关闭
+
+# --- 票价估算模型 (Ticket Price Estimator) ---
+# 由于没有网站公开每日门票收入，我们建立一个简单的估算模型
+# 基础票价(Base) * (1 + 通胀率) * 球队表现系数
+BASE_TICKET_PRICE = 280  # 勇士队平均票价极高 (美元)
+
+def season_url(team_code, season):
+    # Basketball-Reference 赛季主页
+    return f"https://www.basketball-reference.com/teams/{team_code}/{season}.html"
+
+def boxscore_url(date, home_code):
+    # B-Ref 比赛页面: /boxscores/YYYYMMDD0 + 主队代码
+    return f"https://www.basketball-reference.com/boxscores/{date:%Y%m%d}0{home_code}.html"
+
+# 比赛页面的上座人数不在表格里，而是一行文字: <strong>Attendance:</strong>&nbsp;18,064
+_ATTENDANCE = re.compile(r"Attendance:\s*(?:</strong>)?(?:\s|&nbsp;)*([\d,]+)")
+# scorebox 中两队依次出现 (客队在前): 球队链接 ... <div>胜-负</div> (含本场)
+_SCOREBOX_TEAM = re.compile(r'href="/teams/([A-Z]{3})/\d{4}\.html".*?<div>(\d+)-(\d+)</div>', re.S)
+
+def parse_boxscore(html, team_code, result=None):
+    """
+    从比赛页面提取上座人数与对手的赛前战绩
+    scorebox 的战绩含本场: 按本队的赛果 (result: 赛程的 Result 列，W / L) 扣掉本场，
+    与近况系数 (Pre_Game_Win_Rate_10) 一样只用赛前信息; 对手赛前 0 胜 0 负时胜率为 None
+    页面没有 Attendance 一行 (如 2021 赛季空场比赛) 时上座记为 0
+    """
+    m = _ATTENDANCE.search(html)
+    attendance = int(m.group(1).replace(",", "")) if m else 0
+
+    start = max(html.find('class="scorebox"'), 0)
+    opponents = [(code, int(w), int(l)) for code, w, l in _SCOREBOX_TEAM.findall(html, start)[:2]
+                 if code != team_code]
+    code, wins, losses = opponents[0] if opponents else (None, 0, 0)
+    if result == "W":
+        losses = max(losses - 1, 0)   # 本队赢了 = 对手输了这一场
+    elif result == "L":
+        wins = max(wins - 1, 0)
+    return {
+        "Attendance": attendance,
+        "Opp_Code": code,
+        "Opp_Win_Pct": wins / (wins + losses) if wins + losses else None,
+    }
+
+def parse_attendance(html, season):
+    """
+    从赛季主页的 Misc 表格中提取上座率并估算门票收入，返回一行数据
+    找不到表格或缺少 'Attendance' 列时抛出 SchemaDrift
+    """
+    # B-Ref 的 Misc 表格通常包含上座率
+    # 我们寻找 id="team_misc" 的表格
+    # 技巧: 这个表格被注释隐藏了，TableIndex 扫描一遍就记下了注释内外所有表格的位置
+    # 只把这一张表解析成 DataFrame，不再 read_html 整个页面
+    # 建索引这一遍扫描就是去注释的开销，计入 decomment 阶段
+    with stage("decomment"):
+        index = TableIndex(html)
+    df = read_table(index, table_id="team_misc")
+    if df is None:
+        # 兜底: 按表头特征寻找包含 'Attendance' 的表格 (复用同一份索引，不再重新扫描)
+        df = read_table(index, headers=["Attendance"])
+    if df is None:
+        raise SchemaDrift("attendance", ["页面中未找到 Misc 表格 (id=team_misc)"])
+
+    # 记录布局指纹，检查 'Attendance' 列
+    df = conform(df, "attendance")
+
+    # 通常这个表只有两行 (Team, League Avg) 或一行
+    # 我们取第一行 (Team)
+    
+    # 提取总上座人数
+    att_val = df.iloc[0]['Attendance']
+    
+    # 处理数据清洗 (有些年份可能是 NaN, 如2021)
+    if pd.isna(att_val):
+        home_total = 0
+    else:
+        home_total = int(att_val)
+        
+    # 场均上座 (Attendance/G)
+    if 'Attend./G' in df.columns:
+        avg_val = df.iloc[0]['Attend./G']
+        home_avg = int(avg_val) if not pd.isna(avg_val) else 0
+    else:
+        # 如果没有场均列，手动计算 (假设41场主场)
+        home_avg = int(home_total / 41) if home_total > 0 else 0
+    
+    # --- 收入模型计算 ---
+    # 2021年特殊处理 (疫情空场)
+    if season == 2021:
+        est_price = 0
+    else:
+        # 票价每年涨 5% (通胀)
+        inflation_factor = 1.05 ** (season - 2022)
+        # 表现系数: 夺冠年(2022) 票价更贵
+        perf_factor = 1.2 if season == 2022 else 1.0
+        
+        est_price = BASE_TICKET_PRICE * inflation_factor * perf_factor
+    
+    # 计算总收入 (百万美元)
+    # Revenue = (Total_Attendance * Price) / 1,000,000
+    revenue_m = (home_total * est_price) / 1_000_000
+    
+    # 记录数据
+    row = {
+        "Season": season,
+        "Home_Total_Attendance": home_total,
+        "Home_Avg_Attendance": home_avg,
+        "Est_Avg_Ticket_Price": round(est_price, 2),
+        "Gate_Revenue_M": round(revenue_m, 2),
+        "Source": "Basketball-Reference Scraped"
+    }
+    validate_frame(pd.DataFrame([row]), "attendance")
+    return row
+
+def get_ticket_data_bref(team_code=TEAM_CODE, seasons=SEASONS, output_file=OUTPUT_FILE):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    # 断点续跑: 每个赛季的结果立即落盘，重跑只抓取未完成的赛季
+    checkpoint = Checkpoint("attendance", output_file, scope={"team": team_code})
+    todo = checkpoint.pending(seasons)
+
+    print(f"🎫 启动 B-Ref 门票数据爬虫 (纯净模式: 无保底数据)...")
+    if len(todo) < len(seasons):
+        print(f"   ⏩ 已完成 {len(seasons) - len(todo)} 个赛季 (断点续跑)，本次处理 {todo}")
+
+    # 发送请求 (死磕模式: 必须成功，否则该年为空)
+    # 所有赛季并发抓取，礼貌性延迟由 B-Ref 的令牌桶统一控制，防止封 IP
+    def scrape(season):
+        url = season_url(team_code, season)
+        print(f"\n   ⏳ [正在抓取] {season} 赛季: {url}")
+        
+        try:
+            with stage("fetch", season=season):
+                response = fetch_with_retry(url, timeout=20, verify=False, ttl=season_ttl(url, season))
+            
+            if response.status_code == 200:
+                with stage("clean", season=season):
+                    row = parse_attendance(response.content, season)
+                checkpoint.write(season, pd.DataFrame([row]))
+                print(f"      ✅ 抓取成功: 总人数 {row['Home_Total_Attendance']:,} | 估算收入 ${row['Gate_Revenue_M']:.1f}M")
+            
+            else:
+                print(f"      ❌ HTTP {response.status_code} - 抓取失败")
+                if response.status_code == 404:
+                    checkpoint.skip(season)
+
+        except SchemaDrift:
+            # 页面下载成功但结构变了 (找不到 Attendance 等): 删掉缓存，其余赛季不再抓取
+            evict(url)
+            raise
+        except Exception as e:
+            print(f"      ❌ 严重错误: {e}")
+
+    drift = drift_in(run_parallel(scrape, todo, fail_fast=True))
+    if drift is not None:
+        print(f"\n❌ {drift}")
+        raise drift
+
+    # --- 保存结果 ---
+    if checkpoint.compact(seasons):
+        checkpoint.finish(seasons)
+        print(f"\n💾 数据已保存至: {output_file}")
+        print(read_dataset("attendance", output_file))
+    else:
+        print("\n⚠️ 警告: 未获取到任何数据 (由于禁用了保底数据，请检查网络连接)")
+
+def home_games(schedule, team_code=TEAM_CODE, seasons=None):
+    """
+    从赛程中取出已赛的主场，附上赛前近 10 场胜率 (只用赛前信息，作为票价的近况系数)
+    """
+    if "Home" not in schedule.columns:
+        raise ValueError("赛程缺少 Home 列，请先重新运行 get_schedule.py")
+    games = schedule.sort_values(["Season", "Date"], kind="stable").reset_index(drop=True)
+    games["Pre_Game_Win_Rate_10"] = games.groupby("Season")["Recent_Win_Rate_10"].shift(1)
+    games = games[(games["Home"] == 1) & games["Date"].notna()]
+    if seasons is not None:
+        games = games[games["Season"].isin(list(seasons))]
+    return games[["Season", "Date", "Opponent", "Result", "Pre_Game_Win_Rate_10"]].reset_index(drop=True)
+
+def get_game_attendance(team_code=TEAM_CODE, seasons=SEASONS, output_file=GAMES_OUTPUT_FILE, params=None):
+    """
+    逐场上座与门票收入: 按 data/ 中已有的赛程找出主场，并发抓取每场的比赛页面
+    比赛结束后页面不再变化，全部永久缓存，重跑 (或只改票价假设重新定价) 不会重复联网
+    """
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    games = home_games(read_dataset("schedule"), team_code, seasons)
+    print(f"🎟️ 开始抓取逐场上座数据: {len(games)} 个主场 (B-Ref Box Score)...")
+
+    jobs = {i: {"url": boxscore_url(date, team_code), "timeout": 20, "verify": False, "ttl": None}
+            for i, date in games["Date"].items()}
+    with stage("fetch"):
+        responses = fetch_all(jobs)
+
+    rows = {}
+    with stage("clean"):
+        for i, response in responses.items():
+            if isinstance(response, Exception) or response.status_code != 200:
+                status = response if isinstance(response, Exception) else f"HTTP {response.status_code}"
+                print(f"   ⚠️ {games.at[i, 'Date']:%Y-%m-%d} {games.at[i, 'Opponent']}: {str(status)[:100]}")
+                continue
+            rows[i] = parse_boxscore(response.text, team_code, str(games.at[i, "Result"]))
+    count("games", len(rows))
+    if not rows:
+        print("\n⚠️ 未获取到任何比赛页面，请检查网络设置。")
+        return None
+
+    games = games.loc[list(rows)].join(pd.DataFrame.from_dict(rows, orient="index"))
+    games = games[["Season", "Date", "Opponent", "Opp_Code", "Opp_Win_Pct", "Pre_Game_Win_Rate_10", "Attendance"]]
+    games = GatePricer(games).priced(params)
+    write_dataset(games, "game_attendance", output_file)
+
+    summary = games.groupby("Season").agg(Games=("Attendance", "size"), Attendance=("Attendance", "sum"),
+                                          Gate_Revenue_M=("Gate_Revenue_M", "sum"))
+    print(f"\n💾 逐场数据已保存至: {output_file} ({len(games)}/{len(jobs)} 场)")
+    print(summary.round(2))
+    return games
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="抓取上座与门票收入 (赛季汇总 / 逐场)")
+    parser.add_argument("--games", action="store_true", help="逐场模式: 按赛程抓取每个主场的比赛页面")
+    args = parser.parse_args()
+
+    if args.games:
+        with run("get_game_attendance"):
+            get_game_attendance()
+    else:
+        with run("get_ticket_data_bref"):
+            get_ticket_data_bref()
@@ -1,77 +1,95 @@
 import pandas as pd
-import requests
+import csv
+import datetime
 import os
+import re
 import time
 import random
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data.metrics import count, run, stage
+from gsw_data.store import write_dataset
+from gsw_data.tables import TableIndex, iter_tables, read_table
+from gsw_data.validate import SchemaDrift, conform, validate_frame
 
 # --- 配置 ---
 TEAM_CODE = "GSW"
 OUTPUT_DRAFT_HISTORY = "data/gsw_draft_history.csv"
 OUTPUT_FUTURE_ASSETS = "data/gsw_future_assets.csv" # 新增：未来资产
 OUTPUT_TRANS = "data/gsw_transaction_counts.csv"
+OUTPUT_TRANS_EVENTS = "data/gsw_transaction_events.csv" # 结构化交易事件表
+
+# --- 网络配置 ---
+# 代理 (默认 127.0.0.1:7897)、连接池和 User-Agent 轮换统一由 gsw_data.session 管理
+# fetch (requests) 与 lxml 在用到的函数里才导入: 纯本地的 generate_future_assets 不为它们付启动开销
 
-# --- 代理设置 ---
-PROXIES = {
-    "http": "http://127.0.0.1:7897",
-    "https": "http://127.0.0.1:7897",
-}
-os.environ.pop("http_proxy", None)
-os.environ.pop("https_proxy", None)
+def draft_url(team_code):
+    return f"https://www.basketball-reference.com/teams/{team_code}/draft.html"
+
+def parse_draft(html):
+    """
+    解析选秀页面，返回 2020 年以来的选秀记录 (Year, Round, Pick, Player, College)
+    找不到表格或缺少必需列时抛出 SchemaDrift
+    """
+    # 按 id="draft" 精准定位选秀表，只解析这一张; 找不到时按表头特征兜底 (Player + 顺位列)
+    # 双层表头 (MultiIndex) 由 read_table 扁平化，只保留最后一层 ('Year', 'Rd', 'Pk' 等)
+    # 建索引这一遍扫描就是去注释的开销，计入 decomment 阶段
+    with stage("decomment"):
+        index = TableIndex(html)
+    df = read_table(index, table_id="draft")
+    if df is None:
+        df = next(iter_tables(index, headers=["Player"], any_headers=["Pick", "Pk"]), None)
+    if df is None:
+        raise SchemaDrift("draft", ["页面中未找到选秀表格"])
+
+    # 记录布局指纹; Rd / Pk 统一为 Round / Pick，缺少 Year / Round / Pick / Player 时报错
+    # (以前按 'Pick' 找列，页面写作 'Pk' 时轮次和顺位被悄悄丢掉)
+    df = conform(df, "draft")
+    
+    # 数据清洗
+    # 过滤掉表头重复行
+    df = df[df['Year'] != 'Year']
+    
+    # 转换年份 / 轮次 / 顺位
+    numeric = ['Year', 'Round', 'Pick']
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce')
+    # 筛选 2020 至今的数据
+    recent_drafts = df[df['Year'] >= 2020].copy()
+    
+    # 保存关键列 (College 不是每个版本的页面都有)
+    cols = ['Year', 'Round', 'Pick', 'Player', 'College']
+    cols = [c for c in cols if c in recent_drafts.columns]
+    return validate_frame(recent_drafts[cols], "draft")
 
-def get_draft_history():
+def get_draft_history(team_code=TEAM_CODE, output_file=OUTPUT_DRAFT_HISTORY):
     """
     抓取历史选秀记录 (修复版)
     """
-    os.makedirs(os.path.dirname(OUTPUT_DRAFT_HISTORY), exist_ok=True)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
     print(f"🏀 正在抓取选秀历史 (修复表头解析问题)...")
     
-    url = f"https://www.basketball-reference.com/teams/{TEAM_CODE}/draft.html"
+    url = draft_url(team_code)
+    from gsw_data.fetch import evict, fetch_with_retry
     
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, proxies=PROXIES, timeout=15)
-        
-        # 关键修复 1: 使用 match 参数精准定位包含 'Pick' 的表格
-        dfs = pd.read_html(response.text, match="Pick")
-        
-        if not dfs:
-            print("   ❌ 未找到选秀表格")
-            return
-
-        df = dfs[0]
-        
-        # 关键修复 2: 处理双层表头 (MultiIndex)
-        # B-Ref 的表头通常是 (Draft, Year) 这种格式，我们需要扁平化
-        if isinstance(df.columns, pd.MultiIndex):
-            # 取最后一层列名 ('Year', 'Round', 'Pick' 等)
-            df.columns = df.columns.get_level_values(-1)
-        
-        # 数据清洗
-        # 过滤掉表头重复行
-        if 'Pick' in df.columns:
-            df = df[df['Pick'] != 'Pick']
+        with stage("fetch"):
+            response = fetch_with_retry(url, timeout=15)
+        with stage("clean"):
+            recent_drafts = parse_draft(response.content)
         
-        # 转换年份
-        if 'Year' in df.columns:
-            df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
-            # 筛选 2020 至今的数据
-            recent_drafts = df[df['Year'] >= 2020].copy()
-            
-            # 保存关键列
-            cols = ['Year', 'Round', 'Pick', 'Player', 'College']
-            # 确保列存在
-            cols = [c for c in cols if c in recent_drafts.columns]
-            recent_drafts = recent_drafts[cols]
-            
-            print(f"   ✅ 历史选秀抓取成功: {len(recent_drafts)} 条记录")
-            recent_drafts.to_csv(OUTPUT_DRAFT_HISTORY, index=False)
-        else:
-            print(f"   ❌ 列名匹配失败，当前列名: {df.columns.tolist()}")
+        print(f"   ✅ 历史选秀抓取成功: {len(recent_drafts)} 条记录")
+        write_dataset(recent_drafts, "draft", output_file)
 
+    except SchemaDrift as e:
+        # 结构不符的页面不留在缓存里，修好解析后重跑会重新联网
+        evict(url)
+        print(f"   ❌ 选秀抓取失败: {e}")
     except Exception as e:
         print(f"   ❌ 选秀抓取失败: {e}")
 
-def generate_future_assets():
+def generate_future_assets(output_file=OUTPUT_FUTURE_ASSETS):
     """
     生成未来选秀权资产数据 (手动硬编码)
     原因：未来选秀权的具体情况通常隐藏在复杂的交易文本中，爬虫很难解析。
@@ -91,46 +109,112 @@ def generate_future_assets():
     ]
     
     df = pd.DataFrame(future_data)
-    df.to_csv(OUTPUT_FUTURE_ASSETS, index=False)
-    print(f"   💾 未来资产保存至: {OUTPUT_FUTURE_ASSETS}")
+    write_dataset(df, "future_assets", output_file)
+    print(f"   💾 未来资产保存至: {output_file}")
+
+# --- 交易记录解析 ---
+# 按句首动词归类 (可带 re- 前缀，如 Re-signed)，一条 <p> 只归入一种类型;
+# 句中其他位置出现的动词 (如交易说明里提到的 signed) 不参与归类
+TRANSACTION_TYPES = [
+    ("traded", "Trades"),
+    ("signed", "Acquisitions"),   # 含 re-signed / signed ... to a contract
+    ("waived", "Waived"),
+    ("released", "Released"),
+    ("claimed", "Claimed"),
+    ("drafted", "Drafted"),
+]
+TRANSACTION_COLUMNS = [col for _, col in TRANSACTION_TYPES] + ["Other"]
+TRANSACTION_SEASONS = range(2021, 2026)
+DATE_PATTERN = re.compile(r"([A-Z][a-z]+ \d{1,2}, \d{4})")
+_LEADING_VERB = re.compile(r"\s*(?:re-)?(" + "|".join(verb for verb, _ in TRANSACTION_TYPES) + r")\b")
+_VERB_COLUMNS = dict(TRANSACTION_TYPES)
+
+def transactions_url(team_code):
+    return f"https://www.basketball-reference.com/teams/{team_code}/transactions.html"
+
+def classify_transaction(text):
+    m = _LEADING_VERB.match(text.lower())
+    return _VERB_COLUMNS[m.group(1)] if m else "Other"
 
-def get_transaction_activity():
+def transaction_season(date):
+    # NBA 联盟年从 7 月 1 日开始: 2023年7月 的签约属于 2024 赛季
+    return date.year + 1 if date.month >= 7 else date.year
+
+def iter_transactions(html_bytes):
+    """
+    流式解析 B-Ref transactions 页面，逐条产出 (日期, 类型, 文本)
+    结构: <li><span>June 22, 2023</span><p>Traded ...</p><p>...</p></li>
+    用 lxml iterparse 逐个 <li> 处理后立即释放，内存占用与历史长度无关
     """
-    抓取交易活跃度 (保持不变，因为这部分之前运行成功了)
+    from lxml import etree
+    for _, li in etree.iterparse(BytesIO(html_bytes), events=("end",), tag="li",
+                                 html=True, recover=True, encoding="utf-8"):
+        span = li.find("span")
+        head = "".join(span.itertext()) if span is not None else (li.text or "")
+        m = DATE_PATTERN.search(head)
+        if m:
+            date = datetime.datetime.strptime(m.group(1), "%B %d, %Y").date()
+            for p in li.iter("p"):
+                text = " ".join("".join(p.itertext()).split())
+                if text:
+                    yield date, classify_transaction(text), text
+        # 释放已处理的节点，防止整棵树在内存里堆积
+        li.clear()
+        while li.getprevious() is not None:
+            del li.getparent()[0]
+
+def get_transaction_activity(team_code=TEAM_CODE, output_file=OUTPUT_TRANS, events_file=OUTPUT_TRANS_EVENTS):
+    """
+    抓取交易活跃度: 一次遍历所有交易条目，
+    同时写出结构化事件表 (events_file) 并按赛季累计各类型次数 (output_file)
     """
     print(f"\n🤝 正在抓取交易/签约记录 (Transactions)...")
-    url = f"https://www.basketball-reference.com/teams/{TEAM_CODE}/transactions.html"
+    url = transactions_url(team_code)
+    from gsw_data.fetch import evict, fetch_with_retry
     
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, proxies=PROXIES, timeout=15)
-        
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        page_text = soup.get_text()
-        
-        years = range(2021, 2026)
-        stats = []
-        lines = page_text.split('\n')
+        with stage("fetch"):
+            response = fetch_with_retry(url, timeout=15)
+        response.raise_for_status()
         
-        for year in years:
-            n_signed = 0
-            n_traded = 0
-            for line in lines:
-                if str(year) in line:
-                    lower = line.lower()
-                    if "signed" in lower: n_signed += 1
-                    if "traded" in lower: n_traded += 1
-            
-            stats.append({"Season": year, "Acquisitions": n_signed, "Trades": n_traded})
-            
-        pd.DataFrame(stats).to_csv(OUTPUT_TRANS, index=False)
-        print(f"   ✅ 交易统计完成，保存至: {OUTPUT_TRANS}")
+        counts = {season: dict.fromkeys(TRANSACTION_COLUMNS, 0) for season in TRANSACTION_SEASONS}
+        n_events = 0
 
+        # 事件表边解析边写出 (先写临时文件，完成后再替换)
+        os.makedirs(os.path.dirname(events_file), exist_ok=True)
+        tmp = f"{events_file}.tmp{os.getpid()}"
+        # 流式解析 + 归类 + 写事件表在同一遍里完成，整体计入 read_html 阶段
+        with stage("read_html"), open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Date", "Season", "Type", "Text"])
+            for date, kind, text in iter_transactions(response.content):
+                season = transaction_season(date)
+                writer.writerow([date.isoformat(), season, kind, text])
+                n_events += 1
+                if season in counts:
+                    counts[season][kind] += 1
+        if not n_events:
+            # 错误页 / 挑战页: 没有一条带日期的条目，不能写出全 0 的计数覆盖已有数据
+            os.remove(tmp)
+            raise SchemaDrift("transactions", ["页面中没有带日期的交易条目"])
+        os.replace(tmp, events_file)
+        count("events", n_events)
+
+        stats = [{"Season": season, **row} for season, row in counts.items()]
+        write_dataset(pd.DataFrame(stats), "transactions", output_file)
+        print(f"   ✅ 交易统计完成 ({n_events} 条事件)，保存至: {output_file} / {events_file}")
+
+    except SchemaDrift as e:
+        evict(url)
+        print(f"   ❌ 交易抓取失败: {e}")
     except Exception as e:
         print(f"   ❌ 交易抓取失败: {e}")
 
 if __name__ == "__main__":
-    get_draft_history()
-    generate_future_assets() # 新增步骤
-    get_transaction_activity()
\ No newline at end of file
+    with run("get_transactions_and_draft"):
+        with stage("draft"):
+            get_draft_history()
+        with stage("future_assets"):
+            generate_future_assets() # 新增步骤
+        with stage("transactions"):
+            get_transaction_activity()
\ No newline at end of file
@@ -0,0 +1,161 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data import config
+from gsw_data.fetch import evict, fetch_with_retry, season_ttl
+from gsw_data.metrics import run, stage
+from gsw_data.scheduler import run_parallel
+from gsw_data.store import partition_exists, read_partitions, write_partition
+from gsw_data.teams import parse_seasons, parse_team_list, spotrac_slug
+from gsw_data.validate import SchemaDrift
+
+from get_ticket_revenue import parse_attendance, season_url
+from get_salaries import scrape_season, season_totals
+from get_schedule import parse_schedule, schedule_url
+
+# --- 配置 ---
+# 联盟模式: 30 支球队 x N 个赛季 x 3 个数据源，按 (team, season, source) 拆成独立单元
+# 输出按分区写入: data/team=GSW/season=2024/schedule.csv
+DEFAULT_SEASONS = "2021-2025"
+
+# 每个数据源所在的 host，同一 host 的单元放进同一个线程池，
+# 不同 host 并行推进 (B-Ref 被限速时 Spotrac 不会被饿死)
+SOURCE_HOSTS = {
+    "schedule": "www.basketball-reference.com",
+    "attendance": "www.basketball-reference.com",
+    "salaries": "www.spotrac.com",
+}
+
+
+def _fetch_bref(url, season, parse):
+    with stage("fetch"):
+        response = fetch_with_retry(url, timeout=20, verify=False, ttl=season_ttl(url, season))
+    response.raise_for_status()
+    with stage("clean"):
+        try:
+            return parse(response.content, season)
+        except SchemaDrift:
+            # 结构不符的页面不留在缓存里 (已结束赛季的缓存永久有效)
+            evict(url)
+            raise
+
+
+def scrape_unit(team, season, source):
+    """抓取并解析单个 (team, season, source) 单元，返回 DataFrame (无数据返回 None)"""
+    if source == "schedule":
+        df = _fetch_bref(schedule_url(team, season), season, parse_schedule)
+    elif source == "attendance":
+        row = _fetch_bref(season_url(team, season), season, parse_attendance)
+        df = pd.DataFrame([row])
+    elif source == "salaries":
+        ledger = scrape_season(season, spotrac_slug(team))
+        if ledger is None:
+            return None
+        # 球员账本先落盘，赛季汇总 (完成标志) 最后写
+        # 这里的奢侈税只看本赛季 (按非重复纳税者)，全部单元完成后由 refresh_salary_totals 按完整账本重算
+        ledger.insert(0, "Team", team)
+        write_partition(ledger, "salary_ledger", team, season)
+        with stage("clean"):
+            df = season_totals(ledger.drop(columns="Team"), team=team)
+    else:
+        raise ValueError(f"未知的数据源: {source}")
+
+    if df is not None:
+        df.insert(0, "Team", team)
+    return df
+
+
+def run_unit(unit):
+    team, season, source = unit
+    with stage(source, team=team, season=season):
+        df = scrape_unit(team, season, source)
+        if df is None or df.empty:
+            print(f"   ⚠️ {team} {season} {source}: 未获取到数据")
+            return False
+        write_partition(df, source, team, season)
+    print(f"   ✅ {team} {season} {source}: {len(df)} 行")
+    return True
+
+
+def refresh_salary_totals(teams):
+    """
+    用磁盘上这些球队全部赛季的球员账本一次性重算赛季汇总，覆盖 salaries 分区
+    重复纳税者要看前 4 个赛季是否交过税，逐个 (球队, 赛季) 单元汇总时看不到其他赛季
+    """
+    ledger = read_partitions("salary_ledger", teams=teams)
+    if ledger.empty:
+        return 0
+    with stage("clean"):
+        totals = season_totals(ledger)
+    for (team, season), df in totals.groupby(["Team", "Season"], sort=False):
+        write_partition(df.reset_index(drop=True), "salaries", team, season)
+    return int(totals["Luxury_Tax"].gt(0).sum())
+
+
+def run_league(teams, seasons, sources, force=False):
+    units = [(team, season, source)
+             for team in teams for season in seasons for source in sources]
+
+    # 断点续跑: 分区文件是原子写入的，存在即代表该单元已完成
+    todo = [u for u in units if force or not partition_exists(u[2], u[0], u[1])]
+    print(f"🏟️ 联盟模式: {len(teams)} 支球队 x {len(seasons)} 个赛季 x {len(sources)} 个数据源")
+    print(f"   共 {len(units)} 个单元，已完成 {len(units) - len(todo)} 个，本次执行 {len(todo)} 个")
+
+    groups = {}
+    for unit in todo:
+        groups.setdefault(SOURCE_HOSTS[unit[2]], []).append(unit)
+
+    # 外层: 每个 host 一个线程; 内层: host 内部的线程池 (速率由令牌桶控制)
+    # 内层快速失败: 某个数据源的页面结构变了 (SchemaDrift)，同一 host 上还没开始的单元不再抓取
+    results = run_parallel(lambda host: run_parallel(run_unit, groups[host], fail_fast=True), list(groups),
+                           max_workers=max(1, len(groups)))
+
+    failed, drifts = [], {}
+    for host, host_results in zip(groups, results):
+        if isinstance(host_results, Exception):
+            failed.extend(groups[host])
+            continue
+        for unit, ok in zip(groups[host], host_results):
+            if ok is not True:
+                if isinstance(ok, SchemaDrift):
+                    drifts.setdefault(str(ok), []).append(unit)
+                elif isinstance(ok, Exception):
+                    print(f"   ❌ {unit[0]} {unit[1]} {unit[2]}: {str(ok)[:100]}")
+                failed.append(unit)
+    for message, units in drifts.items():
+        print(f"   ❌ 页面结构变化，{len(units)} 个单元未完成: {message[:300]}")
+
+    if "salaries" in sources:
+        # 每次都重算 (包括上次中断在这一步之前、本次没有新单元的情况)
+        with stage("salary_totals"):
+            taxed = refresh_salary_totals(teams)
+        print(f"   💰 已按完整账本重算赛季薪资汇总 ({taxed} 个球队-赛季交奢侈税)")
+
+    print(f"\n💾 分区输出目录: {config.DATA_DIR}")
+    if failed:
+        print(f"⚠️ {len(failed)} 个单元失败，重新运行本脚本即可只补跑失败部分。")
+    else:
+        print("✅ 全部单元完成。")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="联盟级数据抓取 (多球队 x 多赛季)")
+    parser.add_argument("--teams", default="all", help="B-Ref 球队代码，逗号分隔，或 'all'")
+    parser.add_argument("--seasons", default=DEFAULT_SEASONS, help="如 2021-2025 或 2021,2023")
+    parser.add_argument("--sources", default=",".join(SOURCE_HOSTS),
+                        help="数据源: " + ",".join(SOURCE_HOSTS))
+    parser.add_argument("--force", action="store_true", help="忽略已完成的分区，全部重跑")
+    args = parser.parse_args()
+
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    unknown = [s for s in sources if s not in SOURCE_HOSTS]
+    if unknown:
+        parser.error(f"未知的数据源: {', '.join(unknown)}")
+
+    with run("run_league"):
+        run_league(parse_team_list(args.teams), parse_seasons(args.seasons), sources, force=args.force)
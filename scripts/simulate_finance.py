@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gsw_data.metrics import run, stage
+from gsw_data.simulate import initial_state, quantile_bands, simulate
+from gsw_data.store import write_dataset
+
+# --- 配置 ---
+OUTPUT_FILE = "data/gsw_finance_bands.csv"   # 每个 (赛季, 指标) 的均值与分位数区间
+HORIZON = 5
+N_PATHS = 100_000
+
+def simulate_finance(output_file=OUTPUT_FILE, horizon=HORIZON, n_paths=N_PATHS, seed=0, workers=1):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    start = initial_state()
+    print(f"🎲 蒙特卡洛财务推演: 从 {start['Season']} 赛季出发，{n_paths:,} 条路径 x {horizon} 个赛季...")
+
+    t0 = time.perf_counter()
+    with stage("simulate"):
+        seasons, paths = simulate(start, horizon=horizon, n_paths=n_paths, seed=seed, workers=workers)
+    with stage("clean"):
+        bands = quantile_bands(seasons, paths)
+    print(f"   ✅ 模拟完成 ({time.perf_counter() - t0:.2f}s)")
+
+    write_dataset(bands, "finance_bands", output_file)
+    print(f"\n💾 分位数区间已保存至: {output_file}")
+    preview = bands[bands["Metric"].isin(["Revenue_M", "Operating_Income_M", "Team_Value_B"])]
+    print(preview.round(2).to_string(index=False))
+    return bands
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="蒙特卡洛推演营收 / 利润 / 估值 / 债务率 (输出分位数区间)")
+    parser.add_argument("--paths", type=int, default=N_PATHS, help="模拟路径数")
+    parser.add_argument("--years", type=int, default=HORIZON, help="向后推演的赛季数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (结果可复现)")
+    parser.add_argument("--workers", type=int, default=1, help="进程数 (0 为 CPU 核数)")
+    args = parser.parse_args()
+
+    with run("simulate_finance"):
+        simulate_finance(horizon=args.years, n_paths=args.paths, seed=args.seed, workers=args.workers)
@@ -0,0 +1,98 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+sys.path.insert(0, ROOT)
+
+import get_schedule  # noqa: E402
+from gsw_data import config  # noqa: E402
+from gsw_data.store import HAS_PARQUET, read_dataset, write_dataset  # noqa: E402
+
+LIVE = 2026
+
+# 已结束赛季: 含个位数日期 ("Jan 1")，B-Ref 原文不补零
+CLOSED_GAMES = [
+    ("Fri, Jan 1, 2021", "Sacramento Kings", "", "W", 117, 91),
+    ("Sun, Jan 3, 2021", "Sacramento Kings", "", "W", 137, 106),
+    ("Mon, Jan 4, 2021", "Portland Trail Blazers", "", "W", 137, 122),
+    ("Wed, Jan 6, 2021", "Los Angeles Clippers", "@", "L", 105, 115),
+    ("Fri, Jan 15, 2021", "Toronto Raptors", "", "L", 105, 106),
+]
+LIVE_GAMES = [
+    ("Wed, Oct 22, 2025", "Los Angeles Lakers", "@", "W", 119, 109),
+    ("Fri, Oct 24, 2025", "Denver Nuggets", "", "W", 137, 131),
+    ("Sun, Nov 2, 2025", "Indiana Pacers", "@", "L", 109, 114),
+    ("Tue, Nov 4, 2025", "Phoenix Suns", "", "W", 118, 107),
+    ("Sat, Nov 8, 2025", "Indiana Pacers", "", "W", 114, 83),
+]
+
+
+def schedule_html(games):
+    # 最小化的 B-Ref 赛程表: 胜负列与主客场列没有表头
+    head = "<tr><th>G</th><th>Date</th><th></th><th>Opponent</th><th></th><th>Tm</th><th>Opp</th></tr>"
+    rows = "".join(
+        f"<tr><td>{i}</td><td>{date}</td><td>{venue}</td><td>{opp}</td>"
+        f"<td>{result}</td><td>{pts}</td><td>{opp_pts}</td></tr>"
+        for i, (date, opp, venue, result, pts, opp_pts) in enumerate(games, 1)
+    )
+    return f'<html><body><table id="games"><thead>{head}</thead><tbody>{rows}</tbody></table></body></html>'.encode()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCHEMA_DIR", str(tmp_path / "schema"))
+    monkeypatch.setattr(get_schedule, "current_season", lambda: LIVE)
+    page = {"html": schedule_html(LIVE_GAMES)}
+
+    def fake_fetch_all(jobs):
+        return {key: SimpleNamespace(status_code=200, content=page["html"],
+                                     raise_for_status=lambda: None)
+                for key in jobs}
+
+    monkeypatch.setattr(get_schedule, "fetch_all", fake_fetch_all)
+    output_file = str(tmp_path / "gsw_schedule_5years.csv")
+
+    # 初始数据: 已结束赛季完整，进行中赛季只有前 3 场
+    stored = pd.concat([
+        get_schedule.parse_schedule(schedule_html(CLOSED_GAMES), 2021),
+        get_schedule.parse_schedule(schedule_html(LIVE_GAMES[:3]), LIVE),
+    ], ignore_index=True)
+    write_dataset(stored, "schedule", output_file)
+    return output_file
+
+
+def test_incremental_keeps_closed_season_csv_bytes(workspace, monkeypatch):
+    monkeypatch.setattr(config, "CSV_EXPORT", True)
+    with open(workspace, "rb") as f:
+        before = f.read()
+
+    get_schedule.refresh_schedule_incremental(seasons=[2021, LIVE], output_file=workspace)
+
+    with open(workspace, "rb") as f:
+        after = f.read()
+    # 已存储的行 (含已结束赛季) 原样保留，新比赛追加在后面
+    assert after.startswith(before)
+    assert b"Fri, Jan 1, 2021" in after
+    assert b"Jan 01" not in after
+    appended = after[len(before):].decode().splitlines()
+    assert [line.split(",")[0] for line in appended] == ['"Tue', '"Sat']
+
+
+@pytest.mark.skipif(not HAS_PARQUET, reason="需要 pyarrow")
+def test_incremental_parquet_only(workspace, monkeypatch):
+    os.remove(workspace)
+    monkeypatch.setattr(config, "CSV_EXPORT", False)
+    before = read_dataset("schedule", workspace)
+
+    get_schedule.refresh_schedule_incremental(seasons=[2021, LIVE], output_file=workspace)
+
+    assert not os.path.exists(workspace)
+    after = read_dataset("schedule", workspace)
+    assert len(after) == len(CLOSED_GAMES) + len(LIVE_GAMES)
+    pd.testing.assert_frame_equal(after.iloc[:len(before)], before, check_categorical=False)
+    assert after["Date"].notna().all()